@@ -0,0 +1,25 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+# cassette.py fica junto dos evals em py/agents, que se importam pelo nome
+sys.path.append(str(Path(__file__).resolve().parent / "py" / "agents"))
+
+from cassette import cassette_path, use_cassette
+
+
+@pytest.fixture(autouse=True)
+def eval_cassette(request):
+    """
+    Com EVAL_CASSETTE_MODE (record, replay ou auto) definido, cada teste dos evals grava ou
+    reproduz o tráfego de LLM e MCP em cassettes/<módulo>/<teste>.jsonl.gz, ao lado do teste.
+    O matching vem de EVAL_CASSETTE_MATCH. Sem a variável, os testes chamam os serviços reais.
+    """
+    mode = os.getenv("EVAL_CASSETTE_MODE")
+    if not mode:
+        yield None
+        return
+    with use_cassette(cassette_path(request.path, request.node.name), mode=mode) as cassette:
+        yield cassette
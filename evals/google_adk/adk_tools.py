@@ -1,4 +1,8 @@
+import copy
 import os
+import re
+from datetime import date
+from functools import lru_cache
 from dotenv import load_dotenv
 from google.adk.tools.langchain_tool import LangchainTool
 from langchain_community.tools import TavilySearchResults
@@ -16,14 +20,176 @@ tavily_tool_instance = TavilySearchResults(
 adk_tavily_tool = LangchainTool(tool=tavily_tool_instance)
 
 
-def get_curriculum_vitae(path: str) -> str:
+# Sections of the curriculum vitae, matched by keywords in the markdown headings
+SECTION_KEYWORDS = {
+    "objective": ("objetivo", "objective", "resumo", "summary"),
+    "education": ("formação", "formacao", "education"),
+    "experience": ("experiência", "experiencia", "experience", "projetos", "projects"),
+    "skills": ("habilidades", "competências", "skills"),
+    "languages": ("idiomas", "línguas", "languages"),
+}
+
+# Keywords of each degree, from the highest to the lowest
+DEGREES = (
+    ("doctorate", ("doutorado", "phd", "doctorate")),
+    ("master", ("mestrado", "master")),
+    ("specialization", ("especialização", "mba")),
+    ("bachelor", ("bacharelado", "licenciatura", "bachelor", "graduação")),
+    ("technologist", ("tecnólogo", "tecnologia em")),
+)
+
+CURRENT_WORDS = ("atual", "presente", "present", "current", "hoje")
+
+MAX_OBJECTIVE_CHARS = 300
+
+
+def _clean(text: str) -> str:
+    return re.sub(r"[*_`]", "", text).strip()
+
+
+def _split_sections(text: str) -> tuple:
+    """Header lines before the first heading and the lines of each known section"""
+    header, sections, current = [], {}, None
+    for line in text.splitlines():
+        if line.lstrip().startswith("#"):
+            title = _clean(line.lstrip("# ")).lower()
+            current = next((name for name, words in SECTION_KEYWORDS.items() if any(word in title for word in words)), "")
+            if current:
+                sections.setdefault(current, [])
+            continue
+        if not line.strip() or line.strip() == "---":
+            continue
+        if current is None:
+            header.append(line)
+        elif current:
+            sections[current].append(line)
+    return header, sections
+
+
+def _header_fields(lines: list) -> dict:
+    fields = {}
+    for line in lines:
+        match = re.match(r"\s*\*\*(.+?):\*\*\s*(.+)", line)
+        if match:
+            fields[match.group(1).strip().lower()] = match.group(2).strip()
+    return fields
+
+
+def _location(address: str) -> str:
+    # "Rua X, 123 – São Paulo, SP – Brasil": the street is dropped, city onwards is kept
+    parts = [part.strip() for part in re.split(r"\s+[–-]\s+", address) if part.strip()]
+    return ", ".join(parts[1:]) if len(parts) > 1 else address
+
+
+def _bullets(lines: list) -> list:
+    return [_clean(line.strip()[1:]) for line in lines if line.strip().startswith(("*", "-"))]
+
+
+def _entries(lines: list) -> list:
+    """Bold lines start an entry (title); the following italic line holds place and period"""
+    entries = []
+    for line in lines:
+        stripped = line.strip()
+        if stripped.startswith("**") and not stripped.startswith("* "):
+            entries.append({"title": _clean(stripped)})
+        elif stripped.startswith("*") and not stripped.startswith("* ") and entries and "where" not in entries[-1]:
+            entries[-1]["where"] = _clean(stripped)
+        elif stripped.lower().startswith("período:") and entries:
+            entries[-1]["where"] = ", ".join(filter(None, (entries[-1].get("where"), _clean(stripped.split(":", 1)[1]))))
+    return entries
+
+
+def _years(text: str) -> list:
+    years = [int(year) for year in re.findall(r"\b(?:19|20)\d{2}\b", text)]
+    if any(word in text.lower() for word in CURRENT_WORDS):
+        years.append(date.today().year)
+    return years
+
+
+def _seniority(education: list, experience: list) -> dict:
+    titles = [entry["title"].lower() for entry in education]
+    highest = next((
+        degree for degree, words in DEGREES
+        if any(word in title for title in titles for word in words)
+    ), None)
+    years = [year for entry in experience for year in _years(entry.get("where", ""))]
+    years_experience = max(years) - min(years) if years else 0
+    if years_experience < 3:
+        level = "junior"
+    elif years_experience < 6:
+        level = "mid-level"
+    else:
+        level = "senior"
+    return {"level": level, "years_of_experience": years_experience, "highest_degree": highest}
+
+
+def _skills(lines: list) -> dict:
+    skills = {}
+    for bullet in _bullets(lines):
+        category, _, items = bullet.rpartition(":")
+        values = [item.strip(" .") for item in items.split(",") if item.strip(" .")]
+        skills.setdefault(category.strip() or "general", []).extend(values)
+    return skills
+
+
+def _languages(lines: list) -> dict:
+    languages = {}
+    for bullet in _bullets(lines):
+        name, *level = re.split(r"\s+[–-]\s+", bullet, maxsplit=1)
+        # "Inglês – Avançado (leitura, escrita e conversação)" -> {"Inglês": "Avançado"}
+        languages[name.strip()] = re.sub(r"\s*\(.*\)", "", "".join(level)).strip()
+    return languages
+
+
+@lru_cache(maxsize=32)
+def _parse_profile(path: str, mtime_ns: int) -> dict:
+    """Parses the curriculum vitae once per file version (path and modification time)"""
+    with open(path, 'r', encoding='utf-8') as file:
+        text = file.read()
+    header, sections = _split_sections(text)
+    fields = _header_fields(header)
+    if not sections:
+        # Unknown layout: the agent still gets the full text
+        return {"text": text}
+
+    objective = " ".join(line.strip() for line in sections.get("objective", []))
+    return {
+        "name": fields.get("nome") or fields.get("name"),
+        "location": _location(fields.get("endereço") or fields.get("address") or fields.get("localização") or ""),
+        "objective": objective[:MAX_OBJECTIVE_CHARS],
+        "education": _entries(sections.get("education", [])),
+        "experience": _entries(sections.get("experience", [])),
+        "skills": _skills(sections.get("skills", [])),
+        "languages": _languages(sections.get("languages", [])),
+    }
+
+
+def _load_profile(path: str, mtime_ns: int) -> dict:
+    parsed = copy.deepcopy(_parse_profile(path, mtime_ns))
+    if "text" in parsed:
+        return parsed
+    education, experience = parsed.pop("education"), parsed.pop("experience")
+    return {
+        "name": parsed["name"],
+        "location": parsed["location"],
+        "objective": parsed["objective"],
+        # Outside the cache: "Atual"/"presente" periods grow with today's date
+        "seniority": _seniority(education, experience),
+        "education": [" – ".join(filter(None, (entry["title"], entry.get("where")))) for entry in education],
+        "experience": [" – ".join(filter(None, (entry["title"], entry.get("where")))) for entry in experience],
+        "skills": parsed["skills"],
+        "languages": parsed["languages"],
+    }
+
+
+def get_curriculum_vitae(path: str) -> dict:
     """
-    Reads the curriculum vitae from a file and returns its content.
+    Reads the curriculum vitae from a markdown file and returns a structured profile of the user.
     :param path: Path to the curriculum vitae file.
-    :return: Content of the curriculum vitae.
+    :return: Profile with name, location, objective, seniority, education, experience, skills and languages.
     """
     if not path:
         raise ValueError("Path to the curriculum vitae file must be provided.")
-    with open(path, 'r', encoding='utf-8') as file:
-        curriculum_vitae = file.read()
-    return curriculum_vitae
\ No newline at end of file
+    resolved = os.path.realpath(path)
+    # Built from a copy of the cached entries, so the caller cannot change the cache
+    return _load_profile(resolved, os.stat(resolved).st_mtime_ns)
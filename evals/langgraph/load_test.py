@@ -0,0 +1,448 @@
+import argparse
+import asyncio
+import gc
+import importlib.util
+import itertools
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Callable
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.tools import BaseTool, StructuredTool
+from langgraph.prebuilt import ToolNode
+
+# Percentil compartilhado com o relatório dos evals
+sys.path.append(str(Path(__file__).resolve().parents[1] / "py" / "agents"))
+from eval_report import percentile
+
+logger = logging.getLogger(__name__)
+
+# Nome usado pelos templates do gerador e pelo sum_agent para o modelo com tools
+DEFAULT_MODEL_ATTR = "model_with_tools"
+DEFAULT_DURATION = 10.0
+LAG_INTERVAL = 0.05
+# Carga fechada: abaixo deste ganho de vazão entre níveis consecutivos, o grafo está saturado
+SATURATION_GAIN = 0.05
+# Carga aberta: saturado quando conclui menos que esta fração das chegadas por segundo
+SATURATION_SHORTFALL = 0.10
+
+_STUB_ARGS = {"integer": 1, "number": 1.0, "string": "x", "boolean": True, "array": [], "object": {}}
+STUB_TOOL_RESULT = "Resultado simulado."
+
+
+def rss_mb() -> float:
+    """Memória residente do processo em MB (pico, fora do Linux)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+class StubModel:
+    """
+    Substitui o modelo com tools do agente: responde após `latency` segundos, sem rede.
+    Nas primeiras `tool_rounds` chamadas de cada conversa pede uma tool (em rodízio,
+    com argumentos de exemplo gerados pelo schema), depois responde em texto.
+    """
+
+    def __init__(self, tools: list, latency: float = 0.2, jitter: float = 0.0, tool_rounds: int = 1,
+                 response_chars: int = 200, seed: int = 0):
+        self.tools = list(tools)
+        self.latency = latency
+        self.jitter = jitter
+        self.tool_rounds = tool_rounds if self.tools else 0
+        self.response = ("Resposta simulada. " * (response_chars // 19 + 1))[:response_chars]
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+
+    def _delay(self) -> float:
+        with self._lock:
+            self.calls += 1
+            return max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+
+    def _reply(self, messages: list) -> AIMessage:
+        # Rodadas de tool já feitas desde a última mensagem do usuário
+        rounds = 0
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                break
+            if isinstance(message, AIMessage) and message.tool_calls:
+                rounds += 1
+        if rounds >= self.tool_rounds:
+            return AIMessage(content=self.response)
+        tool = self.tools[rounds % len(self.tools)]
+        properties = (tool.args_schema.model_json_schema() if tool.args_schema else {}).get("properties", {})
+        args = {name: _STUB_ARGS.get(schema.get("type"), "x") for name, schema in properties.items()}
+        return AIMessage(content="", tool_calls=[{"name": tool.name, "args": args, "id": f"stub-{next(self._ids)}"}])
+
+    def invoke(self, messages, config=None, **kwargs) -> AIMessage:
+        # Síncrono como uma chamada HTTP bloqueante: ocupa uma thread do executor
+        time.sleep(self._delay())
+        return self._reply(messages)
+
+    async def ainvoke(self, messages, config=None, **kwargs) -> AIMessage:
+        await asyncio.sleep(self._delay())
+        return self._reply(messages)
+
+
+def stub_tool(tool: BaseTool, latency: float = 0.0) -> BaseTool:
+    """Tool sem efeitos colaterais, com o nome e o schema de `tool`, que responde após `latency` segundos"""
+
+    def run(**kwargs) -> str:
+        time.sleep(latency)
+        return STUB_TOOL_RESULT
+
+    async def arun(**kwargs) -> str:
+        await asyncio.sleep(latency)
+        return STUB_TOOL_RESULT
+
+    return StructuredTool.from_function(
+        func=run, coroutine=arun, name=tool.name, description=tool.description, args_schema=tool.args_schema
+    )
+
+
+def _import_file(path: Path):
+    """
+    Importa como módulo de pacote (os main.py gerados usam imports relativos) e deixa a
+    pasta no sys.path (os agentes de exemplo importam módulos vizinhos pelo nome).
+    """
+    sys.path.insert(0, str(path.parent.parent))
+    sys.path.insert(0, str(path.parent))
+    name = f"{path.parent.name}.{path.stem}"
+    spec = importlib.util.spec_from_file_location(name, path, submodule_search_locations=None)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def _loaded_modules(root: Path) -> list:
+    return [
+        module for module in list(sys.modules.values())
+        if getattr(module, "__file__", None) and Path(module.__file__).resolve().is_relative_to(root)
+    ]
+
+
+def install_stub_tools(root: Path, latency: float = 0.0) -> int:
+    """
+    Troca as tools reais dos módulos carregados de `root` (tools soltas, listas de tools e
+    ToolNodes) por stubs: o agente de criação, por exemplo, gravaria arquivos a cada requisição.
+    """
+    stubs: Dict[int, BaseTool] = {}
+
+    def replace(tool: BaseTool) -> BaseTool:
+        if id(tool) not in stubs:
+            stubs[id(tool)] = stub_tool(tool, latency)
+        return stubs[id(tool)]
+
+    for module in _loaded_modules(root):
+        for name, value in list(vars(module).items()):
+            if isinstance(value, BaseTool):
+                setattr(module, name, replace(value))
+            elif isinstance(value, list) and value and all(isinstance(item, BaseTool) for item in value):
+                setattr(module, name, [replace(item) for item in value])
+            elif isinstance(value, ToolNode):
+                setattr(module, name, ToolNode([replace(item) for item in value.tools_by_name.values()]))
+    logger.info(f"{len(stubs)} tools simuladas em {root}")
+    return len(stubs)
+
+
+def install_stub(root: Path, model_attr: str, **stub_options) -> List[StubModel]:
+    """Troca o modelo de todo módulo carregado de `root` que define `model_attr`"""
+    stubs = []
+    for module in _loaded_modules(root):
+        if not hasattr(module, model_attr):
+            continue
+        stub = StubModel(getattr(module, "tools", []), **stub_options)
+        setattr(module, model_attr, stub)
+        stubs.append(stub)
+        logger.info(f"Modelo simulado instalado em {module.__name__}.{model_attr}")
+    return stubs
+
+
+def load_graph_factory(spec: str, model_attr: str = DEFAULT_MODEL_ATTR, stub_tools: bool = True,
+                       tool_latency: float = 0.0, **stub_options) -> Callable[[], Any]:
+    """Carrega "arquivo.py:build_graph" e troca o modelo do agente por um StubModel (e as tools por stubs)"""
+    module_ref, _, attribute = spec.rpartition(":")
+    if not module_ref.endswith(".py") or not attribute:
+        raise ValueError(f"Grafo deve ter o formato 'arquivo.py:build_graph' ({spec})")
+    # O ChatOpenAI exige uma chave ao ser criado, mesmo sem nunca ser chamado
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    path = Path(module_ref).resolve()
+    module = _import_file(path)
+    if stub_tools:
+        install_stub_tools(path.parent, tool_latency)
+    if not install_stub(path.parent, model_attr, **stub_options):
+        raise ValueError(f"Nenhum módulo em {path.parent} define '{model_attr}'")
+    return getattr(module, attribute)
+
+
+class LoopMonitor:
+    """Atraso do event loop (quanto um sleep curto passa do previsto) e memória residente"""
+
+    def __init__(self, interval: float = LAG_INTERVAL):
+        self.interval = interval
+        self.lags: List[float] = []
+        self.rss: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, time.perf_counter() - started - self.interval))
+            self.rss.append(rss_mb())
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+class LoadTest:
+    """
+    Gera carga num grafo LangGraph compilado. Em carga fechada, `concurrency` clientes
+    enviam requisições em sequência; em carga aberta, requisições chegam a `rate` por
+    segundo independentemente das respostas, e a latência conta desde a chegada prevista.
+    """
+
+    def __init__(self, graph_factory: Callable[[], Any], inputs: List[str], build_per_request: bool = False):
+        self.graph_factory = graph_factory
+        self.inputs = inputs
+        self.build_per_request = build_per_request
+        self.graph = graph_factory()
+        self._inputs = itertools.cycle(inputs)
+
+    async def _request(self, started: float, latencies: List[float], errors: List[str]):
+        # build_per_request reproduz o execute_graph dos main.py, que compila o grafo a cada chamada
+        graph = self.graph_factory() if self.build_per_request else self.graph
+        try:
+            await graph.ainvoke({"messages": [HumanMessage(next(self._inputs))]})
+            latencies.append(time.perf_counter() - started)
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+
+    async def warmup(self):
+        await self._request(time.perf_counter(), [], [])
+
+    async def closed_stage(self, concurrency: int, duration: float) -> Dict[str, Any]:
+        latencies: List[float] = []
+        errors: List[str] = []
+        deadline = time.perf_counter() + duration
+
+        async def client():
+            while time.perf_counter() < deadline:
+                await self._request(time.perf_counter(), latencies, errors)
+
+        return await self._measure(
+            {"mode": "closed", "concurrency": concurrency},
+            lambda: asyncio.gather(*(client() for _ in range(concurrency))),
+            latencies, errors,
+        )
+
+    async def open_stage(self, rate: float, duration: float, arrivals: str = "poisson", seed: int = 0) -> Dict[str, Any]:
+        latencies: List[float] = []
+        errors: List[str] = []
+        rng = random.Random(seed)
+        in_flight = {"now": 0, "peak": 0}
+
+        async def tracked(started: float):
+            in_flight["now"] += 1
+            in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+            try:
+                await self._request(started, latencies, errors)
+            finally:
+                in_flight["now"] -= 1
+
+        async def generator():
+            tasks = []
+            start = time.perf_counter()
+            scheduled = start
+            while scheduled < start + duration:
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(tracked(scheduled)))
+                scheduled += rng.expovariate(rate) if arrivals == "poisson" else 1 / rate
+            await asyncio.gather(*tasks)
+
+        stage = await self._measure({"mode": "open", "rate": rate, "arrivals": arrivals}, generator, latencies, errors)
+        stage["offered_rps"] = round(stage["requests"] / duration, 3)
+        stage["peak_in_flight"] = in_flight["peak"]
+        return stage
+
+    async def _measure(self, stage: Dict[str, Any], run: Callable, latencies: List[float], errors: List[str]) -> Dict[str, Any]:
+        gc.collect()
+        rss_before = rss_mb()
+        monitor = LoopMonitor()
+        monitor.start()
+        started = time.perf_counter()
+        await run()
+        elapsed = time.perf_counter() - started
+        await monitor.stop()
+        gc.collect()
+        rss_after = rss_mb()
+
+        stage.update({
+            "requests": len(latencies) + len(errors),
+            "errors": len(errors),
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+            "latency_s": {
+                name: round(percentile(latencies, q), 4) for name, q in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))
+            },
+            "loop_lag_ms": {
+                name: round(percentile(monitor.lags, q) * 1000, 2) for name, q in (("p50", 50), ("p99", 99), ("max", 100))
+            },
+            "rss_mb": {
+                "before": round(rss_before, 1),
+                "peak": round(max(monitor.rss + [rss_after]), 1),
+                "after": round(rss_after, 1),
+                "growth": round(rss_after - rss_before, 1),
+            },
+        })
+        if errors:
+            stage["first_error"] = errors[0]
+        return stage
+
+
+def find_saturation(stages: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Estágios de um mesmo modo, em ordem crescente de carga. Carga aberta: primeiro nível em
+    que a vazão fica aquém das chegadas (a fila cresce). Carga fechada: primeiro nível a
+    partir do qual mais clientes não aumentam a vazão.
+    """
+    if stages and stages[0]["mode"] == "open":
+        return next((
+            stage for stage in stages
+            if stage["throughput_rps"] < stage["offered_rps"] * (1 - SATURATION_SHORTFALL)
+        ), None)
+    for current, following in zip(stages, stages[1:]):
+        if following["throughput_rps"] < current["throughput_rps"] * (1 + SATURATION_GAIN):
+            return current
+    return None
+
+
+def _stage_label(stage: Dict[str, Any]) -> str:
+    return f"c={stage['concurrency']}" if stage["mode"] == "closed" else f"{stage['rate']:g} req/s"
+
+
+def render(stages: List[Dict[str, Any]]) -> str:
+    lines = [
+        f"{'carga':<12} {'req':>6} {'erros':>6} {'req/s':>8} {'p50 s':>8} {'p95 s':>8} {'p99 s':>8} "
+        f"{'lag p99 ms':>11} {'lag max ms':>11} {'RSS +MB':>8}"
+    ]
+    for stage in stages:
+        latency, lag = stage["latency_s"], stage["loop_lag_ms"]
+        lines.append(
+            f"{_stage_label(stage):<12} {stage['requests']:>6} {stage['errors']:>6} {stage['throughput_rps']:>8.2f} "
+            f"{latency['p50']:>8.3f} {latency['p95']:>8.3f} {latency['p99']:>8.3f} "
+            f"{lag['p99']:>11.1f} {lag['max']:>11.1f} {stage['rss_mb']['growth']:>8.1f}"
+        )
+    for stage in stages:
+        if stage.get("first_error"):
+            lines.append(f"⚠️ {_stage_label(stage)}: {stage['first_error']}")
+    for mode in ("open", "closed"):
+        sweep = [stage for stage in stages if stage["mode"] == mode]
+        saturation = find_saturation(sweep)
+        if saturation:
+            lines.append(f"Saturação em {_stage_label(saturation)} (~{saturation['throughput_rps']:.2f} req/s)")
+        elif sweep:
+            lines.append(f"Sem saturação nos níveis de carga {'aberta' if mode == 'open' else 'fechada'} testados")
+    return "\n".join(lines)
+
+
+def _levels(value: str) -> List[float]:
+    return [float(level) for level in value.split(",") if level.strip()]
+
+
+def _load_inputs(args) -> List[str]:
+    if not args.cases:
+        return [args.input]
+    inputs = []
+    with open(args.cases, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("//"):
+                inputs.append(json.loads(line)["input"])
+    return inputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Teste de carga de um agente LangGraph gerado, com modelo simulado")
+    parser.add_argument("graph", help="arquivo.py:build_graph (ex.: src/gerador/arquivos_gerados/main.py:build_graph)")
+    parser.add_argument("--concurrency", default=None, help="Carga fechada: níveis de clientes, ex.: 1,4,16,64")
+    parser.add_argument("--rate", default=None, help="Carga aberta: níveis de chegada em req/s, ex.: 5,10,20")
+    parser.add_argument("--arrivals", choices=("poisson", "constant"), default="poisson")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION, help="Segundos por nível")
+    parser.add_argument("--latency", type=float, default=0.2, help="Latência do modelo simulado, em segundos")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Variação uniforme (±) da latência")
+    parser.add_argument("--tool-rounds", type=int, default=1, help="Chamadas de tool por requisição (0 não executa tools)")
+    parser.add_argument("--stub-tools", action=argparse.BooleanOptionalAction, default=True,
+                        help="Troca as tools do agente por stubs sem efeitos colaterais; com --no-stub-tools as tools "
+                             "reais rodam (o gerador, por exemplo, grava arquivos em src/gerador/arquivos_gerados)")
+    parser.add_argument("--tool-latency", type=float, default=0.0, help="Latência das tools simuladas, em segundos")
+    parser.add_argument("--response-chars", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=None,
+                        help="Threads do executor padrão, onde rodam os nós síncronos (padrão do asyncio se omitido)")
+    parser.add_argument("--build-per-request", action="store_true", help="Compila o grafo a cada requisição, como o execute_graph")
+    parser.add_argument("--model-attr", default=DEFAULT_MODEL_ATTR)
+    parser.add_argument("--input", default="quanto é 5+5+2?")
+    parser.add_argument("--cases", default=None, help="JSONL de casos; usa o campo input em rodízio")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="Grava os estágios neste arquivo JSON")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    graph_factory = load_graph_factory(
+        args.graph,
+        model_attr=args.model_attr,
+        stub_tools=args.stub_tools,
+        tool_latency=args.tool_latency,
+        latency=args.latency,
+        jitter=args.jitter,
+        tool_rounds=args.tool_rounds,
+        response_chars=args.response_chars,
+        seed=args.seed,
+    )
+
+    async def run() -> List[Dict[str, Any]]:
+        if args.threads:
+            asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.threads))
+        load_test = LoadTest(graph_factory, _load_inputs(args), build_per_request=args.build_per_request)
+        await load_test.warmup()
+        stages = []
+        for level in _levels(args.rate) if args.rate else []:
+            logger.info(f"Carga aberta: {level:g} req/s por {args.duration:g}s")
+            stages.append(await load_test.open_stage(level, args.duration, args.arrivals, args.seed))
+        for level in _levels(args.concurrency or ("" if args.rate else "1,4,16")):
+            logger.info(f"Carga fechada: {int(level)} clientes por {args.duration:g}s")
+            stages.append(await load_test.closed_stage(int(level), args.duration))
+        return stages
+
+    stages = asyncio.run(run())
+    print(render(stages))
+    if args.json:
+        Path(args.json).write_text(json.dumps(stages, indent=2, ensure_ascii=False), encoding="utf-8")
+        print(f"Resultados em {args.json}")
+
+
+if __name__ == "__main__":
+    main()
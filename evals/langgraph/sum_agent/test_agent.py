@@ -3,7 +3,7 @@ from deepeval.metrics import GEval, ToolCorrectnessMetric
 from deepeval import assert_test
 from langgraph.prebuilt import ToolNode
 from langgraph.graph import END, START, MessagesState, StateGraph
-from langchain_core.messages import HumanMessage, ToolMessage
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
 from agent import sum_agent, tools
 from dotenv import load_dotenv
 
@@ -42,6 +42,41 @@ def get_tool_calls_names(messages: list) -> list:
             tool_calls.append(ToolCall(name=message.name))
     return tool_calls
 
+def run_case(case: dict) -> dict:
+    """Executa um caso; usado pelo eval_runner (test_agent.py:run_case)"""
+    system_result = execute_graph(case["input"])
+    return {
+        "actual_output": system_result[-1].content,
+        "tools_called": [tool_call.name for tool_call in get_tool_calls_names(system_result)],
+        "tool_calls": [
+            {"tool": tool_call["name"], "params": tool_call["args"]}
+            for message in system_result if isinstance(message, AIMessage)
+            for tool_call in message.tool_calls
+        ]
+    }
+
+def build_metrics() -> list:
+    correctness_metric = GEval(
+        name="Correctness",
+        criteria="Determine if the information in 'actual output' is correct based on the information in 'expected output'.",
+        evaluation_params=[LLMTestCaseParams.ACTUAL_OUTPUT,
+                           LLMTestCaseParams.EXPECTED_OUTPUT],
+        threshold=0.5
+    )
+    return [correctness_metric, ToolCorrectnessMetric()]
+
+def build_test_case(case: dict, result: dict) -> LLMTestCase:
+    """Test case do deepeval a partir de um caso e do resultado gravado pelo eval_runner"""
+    expected_tools = case.get("expected_tools") or [call["tool"] for call in case.get("expected_tool_calls", [])]
+    return LLMTestCase(
+        input=case["input"],
+        expected_output=case.get("expected_output"),
+        actual_output=result.get("actual_output") or "",
+        expected_tools=[ToolCall(name=name) for name in expected_tools],
+        tools_called=[ToolCall(name=name) for name in result.get("tools_called", [])],
+        retrieval_context=case.get("retrieval_context")
+    )
+
 def test_case_1():
     INPUT = "quanto é 5+5+2?"
     system_result = execute_graph(INPUT)
@@ -1,61 +1,28 @@
 import asyncio
 import json
 import logging
-from typing import Dict, List, Any, Optional
-from dataclasses import dataclass
-from abc import ABC, abstractmethod
-import openai
-from datetime import datetime
+import sys
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
 import requests
+from llm_client import get_shared_client, run_tool_loop, DEFAULT_MAX_CONCURRENCY
+from mcp_server import ToolResult, MCPTool, MCPServer
+from tool_call_parser import parse_tool_calls, dispatch_streamed_tool_calls
+from conversation_memory import ConversationMemory, llm_summarizer, DEFAULT_MAX_MESSAGES, DEFAULT_TOKEN_BUDGET
+
+sys.path.append(str(Path(__file__).resolve().parents[3] / "src"))
+from shared.artifact_store import ArtifactStore
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
-class MCPMessage:
-    """Representa uma mensagem no protocolo MCP"""
-    id: str
-    method: str
-    params: Dict[str, Any]
-    timestamp: datetime = None
-    
-    def __post_init__(self):
-        if self.timestamp is None:
-            self.timestamp = datetime.now()
-
-@dataclass
-class ToolResult:
-    """Resultado da execução de uma ferramenta"""
-    success: bool
-    data: Any
-    error_message: str = None
-
-class MCPTool(ABC):
-    """Classe abstrata para ferramentas MCP"""
-    
-    @abstractmethod
-    async def execute(self, params: Dict[str, Any]) -> ToolResult:
-        pass
-    
-    @property
-    @abstractmethod
-    def name(self) -> str:
-        pass
-    
-    @property
-    @abstractmethod
-    def description(self) -> str:
-        pass
-    
-    @property
-    @abstractmethod
-    def parameters(self) -> Dict[str, Any]:
-        pass
-
-
 class registerAgent(MCPTool):
     """Ferramenta para registrar o arquivo do agente"""
+
+    def __init__(self, store: Optional[ArtifactStore] = None):
+        # Além do agent_generated.py, cada versão fica guardada no store
+        self.store = store or ArtifactStore(Path(__file__).resolve().parent / ".artifacts")
     
     @property
     def name(self) -> str:
@@ -63,7 +30,7 @@ class registerAgent(MCPTool):
     
     @property
     def description(self) -> str:
-        return "Salva o código do agente em um arquivo chamado agent_generated.py"
+        return "Salva o código do agente em um arquivo chamado agent_generated.py e registra a versão com o nome do agente"
     
     @property
     def parameters(self) -> Dict[str, Any]:
@@ -71,8 +38,10 @@ class registerAgent(MCPTool):
             "type": "object",
             "properties": {
                 "code": {"type": "string"},
+                "agent_name": {"type": "string", "minLength": 1, "description": "Nome do agente gerado"},
+                "spec": {"type": "string", "description": "Pedido do usuário que originou o agente"},
             },
-            "required": ["code"]
+            "required": ["code", "agent_name"]
         }
     
     async def execute(self, params: Dict[str, Any]) -> ToolResult:
@@ -82,56 +51,40 @@ class registerAgent(MCPTool):
 
             with open(filename, "w", encoding="utf-8") as file:
                 file.write(code)
-            
-            return ToolResult(success=True, data={"result": filename})
+
+            entry = await asyncio.to_thread(
+                self.store.put_bundle, params["agent_name"], {filename: code}, params.get("spec")
+            )
+
+            return ToolResult(success=True, data={"result": filename, "artifact": entry["bundle"][:12]})
             
         except Exception as e:
-            return ToolResult(success=False, error_message=str(e))
-
+            return ToolResult(success=False, data=None, error_message=str(e))
 
-class MCPServer:
-    """Servidor MCP que gerencia ferramentas e comunicação"""
-    
-    def __init__(self):
-        self.tools: Dict[str, MCPTool] = {}
-        self.message_history: List[MCPMessage] = []
-    
-    def register_tool(self, tool: MCPTool):
-        """Registra uma nova ferramenta"""
-        self.tools[tool.name] = tool
-        logger.info(f"Ferramenta '{tool.name}' registrada")
-    
-    async def execute_tool(self, tool_name: str, params: Dict[str, Any]) -> ToolResult:
-        """Executa uma ferramenta específica"""
-        if tool_name not in self.tools:
-            return ToolResult(success=False, error_message=f"Ferramenta '{tool_name}' não encontrada")
-        
-        tool = self.tools[tool_name]
-        return await tool.execute(params)
-    
-    def list_tools(self) -> List[Dict[str, Any]]:
-        """Lista todas as ferramentas disponíveis"""
-        return [
-            {
-                "name": tool.name,
-                "description": tool.description,
-                "parameters": tool.parameters
-            }
-            for tool in self.tools.values()
-        ]
-    
-    def add_message(self, message: MCPMessage):
-        """Adiciona mensagem ao histórico"""
-        self.message_history.append(message)
 
 class LLMAgent:
     """Agente IA que usa LLM e MCP"""
     
-    def __init__(self, api_key: str, model: str = "gpt-4"):
-        self.client = openai.OpenAI(api_key=api_key)
+    def __init__(self, api_key: str, model: str = "gpt-4", max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                 tool_mode: str = "text", max_tool_iterations: int = 5, memory_max_messages: int = DEFAULT_MAX_MESSAGES,
+                 memory_token_budget: int = DEFAULT_TOKEN_BUDGET, memory_path: Optional[str] = None):
+        # Cliente assíncrono compartilhado entre agentes com a mesma chave
+        self.client = get_shared_client(api_key, max_concurrency=max_concurrency)
         self.model = model
+        # "text": ferramentas descritas no prompt (TOOL_CALL/PARAMS); "native": function calling
+        self.tool_mode = tool_mode
+        self.max_tool_iterations = max_tool_iterations
         self.mcp_server = MCPServer()
-        self.conversation_history = []
+        # Pedido em atendimento: vira a spec dos agentes registrados
+        self.current_request: Optional[str] = None
+        # Mensagens recentes num buffer circular; as antigas viram um resumo gerado em segundo plano
+        self.conversation_history = ConversationMemory(
+            max_messages=memory_max_messages,
+            token_budget=memory_token_budget,
+            summarizer=llm_summarizer(self.client, model),
+            persist_path=memory_path,
+            model=model
+        )
         
         # Registrar ferramentas
         self._register_default_tools()
@@ -143,6 +96,8 @@ class LLMAgent:
     async def process_message(self, user_input: str) -> Dict[str, Any]:
         """Processa mensagem do usuário e retorna resposta + tool calls"""
         try:
+            self.current_request = user_input
+
             # Adicionar mensagem do usuário ao histórico
             self.conversation_history.append({
                 "role": "user",
@@ -154,29 +109,27 @@ class LLMAgent:
 
             messages = [
                 {"role": "system", "content": system_message},
-                *self.conversation_history[-10:]  # Últimas 10 mensagens
+                *self.conversation_history.messages()  # Resumo + mensagens recentes dentro do orçamento
             ]
 
-            # Primeira chamada ao LLM
-            response = await self._call_llm(messages)
-            # Extrair tool calls da resposta inicial
-            tool_calls = self._extract_tool_calls(response)
-
-            tool_results = []
-            if tool_calls:
-                # Executar ferramentas solicitadas
-                tool_results = await self._execute_tool_calls(tool_calls)
-
-                # Adicionar resultados ao contexto e fazer nova chamada
-                messages.append({"role": "assistant", "content": response})
-                messages.append({
-                    "role": "user", 
-                    "content": f"Resultados das ferramentas: {json.dumps(tool_results, indent=2)}"
-                })
-
-                final_response = await self._call_llm(messages)
+            if self.tool_mode == "native":
+                final_response, tool_calls, tool_results = await self._run_native_tools(messages)
             else:
-                final_response = response
+                # Primeira chamada ao LLM; cada ferramenta começa a executar assim que seus PARAMS fecham
+                response, tool_calls, tool_results = await self._call_llm_dispatching_tools(messages)
+                tool_calls = [{"tool": call["tool"], "params": call["params"]} for call in tool_calls]
+
+                if tool_calls:
+                    # Adicionar resultados ao contexto e fazer nova chamada
+                    messages.append({"role": "assistant", "content": response})
+                    messages.append({
+                        "role": "user", 
+                        "content": f"Resultados das ferramentas: {json.dumps(tool_results, indent=2)}"
+                    })
+
+                    final_response = await self._call_llm(messages)
+                else:
+                    final_response = response
 
             # Adicionar resposta ao histórico
             self.conversation_history.append({
@@ -228,6 +181,10 @@ class LLMAgent:
         Gere apenas o código Python, não adicione nenhum comentário ou texto explicativo.
         """
 
+        if self.tool_mode == "native":
+            # As ferramentas vão como definições de função, fora do prompt
+            return system_msg
+
         for tool in tools_info:
             system_msg += f"\n- {tool['name']}: {tool['description']}"
             system_msg += f"\n  Parâmetros: {json.dumps(tool['parameters'], indent=2)}"
@@ -242,81 +199,108 @@ class LLMAgent:
         """
         return system_msg
     
+    def _build_tool_definitions(self) -> List[Dict[str, Any]]:
+        """Converte os parâmetros das ferramentas em definições de função"""
+        return [
+            {
+                "type": "function",
+                "function": {
+                    "name": tool["name"],
+                    "description": tool["description"],
+                    "parameters": tool["parameters"]
+                }
+            }
+            for tool in self.mcp_server.list_tools()
+        ]
+    
+    async def _run_native_tools(self, messages: List[Dict]) -> Tuple[str, List[Dict], List[Dict]]:
+        """Executa o laço de function calling nativo até o modelo parar de chamar ferramentas"""
+        async def execute(calls: List[Dict]) -> List[Dict]:
+            return await self._execute_tool_calls([
+                {"tool": call["name"], "params": call["arguments"]} for call in calls
+            ])
+        
+        final_response, calls, results = await run_tool_loop(
+            self.client,
+            self.model,
+            messages,
+            self._build_tool_definitions(),
+            execute,
+            max_iterations=self.max_tool_iterations,
+            temperature=0.7,
+            max_tokens=3000
+        )
+        tool_calls = [{"tool": call["name"], "params": call["arguments"]} for call in calls]
+        return final_response, tool_calls, results
+    
     async def _call_llm(self, messages: List[Dict]) -> str:
         """Chama o LLM"""
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
+            return await self.client.complete(
+                self.model,
+                messages,
                 temperature=0.7,
                 max_tokens=3000
             )
-            content = response.choices[0].message.content
-            return content
         except Exception as e:
             logger.error(f"Erro na chamada LLM: {e}")
             raise
     
+    async def _call_llm_dispatching_tools(self, messages: List[Dict]) -> Tuple[str, List[Dict], List[Dict]]:
+        """Chama o LLM em streaming, executando as ferramentas enquanto o restante da resposta é gerado"""
+        try:
+            return await dispatch_streamed_tool_calls(
+                self.client.stream(self.model, messages, temperature=0.7, max_tokens=3000),
+                self._execute_tool_call,
+                accept=self._accept_tool_call
+            )
+        except Exception as e:
+            logger.error(f"Erro na chamada LLM: {e}")
+            raise
+    
+    def _accept_tool_call(self, call: Dict) -> bool:
+        """Ignora chamadas com código vazio"""
+        if call["tool"] == "registerAgent" and not str(call["params"].get("code", "")).strip():
+            logger.warning(f"Ignorando chamada para 'registerAgent' com código vazio.")
+            return False
+        return True
+
     def _extract_tool_calls(self, response: str) -> List[Dict]:
         """Extrai chamadas de ferramentas da resposta do LLM"""
-        tool_calls = []
-        lines = response.strip().split('\n')
-
-        i = 0
-        while i < len(lines):
-            if lines[i].strip().startswith("TOOL_CALL:"):
-                tool_name = lines[i].replace("TOOL_CALL:", "").strip()
-                params_lines = []
-                i += 1
-
-                # Coleta todas as linhas seguintes até a próxima TOOL_CALL ou fim
-                while i < len(lines) and not lines[i].strip().startswith("TOOL_CALL:"):
-                    if lines[i].strip().startswith("PARAMS:"):
-                        params_lines.append(lines[i].replace("PARAMS:", "").strip())
-                    else:
-                        params_lines.append(lines[i].strip())
-                    i += 1
-
-                params_str = "\n".join(params_lines)
-
-                try:
-                    params = json.loads(params_str)
-
-                    # Ignora chamadas com código vazio
-                    if tool_name == "registerAgent" and not params.get("code", "").strip():
-                        logger.warning(f"Ignorando chamada para 'registerAgent' com código vazio.")
-                        continue
-
-                    tool_calls.append({
-                        "tool": tool_name,
-                        "params": params
-                    })
-                except json.JSONDecodeError as e:
-                    logger.error(f"Erro ao parsear parâmetros para '{tool_name}':\n{params_str}\n{e}")
-
-            else:
-                i += 1
-
-        return tool_calls
+        return [
+            {"tool": call["tool"], "params": call["params"]}
+            for call in parse_tool_calls(response) if self._accept_tool_call(call)
+        ]
 
 
     async def _execute_tool_calls(self, tool_calls: List[Dict]) -> List[Dict]:
-        """Executa chamadas de ferramentas"""
-        results = []
-        
-        for call in tool_calls:
-            tool_name = call["tool"]
-            params = call["params"]
-            
-            result = await self.mcp_server.execute_tool(tool_name, params)
-            results.append({
-                "tool": tool_name,
-                "params": params,
-                "result": result.data if result.success else None,
-                "error": result.error_message if not result.success else None
-            })
-        
-        return results
+        """Executa chamadas de ferramentas em paralelo"""
+        results = await self.mcp_server.execute_tools([self._with_spec(call) for call in tool_calls])
+        return [self._format_tool_result(call, result) for call, result in zip(tool_calls, results)]
+    
+    async def _execute_tool_call(self, call: Dict) -> Dict:
+        """Executa uma chamada de ferramenta"""
+        prepared = self._with_spec(call)
+        result = await self.mcp_server.execute_tool(prepared["tool"], prepared["params"])
+        return self._format_tool_result(call, result)
+    
+    def _with_spec(self, call: Dict) -> Dict:
+        """registerAgent sem spec recebe o pedido do usuário, para o histórico do store ser consultável por spec"""
+        if call["tool"] != "registerAgent" or call["params"].get("spec") or not self.current_request:
+            return call
+        return {**call, "params": {**call["params"], "spec": self.current_request}}
+    
+    def _format_tool_result(self, call: Dict, result: ToolResult) -> Dict:
+        entry = {
+            "tool": call["tool"],
+            "params": call["params"],
+            "result": result.data if result.success else None,
+            "error": result.error_message if not result.success else None
+        }
+        if not result.success and result.data is not None:
+            # Ex.: erros de validação com o schema esperado
+            entry["details"] = result.data
+        return entry
 
 # Exemplo de uso
 async def main():
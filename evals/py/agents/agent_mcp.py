@@ -3,12 +3,27 @@ import json
 import logging
 import subprocess
 import os
-from typing import Dict, List, Any, Optional
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple, Union
 from dataclasses import dataclass
-import openai
 from datetime import datetime
 import aiohttp
 import websockets
+from mcp_transport import StdioJSONRPCTransport, MCPTransportError, StderrDrain, DEFAULT_MAX_MESSAGE_BYTES, DEFAULT_STDERR_LINES
+from mcp_pool import ExternalMCPClientPool
+from mcp_supervisor import MCPSupervisor
+from llm_client import get_shared_client, run_tool_loop, DEFAULT_MAX_CONCURRENCY
+from tool_call_parser import parse_tool_calls, dispatch_streamed_tool_calls
+from conversation_memory import ConversationMemory, llm_summarizer, DEFAULT_MAX_MESSAGES, DEFAULT_TOKEN_BUDGET
+from tool_catalog import render_schema, compact_schema, count_tokens, ToolRegistry
+
+# Módulos compartilhados com os agentes de src/ (ex.: limite de saída das ferramentas)
+sys.path.append(str(Path(__file__).resolve().parents[3] / "src"))
+from shared.tool_output import ToolOutputLimiter, ToolOutputStore, READ_TOOL_NAME, READ_TOOL_SERVER
+
+TOOL_OUTPUTS_DIR = Path(__file__).resolve().parent / ".tool_outputs"
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO)
@@ -27,22 +42,33 @@ class MCPMessage:
 class ExternalMCPClient:
     """Cliente para conectar com MCP servers externos"""
     
-    def __init__(self, server_command: List[str], server_args: Dict[str, str] = None):
+    def __init__(self, server_command: List[str], server_args: Dict[str, str] = None, request_timeout: Optional[float] = 60.0,
+                 max_message_bytes: int = DEFAULT_MAX_MESSAGE_BYTES, stderr_lines: int = DEFAULT_STDERR_LINES):
         self.server_command = server_command
         self.server_args = server_args or {}
+        self.request_timeout = request_timeout
+        self.max_message_bytes = max_message_bytes
+        self.stderr_lines = stderr_lines
         self.process = None
+        self.transport: Optional[StdioJSONRPCTransport] = None
+        self.stderr: Optional[StderrDrain] = None
         self.tools = []
         self.resources = []
         self.prompts = []
+        # Incrementado a cada atualização do catálogo de ferramentas
+        self.catalog_version = 0
         self.message_id = 0
+        self.server_capabilities: Dict[str, Any] = {}
+        self.startup_timings: Dict[str, float] = {}
     
     def get_next_id(self) -> str:
         """Gera próximo ID de mensagem"""
         self.message_id += 1
         return str(self.message_id)
     
-    async def start_server(self):
+    async def start_server(self, fetch_catalog: bool = True):
         """Inicia o MCP server externo"""
+        started_at = time.perf_counter()
         try:
             # Configurar variáveis de ambiente para o server
             env = os.environ.copy()
@@ -54,44 +80,90 @@ class ExternalMCPClient:
                 stdin=asyncio.subprocess.PIPE,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
-                env=env
+                env=env,
+                # Limite do StreamReader: uma resposta JSON-RPC ocupa uma linha inteira
+                limit=self.max_message_bytes
             )
             
+            self.startup_timings = {"spawn": time.perf_counter() - started_at}
             logger.info(f"MCP Server iniciado: {' '.join(self.server_command)}")
             
+            # stderr é drenado sempre; um pipe cheio bloquearia o server
+            self.stderr = StderrDrain(self.process.stderr, self.server_command[-1], max_lines=self.stderr_lines)
+            self.stderr.start()
+            
+            # Respostas são roteadas pelo id, permitindo várias requisições simultâneas
+            self.transport = StdioJSONRPCTransport(
+                self.process.stdout,
+                self.process.stdin,
+                default_timeout=self.request_timeout,
+                max_message_bytes=self.max_message_bytes
+            )
+            self.transport.on_notification("notifications/tools/list_changed", self._on_tools_changed)
+            self.transport.on_notification("notifications/message", self._on_log_message)
+            self.transport.start()
+            
             # Inicializar conexão
-            await self._initialize_connection()
+            await self._initialize_connection(fetch_catalog)
+            self.startup_timings["total"] = time.perf_counter() - started_at
             
         except Exception as e:
             logger.error(f"Erro ao iniciar MCP server: {e}")
+            if self.stderr and self.stderr.lines:
+                logger.error("stderr do server:\n" + "\n".join(self.stderr.tail()))
             raise
     
     async def stop_server(self):
         """Para o MCP server"""
+        if self.transport:
+            await self.transport.close()
         if self.process:
-            self.process.terminate()
+            if self.process.returncode is None:
+                self.process.terminate()
             await self.process.wait()
             logger.info("MCP Server parado")
+        if self.stderr:
+            await self.stderr.close()
+    
+    def stderr_tail(self, count: int = 20) -> List[str]:
+        """Últimas linhas que o server escreveu no stderr"""
+        return self.stderr.tail(count) if self.stderr else []
     
-    async def _send_message(self, message: MCPMessage) -> Dict[str, Any]:
-        """Envia mensagem para o MCP server"""
-        if not self.process:
+    def is_alive(self) -> bool:
+        """Indica se o processo do server está rodando e a conexão aberta"""
+        return (
+            self.process is not None
+            and self.process.returncode is None
+            and self.transport is not None
+            and self.transport.is_open
+        )
+    
+    async def ping(self, timeout: Optional[float] = 5.0) -> Dict[str, Any]:
+        """Verifica se o server responde"""
+        message = MCPMessage(id=self.get_next_id(), method="ping", params={})
+        return await self._send_message(message, timeout=timeout)
+    
+    async def _send_message(self, message: MCPMessage, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Envia mensagem para o MCP server e aguarda a resposta correspondente"""
+        if not self.process or not self.transport:
             raise RuntimeError("MCP Server não está rodando")
         
-        # Converter para JSON
-        message_json = json.dumps(message.__dict__, default=str) + '\n'
-        
-        # Enviar mensagem
-        self.process.stdin.write(message_json.encode())
-        await self.process.stdin.drain()
-        
-        # Ler resposta
-        response_line = await self.process.stdout.readline()
-        response_data = json.loads(response_line.decode())
-        
-        return response_data
+        return await self.transport.request(
+            message.method,
+            message.params,
+            timeout=timeout,
+            request_id=message.id
+        )
+    
+    def _on_tools_changed(self, params: Dict[str, Any]):
+        """Atualiza o catálogo quando o server avisa que as ferramentas mudaram"""
+        asyncio.create_task(self._list_tools())
+    
+    def _on_log_message(self, params: Dict[str, Any]):
+        """Repassa logs enviados pelo server"""
+        logger.info(f"[MCP {self.server_command[-1]}] {params.get('data')}")
     
-    async def _initialize_connection(self):
+    async def _initialize_connection(self, fetch_catalog: bool = True):
         """Inicializa conexão com o MCP server"""
         # Mensagem de inicialização
         init_message = MCPMessage(
@@ -111,13 +183,29 @@ class ExternalMCPClient:
             }
         )
         
+        started_at = time.perf_counter()
         response = await self._send_message(init_message)
+        self.server_capabilities = (response.get('result') or {}).get('capabilities', {})
+        await self.transport.notify("notifications/initialized")
+        self.startup_timings["initialize"] = time.perf_counter() - started_at
         logger.info("Conexão MCP inicializada")
         
-        # Listar ferramentas disponíveis
-        await self._list_tools()
-        await self._list_resources()
-        await self._list_prompts()
+        if not fetch_catalog:
+            return
+        
+        # Listar ferramentas, recursos e prompts em paralelo, apenas o que o server anuncia
+        started_at = time.perf_counter()
+        listings = [self._list_tools()]
+        if self._supports("resources"):
+            listings.append(self._list_resources())
+        if self._supports("prompts"):
+            listings.append(self._list_prompts())
+        await asyncio.gather(*listings)
+        self.startup_timings["catalog"] = time.perf_counter() - started_at
+    
+    def _supports(self, capability: str) -> bool:
+        """Indica se o server anunciou a capacidade (servers sem anúncio são consultados)"""
+        return not self.server_capabilities or capability in self.server_capabilities
     
     async def _list_tools(self):
         """Lista ferramentas disponíveis no server"""
@@ -130,6 +218,7 @@ class ExternalMCPClient:
         response = await self._send_message(message)
         if 'result' in response and 'tools' in response['result']:
             self.tools = response['result']['tools']
+            self.catalog_version += 1
             logger.info(f"Ferramentas disponíveis: {[tool['name'] for tool in self.tools]}")
     
     async def _list_resources(self):
@@ -164,7 +253,7 @@ class ExternalMCPClient:
         except Exception as e:
             logger.debug(f"Server não suporta prompts: {e}")
     
-    async def call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
         """Chama uma ferramenta no MCP server"""
         message = MCPMessage(
             id=self.get_next_id(),
@@ -175,7 +264,7 @@ class ExternalMCPClient:
             }
         )
         
-        response = await self._send_message(message)
+        response = await self._send_message(message, timeout=timeout)
         return response
     
     def get_tools_info(self) -> List[Dict[str, Any]]:
@@ -185,58 +274,224 @@ class ExternalMCPClient:
 class LLMAgentWithExternalMCP:
     """Agente IA que usa LLM e MCP servers externos"""
     
-    def __init__(self, openai_api_key: str, model: str = "gpt-3.5-turbo"):
-        self.client = openai.OpenAI(api_key=openai_api_key)
+    def __init__(self, openai_api_key: str, model: str = "gpt-3.5-turbo", output_limiter: ToolOutputLimiter = None,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, tool_mode: str = "text", max_tool_iterations: int = 5,
+                 schema_format: str = "pretty", memory_max_messages: int = DEFAULT_MAX_MESSAGES,
+                 memory_token_budget: int = DEFAULT_TOKEN_BUDGET, memory_path: Optional[str] = None):
+        # Cliente assíncrono compartilhado entre agentes com a mesma chave
+        self.client = get_shared_client(openai_api_key, max_concurrency=max_concurrency)
         self.model = model
-        self.mcp_clients: Dict[str, ExternalMCPClient] = {}
-        self.conversation_history = []
+        # "text": ferramentas descritas no prompt (TOOL_CALL/SERVER/PARAMS); "native": function calling
+        self.tool_mode = tool_mode
+        self.max_tool_iterations = max_tool_iterations
+        self.mcp_clients: Dict[str, Union[ExternalMCPClient, ExternalMCPClientPool]] = {}
+        # Mensagens recentes num buffer circular; as antigas viram um resumo gerado em segundo plano
+        self.conversation_history = ConversationMemory(
+            max_messages=memory_max_messages,
+            token_budget=memory_token_budget,
+            summarizer=llm_summarizer(self.client, model),
+            persist_path=memory_path,
+            model=model
+        )
+        # Resultados grandes de ferramentas são salvos em disco e referenciados por handle
+        self.output_limiter = output_limiter or ToolOutputLimiter(ToolOutputStore(TOOL_OUTPUTS_DIR))
+        self.server_configs: Dict[str, Dict[str, Any]] = {}
+        self.supervisor: Optional[MCPSupervisor] = None
+        # "pretty": schemas indentados; "compact": sem espaços nem campos redundantes
+        self.schema_format = schema_format
+        # Prompt e definições só são reconstruídos quando servers ou catálogos mudam
+        self.catalog_version = 0
+        self._catalog_key = None
+        self._servers_version = 0
+        self._catalog_cache: Dict[str, Any] = {}
+        self.last_prompt_report: Dict[str, Any] = {}
+        self.tokens_saved_total = 0
+    
+    def _create_client(self, server_command: List[str], server_args: Dict[str, str] = None, replicas: int = 1):
+        """Cria o cliente de um MCP server (replicas > 1 cria um pool com balanceamento)"""
+        if replicas > 1:
+            return ExternalMCPClientPool(lambda: ExternalMCPClient(server_command, server_args), replicas)
+        return ExternalMCPClient(server_command, server_args)
     
-    async def add_mcp_server(self, name: str, server_command: List[str], server_args: Dict[str, str] = None):
+    async def add_mcp_server(self, name: str, server_command: List[str], server_args: Dict[str, str] = None, replicas: int = 1):
         """Adiciona um MCP server externo"""
-        client = ExternalMCPClient(server_command, server_args)
-        await client.start_server()
-        self.mcp_clients[name] = client
+        client = self._create_client(server_command, server_args, replicas)
+        try:
+            await client.start_server()
+        except Exception:
+            await client.stop_server()
+            raise
+        self._register_client(name, client, {"command": server_command, "args": server_args, "replicas": replicas})
         logger.info(f"MCP server '{name}' adicionado")
     
+    def _register_client(self, name: str, client, config: Dict[str, Any]):
+        """Guarda o cliente e sua configuração (usada para reinícios)"""
+        self.mcp_clients[name] = client
+        self.server_configs[name] = config
+        self._servers_version += 1
+        if self.supervisor:
+            self.supervisor.watch(name, self._client_factory(name))
+    
+    def _client_factory(self, name: str):
+        config = self.server_configs[name]
+        return lambda: self._create_client(config["command"], config.get("args"), config.get("replicas", 1))
+    
+    def enable_supervision(self, interval: float = 10.0, warm_standby: bool = False, **options):
+        """Passa a monitorar os servers, reiniciando os que caírem (com reserva aquecida opcional)"""
+        if self.supervisor is None:
+            options.setdefault("on_replace", self._on_server_replaced)
+            self.supervisor = MCPSupervisor(self.mcp_clients, interval=interval, warm_standby=warm_standby, **options)
+            for name in self.mcp_clients:
+                self.supervisor.watch(name, self._client_factory(name))
+        self.supervisor.start()
+        return self.supervisor
+    
+    def _on_server_replaced(self, name: str):
+        """O cliente novo pode ter outro catálogo"""
+        self._servers_version += 1
+    
+    async def add_mcp_servers(self, servers: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """
+        Adiciona vários MCP servers iniciando e inicializando todos em paralelo.
+        
+        servers: {"nome": {"command": [...], "args": {...}, "replicas": 1}}
+        Retorna os tempos de inicialização (em segundos) de cada server.
+        """
+        clients = {
+            name: self._create_client(config["command"], config.get("args"), config.get("replicas", 1))
+            for name, config in servers.items()
+        }
+        results = await asyncio.gather(
+            *(client.start_server() for client in clients.values()),
+            return_exceptions=True
+        )
+        
+        timings = {}
+        failed = []
+        for (name, client), result in zip(clients.items(), results):
+            if isinstance(result, Exception):
+                logger.error(f"MCP server '{name}' não iniciou: {result}")
+                timings[name] = {"error": str(result)}
+                failed.append(client)
+                continue
+            self._register_client(name, client, servers[name])
+            timings[name] = client.startup_timings
+            logger.info(f"MCP server '{name}' adicionado em {client.startup_timings.get('total', 0):.2f}s")
+        # Processo, leitura do stderr e transporte dos que falharam não podem ficar para trás
+        await asyncio.gather(*(client.stop_server() for client in failed), return_exceptions=True)
+        return timings
+    
     async def remove_mcp_server(self, name: str):
         """Remove um MCP server"""
         if name in self.mcp_clients:
+            if self.supervisor:
+                await self.supervisor.unwatch(name)
             await self.mcp_clients[name].stop_server()
             del self.mcp_clients[name]
+            self.server_configs.pop(name, None)
+            self._servers_version += 1
             logger.info(f"MCP server '{name}' removido")
     
     async def shutdown(self):
         """Para todos os MCP servers"""
+        if self.supervisor:
+            await self.supervisor.stop()
+            self.supervisor = None
+        await self.conversation_history.flush()
         for name, client in self.mcp_clients.items():
             await client.stop_server()
         self.mcp_clients.clear()
+        self._servers_version += 1
     
     def _get_all_tools(self) -> List[Dict[str, Any]]:
         """Retorna todas as ferramentas de todos os MCP servers"""
         all_tools = []
         for server_name, client in self.mcp_clients.items():
-            tools = client.get_tools_info()
-            for tool in tools:
-                tool['_server'] = server_name  # Adiciona info do server
-                all_tools.append(tool)
+            for tool in client.get_tools_info():
+                # Cópia: o catálogo do cliente não é alterado
+                all_tools.append({**tool, '_server': server_name})
+        if all_tools:
+            # Ferramenta local para paginar resultados truncados
+            all_tools.append({**self.output_limiter.read_tool_info(), '_server': READ_TOOL_SERVER})
         return all_tools
     
+    def _refresh_catalog_version(self) -> int:
+        """Incrementa a versão do catálogo se algum server ou lista de ferramentas mudou"""
+        key = (
+            self._servers_version,
+            tuple((name, client.catalog_version) for name, client in self.mcp_clients.items())
+        )
+        if key != self._catalog_key:
+            self._catalog_key = key
+            self.catalog_version += 1
+            self._catalog_cache.clear()
+        return self.catalog_version
+    
+    def _cached(self, name: str, build):
+        """Memoiza build() enquanto a versão do catálogo não mudar"""
+        self._refresh_catalog_version()
+        if name not in self._catalog_cache:
+            self._catalog_cache[name] = build()
+        return self._catalog_cache[name]
+    
+    def _tool_registry(self) -> ToolRegistry:
+        """Índice server.ferramenta do catálogo atual"""
+        return self._cached("tool_registry", lambda: ToolRegistry(self._get_all_tools()))
+    
     def _build_system_message(self) -> str:
-        """Constrói mensagem de sistema com informações sobre ferramentas"""
-        all_tools = self._get_all_tools()
+        """Constrói mensagem de sistema com informações sobre ferramentas (memoizada por versão do catálogo)"""
+        cache_key = f"system_message:{self.tool_mode}:{self.schema_format}"
+        self._refresh_catalog_version()
+        cached = cache_key in self._catalog_cache
+        entry = self._cached(cache_key, self._render_system_message)
+        
+        self.last_prompt_report = {**entry["report"], "catalog_version": self.catalog_version, "cached": cached}
+        self.tokens_saved_total += entry["report"]["tokens_saved"]
+        if not cached:
+            report = entry["report"]
+            logger.info(
+                f"Prompt de sistema reconstruído (catálogo v{self.catalog_version}): "
+                f"{report['tokens']} tokens, {report['tokens_saved']} economizados por requisição"
+            )
+        return entry["message"]
+    
+    def _render_system_message(self) -> Dict[str, Any]:
+        message = self._compose_system_message(self.schema_format)
+        tokens = count_tokens(message, self.model)
+        baseline = tokens
+        if self.schema_format != "pretty":
+            baseline = count_tokens(self._compose_system_message("pretty"), self.model)
+        return {
+            "message": message,
+            "report": {
+                "schema_format": self.schema_format,
+                "tokens": tokens,
+                "baseline_tokens": baseline,
+                "tokens_saved": baseline - tokens
+            }
+        }
+    
+    def _compose_system_message(self, schema_format: str) -> str:
+        registry = self._tool_registry()
+        all_tools = registry.tools()
         
         if not all_tools:
             return "Você é um assistente IA. Responda às perguntas do usuário da melhor forma possível."
         
+        if self.tool_mode == "native":
+            # As ferramentas vão como definições de função, fora do prompt
+            return "Você é um assistente IA avançado que pode usar ferramentas via MCP (Model Context Protocol). Use as ferramentas quando necessário."
+        
         system_msg = """Você é um assistente IA avançado que pode usar ferramentas via MCP (Model Context Protocol).
 
 Ferramentas disponíveis:
 """
         for tool in all_tools:
             server_name = tool.get('_server', 'unknown')
-            system_msg += f"\n- {tool['name']} (server: {server_name}): {tool.get('description', 'Sem descrição')}"
+            tool_name = registry.exposed_name(server_name, tool['name'])
+            system_msg += f"\n- {tool_name} (server: {server_name}): {tool.get('description', 'Sem descrição')}"
             if 'inputSchema' in tool:
-                system_msg += f"\n  Schema: {json.dumps(tool['inputSchema'], indent=2)}"
+                system_msg += f"\n  Schema: {render_schema(tool['inputSchema'], schema_format)}"
         
         system_msg += """
 
@@ -245,6 +500,8 @@ TOOL_CALL: nome_da_ferramenta
 SERVER: nome_do_server
 PARAMS: {"param1": "valor1", "param2": "valor2"}
 
+A linha SERVER é opcional: use o nome da ferramenta exatamente como listado acima.
+
 Caso contrário, responda normalmente ao usuário.
 """
         return system_msg
@@ -263,29 +520,26 @@ Caso contrário, responda normalmente ao usuário.
             
             messages = [
                 {"role": "system", "content": system_message},
-                *self.conversation_history[-10:]  # Últimas 10 mensagens
+                *self.conversation_history.messages()  # Resumo + mensagens recentes dentro do orçamento
             ]
             
-            # Primeira chamada ao LLM
-            response = await self._call_llm(messages)
-            
-            # Verificar se o LLM quer usar ferramentas
-            tool_calls = self._extract_tool_calls(response)
-            
-            if tool_calls:
-                # Executar ferramentas solicitadas
-                tool_results = await self._execute_tool_calls(tool_calls)
-                
-                # Adicionar resultados ao contexto e fazer nova chamada
-                messages.append({"role": "assistant", "content": response})
-                messages.append({
-                    "role": "user", 
-                    "content": f"Resultados das ferramentas: {json.dumps(tool_results, indent=2, ensure_ascii=False)}"
-                })
-                
-                final_response = await self._call_llm(messages)
+            if self.tool_mode == "native":
+                final_response = await self._run_native_tools(messages)
             else:
-                final_response = response
+                # Primeira chamada ao LLM; cada ferramenta começa a executar assim que seus PARAMS fecham
+                response, tool_calls, tool_results = await self._call_llm_dispatching_tools(messages)
+                
+                if tool_calls:
+                    # Adicionar resultados ao contexto e fazer nova chamada
+                    messages.append({"role": "assistant", "content": response})
+                    messages.append({
+                        "role": "user", 
+                        "content": f"Resultados das ferramentas: {json.dumps(tool_results, indent=2, ensure_ascii=False)}"
+                    })
+                    
+                    final_response = await self._call_llm(messages)
+                else:
+                    final_response = response
             
             # Adicionar resposta ao histórico
             self.conversation_history.append({
@@ -299,95 +553,166 @@ Caso contrário, responda normalmente ao usuário.
             logger.error(f"Erro ao processar mensagem: {e}")
             return f"Desculpe, ocorreu um erro: {str(e)}"
     
+    def _build_tool_definitions(self):
+        """Converte os inputSchema do MCP em definições de função e indexa nome -> (server, ferramenta)"""
+        return self._cached(f"tool_definitions:{self.schema_format}", self._render_tool_definitions)
+    
+    def _render_tool_definitions(self):
+        registry = self._tool_registry()
+        definitions = []
+        index = {}
+        for tool in registry.tools():
+            server_name = tool['_server']
+            # Nomes de função aceitam apenas [a-zA-Z0-9_-]
+            function_name = registry.exposed_name(server_name, tool['name'], separator="__")
+            index[function_name] = (server_name, tool['name'])
+            parameters = tool.get('inputSchema') or {"type": "object", "properties": {}}
+            if self.schema_format == "compact":
+                parameters = compact_schema(parameters)
+            definitions.append({
+                "type": "function",
+                "function": {
+                    "name": function_name,
+                    "description": tool.get('description', ''),
+                    "parameters": parameters
+                }
+            })
+        return definitions, index
+    
+    async def _run_native_tools(self, messages: List[Dict]) -> str:
+        """Executa o laço de function calling nativo até o modelo parar de chamar ferramentas"""
+        definitions, index = self._build_tool_definitions()
+        
+        async def execute(calls: List[Dict]) -> List[Dict]:
+            tool_calls = []
+            for call in calls:
+                server_name, tool_name = index.get(call["name"], (None, call["name"]))
+                tool_calls.append({"tool": tool_name, "server": server_name, "params": call["arguments"]})
+            return await self._execute_tool_calls(tool_calls)
+        
+        final_response, _, _ = await run_tool_loop(
+            self.client,
+            self.model,
+            messages,
+            definitions,
+            execute,
+            max_iterations=self.max_tool_iterations,
+            temperature=0.7,
+            max_tokens=1500
+        )
+        return final_response
+    
     async def _call_llm(self, messages: List[Dict]) -> str:
         """Chama o LLM"""
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
+            return await self.client.complete(
+                self.model,
+                messages,
                 temperature=0.7,
                 max_tokens=1500
             )
-            return response.choices[0].message.content
         except Exception as e:
             logger.error(f"Erro na chamada LLM: {e}")
             raise
     
+    async def _call_llm_dispatching_tools(self, messages: List[Dict]) -> Tuple[str, List[Dict], List[Dict]]:
+        """Chama o LLM em streaming, executando as ferramentas enquanto o restante da resposta é gerado"""
+        try:
+            return await dispatch_streamed_tool_calls(
+                self.client.stream(self.model, messages, temperature=0.7, max_tokens=1500),
+                self._execute_tool_call,
+                accept=self._accept_tool_call
+            )
+        except Exception as e:
+            logger.error(f"Erro na chamada LLM: {e}")
+            raise
+    
+    def _accept_tool_call(self, call: Dict) -> bool:
+        """Chamadas sem nome de ferramenta são ignoradas; o server é resolvido pelo registro"""
+        return bool(call["tool"])
+    
     def _extract_tool_calls(self, response: str) -> List[Dict]:
         """Extrai chamadas de ferramentas da resposta do LLM"""
-        tool_calls = []
-        lines = response.split('\n')
-        
-        i = 0
-        while i < len(lines):
-            if lines[i].startswith("TOOL_CALL:"):
-                tool_name = lines[i].replace("TOOL_CALL:", "").strip()
-                server_name = None
-                params = {}
-                
-                # Procurar SERVER e PARAMS nas próximas linhas
-                j = i + 1
-                while j < len(lines) and j < i + 4:  # Máximo 4 linhas à frente
-                    if lines[j].startswith("SERVER:"):
-                        server_name = lines[j].replace("SERVER:", "").strip()
-                    elif lines[j].startswith("PARAMS:"):
-                        try:
-                            params_str = lines[j].replace("PARAMS:", "").strip()
-                            params = json.loads(params_str)
-                        except json.JSONDecodeError:
-                            logger.error(f"Erro ao parsear parâmetros: {params_str}")
-                    j += 1
-                
-                if server_name:
-                    tool_calls.append({
-                        "tool": tool_name,
-                        "server": server_name,
-                        "params": params
-                    })
-                
-                i = j
-            else:
-                i += 1
-        
-        return tool_calls
+        return [call for call in parse_tool_calls(response) if self._accept_tool_call(call)]
     
     async def _execute_tool_calls(self, tool_calls: List[Dict]) -> List[Dict]:
         """Executa chamadas de ferramentas"""
-        results = []
+        # As chamadas compartilham o mesmo pipe do server, multiplexadas pelo id
+        return list(await asyncio.gather(*(self._execute_tool_call(call) for call in tool_calls)))
+    
+    async def _execute_tool_call(self, call: Dict) -> Dict:
+        """Executa uma chamada de ferramenta"""
+        # O registro resolve o server em O(1), inclusive quando SERVER falta ou está errado
+        server_name, tool_name, error = self._tool_registry().resolve(call["tool"], call.get("server"))
+        params = call["params"]
         
-        for call in tool_calls:
-            tool_name = call["tool"]
-            server_name = call["server"]
-            params = call["params"]
-            
-            if server_name not in self.mcp_clients:
-                results.append({
-                    "tool": tool_name,
-                    "server": server_name,
-                    "error": f"Server '{server_name}' não encontrado"
-                })
-                continue
-            
+        if error:
+            return {
+                "tool": tool_name,
+                "server": server_name,
+                "params": params,
+                "error": error
+            }
+        
+        if server_name == READ_TOOL_SERVER and tool_name == READ_TOOL_NAME:
             try:
-                client = self.mcp_clients[server_name]
-                response = await client.call_tool(tool_name, params)
-                
-                results.append({
+                return {
                     "tool": tool_name,
                     "server": server_name,
                     "params": params,
-                    "result": response.get('result'),
-                    "error": response.get('error')
-                })
-            except Exception as e:
-                results.append({
+                    "result": self.output_limiter.read(params),
+                    "error": None
+                }
+            except (KeyError, ValueError, TypeError) as e:
+                return {
                     "tool": tool_name,
                     "server": server_name,
                     "params": params,
                     "error": str(e)
-                })
+                }
         
-        return results
+        if server_name not in self.mcp_clients:
+            return {
+                "tool": tool_name,
+                "server": server_name,
+                "error": f"Server '{server_name}' não encontrado"
+            }
+        
+        try:
+            client = self.mcp_clients[server_name]
+            response = await client.call_tool(tool_name, params)
+            
+            return {
+                "tool": tool_name,
+                "server": server_name,
+                "params": params,
+                "result": self.output_limiter.limit_result(tool_name, response.get('result')),
+                "error": response.get('error')
+            }
+        except asyncio.TimeoutError:
+            return {
+                "tool": tool_name,
+                "server": server_name,
+                "params": params,
+                "error": "Tempo limite excedido"
+            }
+        except MCPTransportError as e:
+            if self.supervisor:
+                # Não espera a próxima verificação periódica para recuperar o server
+                asyncio.create_task(self.supervisor.check(server_name))
+            return {
+                "tool": tool_name,
+                "server": server_name,
+                "params": params,
+                "error": str(e)
+            }
+        except Exception as e:
+            return {
+                "tool": tool_name,
+                "server": server_name,
+                "params": params,
+                "error": str(e)
+            }
 
 # Exemplo de configuração e uso
 async def main():
@@ -418,10 +743,11 @@ async def main():
         
         # Exemplo de outros MCP servers que você pode adicionar:
         
-        # # Sistema de arquivos
+        # # Sistema de arquivos (4 réplicas do mesmo server, balanceadas)
         # await agent.add_mcp_server(
         #     name="filesystem",
-        #     server_command=["npx", "-y", "@modelcontextprotocol/server-filesystem", "/caminho/para/diretorio"]
+        #     server_command=["npx", "-y", "@modelcontextprotocol/server-filesystem", "/caminho/para/diretorio"],
+        #     replicas=4
         # )
         
         # # GitHub
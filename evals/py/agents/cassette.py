@@ -0,0 +1,362 @@
+import base64
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple, Union
+from urllib.parse import parse_qsl, urlencode
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+MODES = ("record", "replay", "auto")
+MATCHING = ("strict", "lenient")
+
+# Campos que não mudam a resposta esperada, ou mudam a cada execução
+DEFAULT_IGNORED_FIELDS = ("user", "metadata")
+SECRET_QUERY_PARAMS = {"key", "api_key", "apikey", "token", "access_token"}
+KEPT_RESPONSE_HEADERS = ("content-type", "mcp-session-id")
+UUID_PATTERN = re.compile(r"[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}")
+
+
+class CassetteMiss(LookupError):
+    """Requisição sem gravação correspondente no modo replay"""
+
+
+def _normalize(value: Any, ignored_fields: Tuple[str, ...]) -> Any:
+    """Remove campos voláteis e troca UUIDs (ids gerados no cliente) por um marcador"""
+    if isinstance(value, dict):
+        return {key: _normalize(item, ignored_fields) for key, item in value.items() if key not in ignored_fields}
+    if isinstance(value, list):
+        return [_normalize(item, ignored_fields) for item in value]
+    if isinstance(value, str):
+        return UUID_PATTERN.sub("<uuid>", value)
+    return value
+
+
+def _digest(payload: Any) -> str:
+    data = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:32]
+
+
+class Cassette:
+    """
+    Pares requisição/resposta gravados num arquivo JSONL (gzip se terminar em .gz).
+
+    record: sempre chama o serviço real e regrava a cassete
+    replay: nunca chama o serviço real; requisição sem gravação gera CassetteMiss
+    auto:   reaproduz o que existe e grava o que falta
+
+    strict: a requisição normalizada precisa ser idêntica à gravada
+    lenient: sem par idêntico, usa a próxima gravação ainda não usada da mesma rota
+    """
+
+    def __init__(self, path: Union[str, Path], mode: str = "auto", match: str = "strict",
+                 ignored_fields: Tuple[str, ...] = DEFAULT_IGNORED_FIELDS):
+        if mode not in MODES:
+            raise ValueError(f"Modo inválido: {mode} (use {', '.join(MODES)})")
+        if match not in MATCHING:
+            raise ValueError(f"Matching inválido: {match} (use {', '.join(MATCHING)})")
+        self.path = Path(path)
+        self.mode = mode
+        self.match = match
+        self.ignored_fields = tuple(ignored_fields)
+        self.interactions: List[Dict[str, Any]] = []
+        self._by_key: Dict[str, List[int]] = defaultdict(list)
+        self._by_route: Dict[str, List[int]] = defaultdict(list)
+        self._used: set = set()
+        self._key_cursor: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self.stats = {"replayed": 0, "recorded": 0}
+        if mode != "record" and self.path.exists():
+            self._load()
+
+    # ---------- arquivo ----------
+
+    def _open(self, path: Path, mode: str):
+        if self.path.suffix == ".gz":
+            return gzip.open(path, mode + "t", encoding="utf-8")
+        return open(path, mode, encoding="utf-8")
+
+    def _load(self):
+        with self._open(self.path, "r") as f:
+            for line in f:
+                if line.strip():
+                    self._add(json.loads(line))
+        logger.info(f"Cassete {self.path}: {len(self.interactions)} interações")
+
+    def save(self):
+        if self.stats["recorded"] == 0:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with self._open(tmp_path, "w") as f:
+            for interaction in self.interactions:
+                f.write(json.dumps(interaction, ensure_ascii=False, separators=(",", ":")) + "\n")
+        tmp_path.replace(self.path)
+        logger.info(f"Cassete {self.path} gravada ({self.stats['recorded']} novas interações)")
+
+    # ---------- busca e gravação ----------
+
+    def _add(self, interaction: Dict[str, Any]):
+        index = len(self.interactions)
+        self.interactions.append(interaction)
+        self._by_key[interaction["key"]].append(index)
+        self._by_route[interaction["route"]].append(index)
+
+    def request_key(self, route: str, request: Dict[str, Any]) -> str:
+        return _digest({"route": route, "request": _normalize(request, self.ignored_fields)})
+
+    def lookup(self, route: str, request: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if self.mode == "record":
+            return None
+        key = self.request_key(route, request)
+        with self._lock:
+            candidates = self._by_key.get(key)
+            if candidates:
+                # Requisições repetidas recebem as respostas na ordem em que foram gravadas
+                cursor = self._key_cursor[key]
+                index = candidates[min(cursor, len(candidates) - 1)]
+                self._key_cursor[key] = cursor + 1
+            elif self.match == "lenient":
+                index = next((i for i in self._by_route.get(route, ()) if i not in self._used), None)
+                if index is None:
+                    return None
+            else:
+                return None
+            self._used.add(index)
+            self.stats["replayed"] += 1
+            return self.interactions[index]["response"]
+
+    def record(self, route: str, request: Dict[str, Any], response: Dict[str, Any]):
+        normalized = _normalize(request, self.ignored_fields)
+        interaction = {
+            "key": _digest({"route": route, "request": normalized}),
+            "route": route,
+            "request": normalized,
+            "response": response,
+        }
+        with self._lock:
+            self._add(interaction)
+            self._used.add(len(self.interactions) - 1)
+            self.stats["recorded"] += 1
+
+    def miss(self, route: str, request: Dict[str, Any]) -> CassetteMiss:
+        message = (
+            f"Sem gravação para {route} em {self.path} (modo {self.mode}, matching {self.match}); "
+            f"grave com mode='record' ou 'auto'. Chave: {self.request_key(route, request)}"
+        )
+        # Clientes como o da OpenAI embrulham a exceção num erro de conexão genérico
+        logger.error(message)
+        return CassetteMiss(message)
+
+
+# ---------- HTTP (OpenAI, ChatOpenAI, LiteLlm e MCP via streamable HTTP) ----------
+
+def _http_request(request: httpx.Request) -> Tuple[str, Dict[str, Any]]:
+    query = [(name, value) for name, value in parse_qsl(request.url.query.decode()) if name.lower() not in SECRET_QUERY_PARAMS]
+    route = f"http {request.method} {request.url.scheme}://{request.url.netloc.decode()}{request.url.path}"
+    try:
+        raw = request.content
+    except httpx.RequestNotRead:
+        raw = request.read()
+    try:
+        body = json.loads(raw) if raw else None
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        body = hashlib.sha256(raw).hexdigest()
+    # Cabeçalhos (inclusive autorização) nunca entram na cassete
+    return route, {"query": urlencode(query), "body": body}
+
+
+def _is_event_stream_get(request: httpx.Request) -> bool:
+    # GET de notificações do MCP: conexão longa, sem resposta a gravar
+    return request.method == "GET" and "text/event-stream" in request.headers.get("accept", "")
+
+
+def _serialize_response(response: httpx.Response) -> Dict[str, Any]:
+    headers = {name: response.headers[name] for name in KEPT_RESPONSE_HEADERS if name in response.headers}
+    data: Dict[str, Any] = {"status": response.status_code, "headers": headers}
+    content_type = headers.get("content-type", "")
+    if "json" in content_type:
+        try:
+            data["json"] = json.loads(response.content)
+            return data
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            pass
+    if content_type.startswith("text/") or "event-stream" in content_type:
+        data["text"] = response.text
+    else:
+        data["base64"] = base64.b64encode(response.content).decode("ascii")
+    return data
+
+
+def _build_response(data: Dict[str, Any], request: httpx.Request) -> httpx.Response:
+    if "json" in data:
+        content = json.dumps(data["json"], ensure_ascii=False).encode("utf-8")
+    elif "text" in data:
+        content = data["text"].encode("utf-8")
+    else:
+        content = base64.b64decode(data.get("base64", ""))
+    return httpx.Response(data["status"], headers=data.get("headers", {}), content=content, request=request)
+
+
+# ---------- MCP via stdio (ExternalMCPClient) ----------
+
+class _ReplayProcess:
+    returncode = None
+
+    def terminate(self):
+        self.returncode = 0
+
+    async def wait(self):
+        return self.returncode
+
+
+class _ReplayTransport:
+    """Transporte sem processo: as requisições são respondidas pela cassete"""
+
+    def __init__(self):
+        self.is_open = True
+
+    def on_notification(self, method, handler):
+        pass
+
+    def start(self):
+        pass
+
+    async def notify(self, method, params=None):
+        pass
+
+    async def close(self):
+        self.is_open = False
+
+
+def _mcp_request(client, message) -> Tuple[str, Dict[str, Any]]:
+    # Só o nome de cada parte do comando: a cassete vale em outras máquinas
+    command = " ".join(Path(part).name for part in client.server_command)
+    route = f"mcp {command} {message.method}"
+    return route, {"params": message.params}
+
+
+_active: Optional[Cassette] = None
+
+
+def _install(cassette: Cassette) -> List[Tuple[Any, str, Any]]:
+    originals: List[Tuple[Any, str, Any]] = []
+
+    def patch(owner, name, replacement):
+        originals.append((owner, name, getattr(owner, name)))
+        setattr(owner, name, replacement)
+
+    sync_send = httpx.Client.send
+    async_send = httpx.AsyncClient.send
+
+    def send(client, request, **kwargs):
+        if _is_event_stream_get(request):
+            if cassette.mode == "replay":
+                return httpx.Response(405, request=request)
+            return sync_send(client, request, **kwargs)
+        route, normalized = _http_request(request)
+        recorded = cassette.lookup(route, normalized)
+        if recorded is not None:
+            return _build_response(recorded, request)
+        if cassette.mode == "replay":
+            raise cassette.miss(route, normalized)
+        response = sync_send(client, request, **kwargs)
+        response.read()
+        cassette.record(route, normalized, _serialize_response(response))
+        return response
+
+    async def a_send(client, request, **kwargs):
+        if _is_event_stream_get(request):
+            if cassette.mode == "replay":
+                return httpx.Response(405, request=request)
+            return await async_send(client, request, **kwargs)
+        route, normalized = _http_request(request)
+        recorded = cassette.lookup(route, normalized)
+        if recorded is not None:
+            return _build_response(recorded, request)
+        if cassette.mode == "replay":
+            raise cassette.miss(route, normalized)
+        response = await async_send(client, request, **kwargs)
+        # Respostas em stream (SSE) são lidas por inteiro para a gravação
+        await response.aread()
+        cassette.record(route, normalized, _serialize_response(response))
+        return response
+
+    patch(httpx.Client, "send", send)
+    patch(httpx.AsyncClient, "send", a_send)
+
+    try:
+        from agent_mcp import ExternalMCPClient
+    except ImportError:
+        return originals
+
+    send_message = ExternalMCPClient._send_message
+    start_server = ExternalMCPClient.start_server
+
+    async def mcp_send_message(client, message, timeout=None):
+        route, normalized = _mcp_request(client, message)
+        recorded = cassette.lookup(route, normalized)
+        if recorded is not None:
+            return recorded
+        if cassette.mode == "replay":
+            raise cassette.miss(route, normalized)
+        response = await send_message(client, message, timeout=timeout)
+        # O id da requisição muda a cada execução; a resposta é gravada sem ele
+        cassette.record(route, normalized, {key: value for key, value in response.items() if key != "id"})
+        return response
+
+    async def mcp_start_server(client, fetch_catalog: bool = True):
+        if cassette.mode != "replay":
+            return await start_server(client, fetch_catalog)
+        client.process = _ReplayProcess()
+        client.transport = _ReplayTransport()
+        client.startup_timings = {}
+        await client._initialize_connection(fetch_catalog)
+
+    patch(ExternalMCPClient, "_send_message", mcp_send_message)
+    patch(ExternalMCPClient, "start_server", mcp_start_server)
+    return originals
+
+
+def cassette_path(test_file: Union[str, Path], test_name: str) -> Path:
+    """Cassete de um teste do pytest: cassettes/<módulo>/<teste>.jsonl.gz, ao lado do arquivo de teste"""
+    test_file = Path(test_file)
+    # Testes parametrizados têm colchetes e espaços no nome
+    name = re.sub(r"[^\w.-]+", "_", test_name).strip("_")
+    return test_file.parent / "cassettes" / test_file.stem / f"{name}.jsonl.gz"
+
+
+@contextmanager
+def use_cassette(path: Union[str, Path], mode: Optional[str] = None, match: Optional[str] = None, **options):
+    """
+    Grava ou reproduz todo o tráfego HTTP (clientes OpenAI, ChatOpenAI, LiteLlm, MCP
+    streamable HTTP) e as chamadas do ExternalMCPClient dentro do bloco.
+    Padrões de modo e matching vêm de EVAL_CASSETTE_MODE e EVAL_CASSETTE_MATCH.
+    """
+    global _active
+    if _active is not None:
+        raise RuntimeError(f"Já existe uma cassete ativa: {_active.path}")
+    cassette = Cassette(
+        path,
+        mode=mode or os.getenv("EVAL_CASSETTE_MODE", "auto"),
+        match=match or os.getenv("EVAL_CASSETTE_MATCH", "strict"),
+        **options
+    )
+    originals = _install(cassette)
+    _active = cassette
+    try:
+        yield cassette
+    finally:
+        for owner, name, original in reversed(originals):
+            setattr(owner, name, original)
+        _active = None
+        cassette.save()
@@ -0,0 +1,190 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Callable, Awaitable
+
+from tool_catalog import count_tokens
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_MESSAGES = 20
+DEFAULT_TOKEN_BUDGET = 4000
+DEFAULT_SUMMARY_CHARS = 2000
+
+# Recebe o resumo atual e as mensagens removidas; devolve o novo resumo
+Summarizer = Callable[[str, List[Dict[str, Any]]], Awaitable[str]]
+
+
+def truncate_summary(summary: str, messages: List[Dict[str, Any]], max_chars: int = DEFAULT_SUMMARY_CHARS) -> str:
+    """Resumo sem LLM: primeira linha de cada mensagem, mantendo o final quando passa do limite"""
+    lines = [summary] if summary else []
+    for message in messages:
+        content = str(message.get("content") or "").strip()
+        first_line = content.splitlines()[0][:200] if content else ""
+        lines.append(f"{message.get('role', '?')}: {first_line}")
+    text = "\n".join(lines)
+    return text[-max_chars:]
+
+
+class ConversationMemory:
+    """
+    Histórico limitado da conversa: as mensagens recentes ficam num buffer circular
+    e as que saem dele são condensadas num resumo, gerado em segundo plano.
+    Uma mensagem com tool_calls e os resultados "tool" que a seguem saem e entram juntos.
+    """
+
+    def __init__(
+        self,
+        max_messages: int = DEFAULT_MAX_MESSAGES,
+        token_budget: int = DEFAULT_TOKEN_BUDGET,
+        summarizer: Optional[Summarizer] = None,
+        persist_path: Optional[str] = None,
+        model: Optional[str] = None,
+    ):
+        self.recent: deque = deque(maxlen=max_messages)
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.model = model
+        self.summary = ""
+        self.persist_path = Path(persist_path) if persist_path else None
+        self._evicted: List[Dict[str, Any]] = []
+        self._summary_task: Optional[asyncio.Task] = None
+        if self.persist_path and self.persist_path.exists():
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self.recent)
+
+    def append(self, message: Dict[str, Any]):
+        """Adiciona uma mensagem; a mais antiga sai do buffer e vai para o resumo"""
+        if len(self.recent) == self.recent.maxlen:
+            self._evict()
+        self.recent.append(message)
+        if self._evicted:
+            self._schedule_summary()
+        self.save()
+
+    def _evict(self):
+        self._evicted.append(self.recent.popleft())
+        # Resultados de ferramenta não ficam no buffer sem a chamada que os gerou
+        while self.recent and self.recent[0].get("role") == "tool":
+            self._evicted.append(self.recent.popleft())
+
+    def messages(self) -> List[Dict[str, Any]]:
+        """Mensagens a enviar ao LLM: resumo (se houver) e as mais recentes que cabem no orçamento"""
+        budget = self.token_budget
+        summary_message = None
+        if self.summary:
+            summary_message = {"role": "system", "content": f"Resumo da conversa anterior:\n{self.summary}"}
+            budget -= count_tokens(summary_message["content"], self.model)
+
+        selected: List[Dict[str, Any]] = []
+        group: List[Dict[str, Any]] = []
+        group_tokens = 0
+        for message in reversed(self.recent):
+            group.append(message)
+            group_tokens += count_tokens(str(message.get("content") or ""), self.model)
+            if message.get("role") == "tool":
+                # Resultados só entram junto com a mensagem que fez as chamadas
+                continue
+            # A mensagem mais recente (com seus resultados) sempre vai, mesmo acima do orçamento
+            if selected and group_tokens > budget:
+                break
+            budget -= group_tokens
+            selected.extend(group)
+            group, group_tokens = [], 0
+        selected.reverse()
+
+        return [summary_message, *selected] if summary_message else selected
+
+    def _schedule_summary(self):
+        if self._summary_task and not self._summary_task.done():
+            return
+        try:
+            self._summary_task = asyncio.get_running_loop().create_task(self._summarize_pending())
+        except RuntimeError:
+            # Fora de um event loop: resume na hora, sem LLM
+            batch, self._evicted = self._evicted, []
+            self._fold(truncate_summary(self.summary, batch))
+
+    async def _summarize_pending(self):
+        while self._evicted:
+            # Continuam em _evicted (e no arquivo) até entrarem no resumo
+            batch = list(self._evicted)
+            try:
+                if self.summarizer:
+                    summary = await self.summarizer(self.summary, batch)
+                else:
+                    summary = truncate_summary(self.summary, batch)
+            except Exception as e:
+                logger.warning(f"Falha ao resumir a conversa ({e}); usando resumo truncado")
+                summary = truncate_summary(self.summary, batch)
+            self._evicted = self._evicted[len(batch):]
+            self._fold(summary)
+
+    def _fold(self, summary: str):
+        self.summary = summary
+        self.save()
+
+    async def flush(self):
+        """Aguarda o resumo das mensagens já removidas, retomando um resumo cancelado"""
+        while self._evicted:
+            if self._summary_task is None or self._summary_task.done():
+                self._summary_task = asyncio.get_running_loop().create_task(self._summarize_pending())
+            # wait não propaga o cancelamento da task de resumo: as mensagens seguem pendentes
+            await asyncio.wait({self._summary_task})
+
+    def clear(self):
+        self.recent.clear()
+        self.summary = ""
+        self._evicted = []
+        self.save()
+
+    def save(self):
+        """Grava buffer e resumo em disco, se houver caminho configurado"""
+        if not self.persist_path:
+            return
+        self.persist_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.persist_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({
+            "summary": self.summary,
+            "pending": self._evicted,
+            "recent": list(self.recent)
+        }, ensure_ascii=False), encoding="utf-8")
+        tmp_path.replace(self.persist_path)
+
+    def load(self):
+        """Restaura buffer e resumo gravados"""
+        data = json.loads(self.persist_path.read_text(encoding="utf-8"))
+        self.summary = data.get("summary", "")
+        self._evicted = data.get("pending", [])
+        self.recent.clear()
+        self.recent.extend(data.get("recent", []))
+        logger.info(f"Memória restaurada de {self.persist_path} ({len(self.recent)} mensagens)")
+
+
+SUMMARY_PROMPT = (
+    "Resuma a conversa de forma concisa, preservando fatos, decisões, "
+    "resultados de ferramentas e pedidos do usuário ainda relevantes."
+)
+
+
+def llm_summarizer(client, model: str, max_tokens: int = 300, max_message_chars: int = 2000) -> Summarizer:
+    """Summarizer que usa o cliente LLM do agente (AsyncLLMClient)"""
+    async def summarize(summary: str, messages: List[Dict[str, Any]]) -> str:
+        transcript = "\n".join(
+            f"{message.get('role', '?')}: {str(message.get('content') or '')[:max_message_chars]}"
+            for message in messages
+        )
+        return await client.complete(
+            model,
+            [
+                {"role": "system", "content": SUMMARY_PROMPT},
+                {"role": "user", "content": f"Resumo atual:\n{summary or '(vazio)'}\n\nNovas mensagens:\n{transcript}"}
+            ],
+            temperature=0,
+            max_tokens=max_tokens
+        )
+    return summarize
@@ -0,0 +1,184 @@
+import argparse
+import json
+import math
+import sys
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+
+from eval_runner import read_results
+
+METRICS = ("elapsed_s", "llm_calls", "prompt_tokens", "completion_tokens", "tool_calls", "cost_usd")
+STATS = ("p50", "p95", "total")
+
+# Aumento relativo tolerado antes de acusar regressão; latência varia mais que tokens
+DEFAULT_THRESHOLDS = {
+    "elapsed_s": 0.25,
+    "llm_calls": 0.10,
+    "prompt_tokens": 0.10,
+    "completion_tokens": 0.15,
+    "tool_calls": 0.10,
+    "cost_usd": 0.10,
+}
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Percentil com interpolação linear (q entre 0 e 100)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q / 100
+    lower, upper = math.floor(position), math.ceil(position)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def case_cost(usage: Dict[str, Any], prices: Dict[str, Dict[str, float]]) -> Optional[float]:
+    """Custo em USD a partir de preços por milhão de tokens, por modelo"""
+    if not prices:
+        return None
+    cost = 0.0
+    for model, tokens in (usage.get("models") or {}).items():
+        price = prices.get(model) or prices.get("*")
+        if price:
+            cost += tokens["prompt_tokens"] * price.get("prompt", 0) / 1e6
+            cost += tokens["completion_tokens"] * price.get("completion", 0) / 1e6
+    return cost
+
+
+def case_values(record: Dict[str, Any], prices: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    usage = record.get("usage") or {}
+    values = {
+        "elapsed_s": record.get("elapsed_s", 0.0),
+        "llm_calls": usage.get("llm_calls", 0),
+        "prompt_tokens": usage.get("prompt_tokens", 0),
+        "completion_tokens": usage.get("completion_tokens", 0),
+        "tool_calls": usage.get("tool_calls", 0),
+    }
+    cost = case_cost(usage, prices)
+    if cost is not None:
+        values["cost_usd"] = cost
+    return values
+
+
+def summarize(records: List[Dict[str, Any]], prices: Optional[Dict[str, Dict[str, float]]] = None) -> Dict[str, Any]:
+    """p50, p95 e total de cada métrica nos casos concluídos com sucesso"""
+    ok = [case_values(record, prices or {}) for record in records if record.get("status") == "ok"]
+    metrics = {}
+    for name in METRICS:
+        values = [case[name] for case in ok if name in case]
+        if not values:
+            continue
+        metrics[name] = {
+            "p50": round(percentile(values, 50), 6),
+            "p95": round(percentile(values, 95), 6),
+            "total": round(sum(values), 6),
+        }
+    return {
+        "cases": len(records),
+        "ok": len(ok),
+        "without_usage": sum((record.get("usage") or {}).get("calls_without_usage", 0) for record in records),
+        "metrics": metrics,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], thresholds: Dict[str, float]) -> List[Dict[str, Any]]:
+    """Linhas da comparação; `regression` indica aumento acima do limite da métrica"""
+    rows = []
+    # Casos que falharam somem das métricas: menos casos concluídos é regressão por si só
+    base_ok = baseline.get("ok", 0)
+    if current["ok"] < current["cases"] or current["ok"] < base_ok:
+        rows.append({
+            "metric": "casos_ok", "stat": "ok", "baseline": base_ok, "current": current["ok"],
+            "change": (current["ok"] - base_ok) / base_ok if base_ok else None, "threshold": 0.0,
+            "regression": True,
+        })
+    # Totais só são comparáveis com o mesmo número de casos
+    same_cases = current["ok"] == baseline.get("ok")
+    for name, stats in current["metrics"].items():
+        base_stats = baseline.get("metrics", {}).get(name)
+        if base_stats is None:
+            continue
+        limit = thresholds.get(name, DEFAULT_THRESHOLDS.get(name, 0.10))
+        for stat in STATS:
+            if stat == "total" and not same_cases:
+                continue
+            value, base = stats[stat], base_stats.get(stat, 0)
+            # Baseline zerada (ex.: tokens não medidos) não tem variação relativa nem regressão
+            change = (value - base) / base if base else None
+            rows.append({
+                "metric": name, "stat": stat, "baseline": base, "current": value,
+                "change": change, "threshold": limit, "regression": change is not None and change > limit,
+            })
+    return rows
+
+
+def _format_change(change: Optional[float]) -> str:
+    return "sem base" if change is None else f"{change:+.1%}"
+
+
+def render(current: Dict[str, Any], rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{current['ok']}/{current['cases']} casos concluídos"]
+    if current["ok"] < current["cases"]:
+        lines.append(f"❌ {current['cases'] - current['ok']} casos falharam e ficaram fora das métricas")
+    if current["without_usage"]:
+        lines.append(f"⚠️ {current['without_usage']} chamadas ao LLM sem contagem de tokens na resposta")
+    if not rows:
+        for name, stats in current["metrics"].items():
+            lines.append(f"{name:<18} p50={stats['p50']:<10g} p95={stats['p95']:<10g} total={stats['total']:g}")
+        return "\n".join(lines)
+    lines.append(f"{'métrica':<18} {'stat':<6} {'baseline':>12} {'atual':>12} {'variação':>10}")
+    for row in rows:
+        flag = "❌" if row["regression"] else "  "
+        lines.append(
+            f"{row['metric']:<18} {row['stat']:<6} {row['baseline']:>12g} {row['current']:>12g} "
+            f"{_format_change(row['change']):>10} {flag}"
+        )
+    regressions = [row for row in rows if row["regression"]]
+    lines.append(f"\n{len(regressions)} regressões acima do limite" if regressions else "\nSem regressões")
+    return "\n".join(lines)
+
+
+def _default_baseline(results_path: Path) -> Path:
+    name = results_path.name
+    stem = name[:-len(".results.jsonl")] if name.endswith(".results.jsonl") else results_path.stem
+    return results_path.with_name(f"{stem}.baseline.json")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência, tokens e chamadas por caso, comparados a um baseline")
+    parser.add_argument("results", help="JSONL gerado pelo eval_runner")
+    parser.add_argument("--baseline", default=None, help="Arquivo de baseline (padrão: <cases>.baseline.json)")
+    parser.add_argument("--update-baseline", action="store_true", help="Grava o resumo atual como baseline")
+    parser.add_argument("--threshold", action="append", default=[], metavar="METRICA=RAZAO",
+                        help="Aumento tolerado, ex.: prompt_tokens=0.05 (repetível)")
+    parser.add_argument("--prices", default=None, help="JSON {modelo: {prompt, completion}} em USD por milhão de tokens")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    results_path = Path(args.results)
+    baseline_path = Path(args.baseline) if args.baseline else _default_baseline(results_path)
+    prices = json.loads(Path(args.prices).read_text(encoding="utf-8")) if args.prices else {}
+    current = summarize(list(read_results(results_path).values()), prices)
+
+    baseline = None
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+    thresholds = {**DEFAULT_THRESHOLDS, **((baseline or {}).get("thresholds") or {})}
+    for item in args.threshold:
+        name, _, ratio = item.partition("=")
+        thresholds[name] = float(ratio)
+
+    rows = compare(current, baseline, thresholds) if baseline else []
+    if args.json:
+        print(json.dumps({"current": current, "comparison": rows}, ensure_ascii=False, default=str))
+    else:
+        print(render(current, rows))
+
+    if args.update_baseline:
+        baseline_path.write_text(json.dumps({**current, "thresholds": thresholds}, indent=2), encoding="utf-8")
+        print(f"Baseline gravado em {baseline_path}")
+    elif any(row["regression"] for row in rows) or current["ok"] < current["cases"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import argparse
+import asyncio
+import hashlib
+import importlib
+import importlib.util
+import inspect
+import json
+import logging
+import sys
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Callable, Iterable
+
+from cassette import use_cassette, MODES, MATCHING
+from llm_meter import install_meter, track_case
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONCURRENCY = 8
+
+# Recebe o caso (dict do JSONL) e devolve ao menos {"actual_output", "tools_called"}
+Target = Callable[[Dict[str, Any]], Any]
+
+
+def case_id(case: Dict[str, Any]) -> str:
+    """Id explícito do caso ou hash do seu conteúdo"""
+    if case.get("id") is not None:
+        return str(case["id"])
+    return hashlib.sha256(json.dumps(case, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+def load_cases(path: str) -> List[Dict[str, Any]]:
+    cases = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("//"):
+                continue
+            try:
+                case = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}:{line_number}: caso inválido ({e})") from e
+            case.setdefault("id", case_id(case))
+            cases.append(case)
+    return cases
+
+
+def load_target(spec: str) -> Target:
+    """
+    Resolve "arquivo.py:funcao" ou "modulo:funcao".
+    A pasta do arquivo entra no sys.path, pois os agentes importam módulos vizinhos pelo nome.
+    """
+    module_ref, _, attribute = spec.rpartition(":")
+    if not module_ref or not attribute:
+        raise ValueError(f"Target deve ter o formato 'arquivo.py:funcao' ({spec})")
+    if module_ref.endswith(".py"):
+        path = Path(module_ref).resolve()
+        sys.path.insert(0, str(path.parent))
+        module_spec = importlib.util.spec_from_file_location(path.stem, path)
+        module = importlib.util.module_from_spec(module_spec)
+        sys.modules[path.stem] = module
+        module_spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(module_ref)
+    return getattr(module, attribute)
+
+
+def read_results(path: Path) -> Dict[str, Dict[str, Any]]:
+    """Último resultado de cada caso; linhas truncadas por uma interrupção são ignoradas"""
+    results: Dict[str, Dict[str, Any]] = {}
+    if not path.exists():
+        return results
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if isinstance(record, dict) and "id" in record:
+                results[str(record["id"])] = record
+    return results
+
+
+class EvalRunner:
+    """
+    Executa casos de avaliação em paralelo (até `concurrency` por vez) e grava cada
+    resultado assim que termina num arquivo JSONL append-only. Ao reiniciar, casos
+    já concluídos com sucesso no arquivo são pulados.
+    """
+
+    def __init__(
+        self,
+        target: Target,
+        results_path: str,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        timeout: Optional[float] = None,
+        retry_errors: bool = True,
+    ):
+        self.target = target
+        self.results_path = Path(results_path)
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.retry_errors = retry_errors
+        self._results_file = None
+
+    def _is_done(self, record: Optional[Dict[str, Any]]) -> bool:
+        if record is None:
+            return False
+        return record.get("status") == "ok" or not self.retry_errors
+
+    async def run(self, cases: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Roda os casos pendentes e devolve os resultados de todos os casos, na ordem de entrada"""
+        cases = list(cases)
+        previous = read_results(self.results_path)
+        pending = [case for case in cases if not self._is_done(previous.get(case_id(case)))]
+        logger.info(f"{len(cases) - len(pending)} casos já concluídos, {len(pending)} pendentes")
+
+        self.results_path.parent.mkdir(parents=True, exist_ok=True)
+        self._open_results()
+        queue: asyncio.Queue = asyncio.Queue()
+        for case in pending:
+            queue.put_nowait(case)
+        finished: Dict[str, Dict[str, Any]] = {}
+        started = time.perf_counter()
+
+        async def worker():
+            while True:
+                try:
+                    case = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                record = await self._run_case(case)
+                self._append(record)
+                finished[record["id"]] = record
+                logger.info(
+                    f"[{len(finished)}/{len(pending)}] {record['id']}: {record['status']} "
+                    f"({record['elapsed_s']:.1f}s)"
+                )
+
+        try:
+            with install_meter():
+                await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(pending)) or 1)))
+        finally:
+            self._close_results()
+
+        elapsed = time.perf_counter() - started
+        errors = sum(record["status"] != "ok" for record in finished.values())
+        logger.info(f"{len(finished)} casos executados em {elapsed:.1f}s ({errors} com erro)")
+
+        merged = {**previous, **finished}
+        return [merged[case_id(case)] for case in cases if case_id(case) in merged]
+
+    async def _run_case(self, case: Dict[str, Any]) -> Dict[str, Any]:
+        record: Dict[str, Any] = {"id": case_id(case), "input": case.get("input")}
+        started = time.perf_counter()
+        # Chamadas ao LLM feitas pelo caso (inclusive em threads e tasks filhas) entram no seu uso
+        with track_case() as usage:
+            try:
+                if inspect.iscoroutinefunction(self.target):
+                    call = self.target(case)
+                else:
+                    # Targets síncronos (ex.: graph.invoke) rodam em threads para não travar o loop
+                    call = asyncio.to_thread(self.target, case)
+                output = await asyncio.wait_for(call, self.timeout)
+                if not isinstance(output, dict):
+                    output = {"actual_output": output}
+                record.update(output)
+                record["status"] = "ok"
+            except asyncio.TimeoutError:
+                record["status"] = "timeout"
+                record["error"] = f"Tempo limite de {self.timeout}s excedido"
+            except Exception as e:
+                record["status"] = "error"
+                record["error"] = f"{type(e).__name__}: {e}"
+        record["elapsed_s"] = round(time.perf_counter() - started, 4)
+        record["usage"] = {
+            **usage.to_dict(),
+            "tool_calls": len(record.get("tool_calls") or record.get("tools_called") or []),
+        }
+        record["finished_at"] = time.time()
+        return record
+
+    def _open_results(self):
+        # Uma interrupção no meio de uma escrita deixa a última linha sem "\n"
+        needs_newline = False
+        if self.results_path.exists() and self.results_path.stat().st_size > 0:
+            with open(self.results_path, "rb") as f:
+                f.seek(-1, 2)
+                needs_newline = f.read(1) != b"\n"
+        self._results_file = open(self.results_path, "a", encoding="utf-8")
+        if needs_newline:
+            self._results_file.write("\n")
+
+    def _append(self, record: Dict[str, Any]):
+        self._results_file.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+        self._results_file.flush()
+
+    def _close_results(self):
+        if self._results_file is not None:
+            self._results_file.close()
+            self._results_file = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Executa casos de avaliação (JSONL) em paralelo")
+    parser.add_argument("cases", help="Arquivo JSONL com um caso por linha")
+    parser.add_argument("--target", default="test_agent.py:run_case", help="arquivo.py:funcao que executa um caso")
+    parser.add_argument("--results", default=None, help="JSONL de resultados (padrão: <cases>.results.jsonl)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    parser.add_argument("--timeout", type=float, default=None, help="Tempo limite por caso, em segundos")
+    parser.add_argument("--no-retry-errors", action="store_true", help="Não reexecuta casos que falharam")
+    parser.add_argument("--cassette", default=None, help="Grava/reproduz o tráfego de LLM e MCP (ex.: cases.cassette.jsonl.gz)")
+    parser.add_argument("--cassette-mode", choices=MODES, default=None)
+    parser.add_argument("--cassette-match", choices=MATCHING, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    results_path = args.results or str(Path(args.cases).with_suffix(".results.jsonl"))
+    runner = EvalRunner(
+        load_target(args.target),
+        results_path,
+        concurrency=args.concurrency,
+        timeout=args.timeout,
+        retry_errors=not args.no_retry_errors,
+    )
+    cassette = use_cassette(args.cassette, args.cassette_mode, args.cassette_match) if args.cassette else nullcontext()
+    with cassette:
+        results = asyncio.run(runner.run(load_cases(args.cases)))
+    ok = sum(result["status"] == "ok" for result in results)
+    print(f"{ok}/{len(results)} casos concluídos; resultados em {results_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from enum import Enum
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Union
+
+from deepeval.metrics import BaseMetric
+from deepeval.metrics.utils import copy_metrics
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent / ".judge_cache.sqlite"
+
+# Campos que a métrica preenche ao medir: não fazem parte da configuração
+RESULT_FIELDS = {
+    "score", "score_breakdown", "reason", "success", "error", "evaluation_cost",
+    "verbose_logs", "skipped", "model", "using_native_model",
+}
+TEST_CASE_FIELDS = (
+    "input", "actual_output", "expected_output", "context", "retrieval_context",
+    "tools_called", "expected_tools",
+)
+
+
+def _plain(value: Any) -> Any:
+    """Converte enums, modelos pydantic e coleções em JSON estável"""
+    if isinstance(value, Enum):
+        return value.value
+    if hasattr(value, "model_dump"):
+        return _plain(value.model_dump())
+    if isinstance(value, dict):
+        return {str(key): _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return repr(value)
+
+
+def metric_config(metric: BaseMetric) -> Dict[str, Any]:
+    """Classe, modelo juiz e parâmetros da métrica (critério, limiar, etc.)"""
+    config = {
+        key: _plain(value) for key, value in sorted(vars(metric).items())
+        if key not in RESULT_FIELDS and not key.startswith("_")
+    }
+    config["class"] = type(metric).__name__
+    config["evaluation_model"] = getattr(metric, "evaluation_model", None)
+    return config
+
+
+def verdict_key(metric: BaseMetric, test_case) -> str:
+    payload = {
+        "metric": metric_config(metric),
+        "test_case": {field: _plain(getattr(test_case, field, None)) for field in TEST_CASE_FIELDS},
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class JudgeCache:
+    """Veredictos de métricas LLM em SQLite, para não repetir chamadas ao juiz"""
+
+    def __init__(self, path: Union[str, Path] = DEFAULT_CACHE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False)
+        # WAL: várias execuções de avaliação podem ler e gravar ao mesmo tempo
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            " key TEXT PRIMARY KEY, metric TEXT, score REAL, success INTEGER,"
+            " reason TEXT, details TEXT, created_at REAL)"
+        )
+        self._connection.commit()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT score, success, reason, details FROM verdicts WHERE key = ?", (key,)
+            ).fetchone()
+            # Contadores sob o mesmo lock: o wrapper é compartilhado entre threads do evaluate()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        score, success, reason, details = row
+        return {"score": score, "success": bool(success), "reason": reason, **json.loads(details or "{}")}
+
+    def put(self, key: str, metric_name: str, verdict: Dict[str, Any]):
+        details = {
+            "score_breakdown": verdict.get("score_breakdown"),
+            "verbose_logs": verdict.get("verbose_logs"),
+            "evaluation_cost": verdict.get("evaluation_cost"),
+        }
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO verdicts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, metric_name, verdict["score"], int(bool(verdict["success"])), verdict.get("reason"),
+                 json.dumps(_plain(details), ensure_ascii=False), time.time())
+            )
+            self._connection.commit()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+_default_caches: Dict[Path, JudgeCache] = {}
+
+
+def default_cache(path: Union[str, Path] = DEFAULT_CACHE_PATH) -> JudgeCache:
+    path = Path(path).resolve()
+    if path not in _default_caches:
+        _default_caches[path] = JudgeCache(path)
+    return _default_caches[path]
+
+
+class CachedMetric(BaseMetric):
+    """
+    Envolve uma métrica do deepeval: o juiz só é chamado quando a configuração da
+    métrica ou os campos do test case mudaram desde a última avaliação.
+    """
+
+    def __init__(self, metric: BaseMetric, cache: Optional[JudgeCache] = None):
+        self.metric = metric
+        self.cache = cache or default_cache()
+        self.threshold = metric.threshold
+        self.evaluation_model = getattr(metric, "evaluation_model", None)
+        self.strict_mode = metric.strict_mode
+        self.async_mode = metric.async_mode
+        self.verbose_mode = metric.verbose_mode
+        self.include_reason = metric.include_reason
+        self.cached = False
+
+    @property
+    def __name__(self):
+        return self.metric.__name__
+
+    def _restore(self, verdict: Dict[str, Any]) -> float:
+        self.cached = True
+        self.score = verdict["score"]
+        self.success = verdict["success"]
+        self.reason = verdict.get("reason")
+        self.score_breakdown = verdict.get("score_breakdown")
+        self.verbose_logs = verdict.get("verbose_logs")
+        # Veredicto reaproveitado: nenhuma chamada ao juiz nesta execução
+        self.evaluation_cost = 0 if verdict.get("evaluation_cost") is not None else None
+        return self.score
+
+    def _store(self, key: str, metric: BaseMetric) -> float:
+        self.cached = False
+        self.score = metric.score
+        self.success = metric.success
+        self.reason = metric.reason
+        self.score_breakdown = metric.score_breakdown
+        self.verbose_logs = metric.verbose_logs
+        self.evaluation_cost = metric.evaluation_cost
+        self.error = metric.error
+        if metric.error is None and metric.score is not None:
+            self.cache.put(key, self.__name__, vars(self))
+        return self.score
+
+    def measure(self, test_case, *args, **kwargs) -> float:
+        key = verdict_key(self.metric, test_case)
+        verdict = self.cache.get(key)
+        if verdict is not None:
+            return self._restore(verdict)
+        # Cópia da métrica: evaluate() roda test cases em paralelo com o mesmo wrapper
+        metric = copy_metrics([self.metric])[0]
+        metric.measure(test_case, *args, **kwargs)
+        return self._store(key, metric)
+
+    async def a_measure(self, test_case, *args, **kwargs) -> float:
+        key = verdict_key(self.metric, test_case)
+        verdict = self.cache.get(key)
+        if verdict is not None:
+            return self._restore(verdict)
+        metric = copy_metrics([self.metric])[0]
+        await metric.a_measure(test_case, *args, **kwargs)
+        return self._store(key, metric)
+
+    def is_successful(self) -> bool:
+        if self.error is not None:
+            self.success = False
+        return bool(self.success)
+
+
+def cached_metrics(metrics: List[BaseMetric], cache: Optional[JudgeCache] = None) -> List[BaseMetric]:
+    """Envolve as métricas que usam um juiz LLM; métricas determinísticas ficam como estão"""
+    return [
+        CachedMetric(metric, cache) if getattr(metric, "evaluation_model", None) else metric
+        for metric in metrics
+    ]
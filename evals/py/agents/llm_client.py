@@ -0,0 +1,195 @@
+import asyncio
+import json
+import logging
+import os
+import weakref
+from typing import Dict, List, Any, Optional, Callable, AsyncIterator, Awaitable, Tuple
+
+import httpx
+import openai
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+DEFAULT_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+
+
+class _LoopResources:
+    """Cliente HTTP, cliente OpenAI e semáforo de um event loop"""
+
+    def __init__(self, api_key: str, base_url: Optional[str], max_concurrency: int, max_connections: int, timeout: float):
+        self.http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            timeout=timeout,
+        )
+        self.client = openai.AsyncOpenAI(api_key=api_key, base_url=base_url, http_client=self.http_client)
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+
+
+class AsyncLLMClient:
+    """Cliente LLM assíncrono com conexões HTTP reaproveitadas e limite de concorrência"""
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        timeout: float = 120.0,
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.timeout = timeout
+        # Conexões e semáforos pertencem ao event loop que os criou
+        self._resources: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopResources]" = weakref.WeakKeyDictionary()
+
+    def _get_resources(self) -> _LoopResources:
+        loop = asyncio.get_running_loop()
+        resources = self._resources.get(loop)
+        if resources is None:
+            resources = _LoopResources(self.api_key, self.base_url, self.max_concurrency, self.max_connections, self.timeout)
+            self._resources[loop] = resources
+        return resources
+
+    async def stream(self, model: str, messages: List[Dict], **kwargs) -> AsyncIterator[str]:
+        """Gera os trechos de texto da resposta conforme chegam"""
+        # O último chunk traz o uso de tokens (sem choices), lido pelo llm_meter
+        kwargs.setdefault("stream_options", {"include_usage": True})
+        resources = self._get_resources()
+        async with resources.semaphore:
+            response = await resources.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                **kwargs
+            )
+            async for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+
+    async def complete(self, model: str, messages: List[Dict], on_token: Optional[Callable[[str], None]] = None, **kwargs) -> str:
+        """Retorna a resposta completa, recebida por streaming"""
+        parts = []
+        async for delta in self.stream(model, messages, **kwargs):
+            parts.append(delta)
+            if on_token:
+                on_token(delta)
+        return "".join(parts)
+
+    async def complete_message(self, model: str, messages: List[Dict], tools: Optional[List[Dict]] = None, **kwargs) -> Dict[str, Any]:
+        """Retorna a mensagem do assistente, incluindo tool calls nativas acumuladas do stream"""
+        if tools:
+            kwargs["tools"] = tools
+        kwargs.setdefault("stream_options", {"include_usage": True})
+        resources = self._get_resources()
+        content_parts = []
+        tool_calls: Dict[int, Dict[str, Any]] = {}
+        async with resources.semaphore:
+            response = await resources.client.chat.completions.create(
+                model=model,
+                messages=messages,
+                stream=True,
+                **kwargs
+            )
+            async for chunk in response:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                if delta.content:
+                    content_parts.append(delta.content)
+                for call_delta in delta.tool_calls or []:
+                    call = tool_calls.setdefault(call_delta.index, {
+                        "id": None,
+                        "type": "function",
+                        "function": {"name": "", "arguments": ""}
+                    })
+                    if call_delta.id:
+                        call["id"] = call_delta.id
+                    if call_delta.function:
+                        call["function"]["name"] += call_delta.function.name or ""
+                        call["function"]["arguments"] += call_delta.function.arguments or ""
+
+        message: Dict[str, Any] = {"role": "assistant", "content": "".join(content_parts) or None}
+        if tool_calls:
+            message["tool_calls"] = [tool_calls[index] for index in sorted(tool_calls)]
+        return message
+
+    async def aclose(self):
+        """Fecha as conexões do event loop atual"""
+        resources = self._resources.pop(asyncio.get_running_loop(), None)
+        if resources:
+            await resources.http_client.aclose()
+
+
+_shared_clients: Dict[Tuple[str, Optional[str]], AsyncLLMClient] = {}
+
+
+def get_shared_client(api_key: str, base_url: Optional[str] = None, **options) -> AsyncLLMClient:
+    """Retorna o cliente compartilhado para a chave/base_url (as opções valem na criação)"""
+    key = (api_key, base_url)
+    if key not in _shared_clients:
+        _shared_clients[key] = AsyncLLMClient(api_key, base_url=base_url, **options)
+    return _shared_clients[key]
+
+
+ToolExecutor = Callable[[List[Dict[str, Any]]], Awaitable[List[Any]]]
+
+
+async def run_tool_loop(
+    client: AsyncLLMClient,
+    model: str,
+    messages: List[Dict],
+    tools: List[Dict],
+    execute: ToolExecutor,
+    max_iterations: int = 5,
+    **kwargs
+) -> Tuple[str, List[Dict[str, Any]], List[Any]]:
+    """
+    Chama o LLM com function calling nativo até ele parar de pedir ferramentas.
+
+    execute recebe a lista de chamadas ({"id", "name", "arguments"}) de uma rodada,
+    que podem ser executadas em paralelo, e devolve um resultado por chamada.
+    Retorna a resposta final, todas as chamadas feitas e seus resultados.
+    """
+    all_calls: List[Dict[str, Any]] = []
+    all_results: List[Any] = []
+
+    for _ in range(max_iterations):
+        message = await client.complete_message(model, messages, tools=tools, **kwargs)
+        messages.append(message)
+        if not message.get("tool_calls"):
+            return message.get("content") or "", all_calls, all_results
+
+        calls = []
+        invalid: Dict[str, str] = {}
+        for tool_call in message["tool_calls"]:
+            try:
+                arguments = json.loads(tool_call["function"]["arguments"] or "{}")
+            except json.JSONDecodeError as e:
+                # O erro volta para o modelo em vez de descartar a chamada
+                invalid[tool_call["id"]] = f"Argumentos JSON inválidos: {e}"
+                continue
+            calls.append({"id": tool_call["id"], "name": tool_call["function"]["name"], "arguments": arguments})
+
+        results = await execute(calls) if calls else []
+        all_calls.extend(calls)
+        all_results.extend(results)
+
+        outputs = {call["id"]: result for call, result in zip(calls, results)}
+        for tool_call in message["tool_calls"]:
+            output = invalid.get(tool_call["id"], outputs.get(tool_call["id"]))
+            messages.append({
+                "role": "tool",
+                "tool_call_id": tool_call["id"],
+                "content": output if isinstance(output, str) else json.dumps(output, ensure_ascii=False, default=str)
+            })
+
+    logger.warning(f"Limite de {max_iterations} iterações com ferramentas atingido")
+    message = await client.complete_message(model, messages, tools=tools, tool_choice="none", **kwargs)
+    messages.append(message)
+    return message.get("content") or "", all_calls, all_results
@@ -0,0 +1,195 @@
+import contextvars
+import json
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+import httpx
+
+# Rotas que contam como chamada ao LLM
+LLM_PATHS = ("/chat/completions", "/completions", "/responses")
+
+
+class CaseUsage:
+    """Chamadas ao LLM e tokens de um caso de avaliação, por modelo"""
+
+    def __init__(self):
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.calls_without_usage = 0
+        self.models: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, model: str, usage: Optional[Dict[str, Any]]):
+        with self._lock:
+            self.llm_calls += 1
+            if not usage:
+                self.calls_without_usage += 1
+                return
+            prompt = usage.get("prompt_tokens", usage.get("input_tokens", 0)) or 0
+            completion = usage.get("completion_tokens", usage.get("output_tokens", 0)) or 0
+            self.prompt_tokens += prompt
+            self.completion_tokens += completion
+            per_model = self.models.setdefault(model or "?", {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0})
+            per_model["calls"] += 1
+            per_model["prompt_tokens"] += prompt
+            per_model["completion_tokens"] += completion
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "calls_without_usage": self.calls_without_usage,
+            "models": self.models,
+        }
+
+
+# Tasks e asyncio.to_thread herdam o contexto: casos em paralelo não se misturam
+_current: contextvars.ContextVar[Optional[CaseUsage]] = contextvars.ContextVar("case_usage", default=None)
+
+
+@contextmanager
+def track_case():
+    usage = CaseUsage()
+    token = _current.set(usage)
+    try:
+        yield usage
+    finally:
+        _current.reset(token)
+
+
+class _UsageScanner:
+    """
+    Extrai o uso de tokens conforme o corpo chega. Em SSE o uso vem (pedido via stream_options)
+    no último chunk com "usage", então só as linhas "data:" com essa chave são decodificadas.
+    """
+
+    def __init__(self, content_type: str):
+        self.event_stream = "event-stream" in content_type
+        self.buffer = bytearray()
+        self.usage: Optional[Dict[str, Any]] = None
+
+    def feed(self, chunk: bytes):
+        self.buffer.extend(chunk)
+        if not self.event_stream:
+            return
+        end = self.buffer.rfind(b"\n")
+        if end < 0:
+            return
+        lines, self.buffer = bytes(self.buffer[:end]), self.buffer[end + 1:]
+        for line in lines.splitlines():
+            self._scan_line(line)
+
+    def _scan_line(self, line: bytes):
+        if line.startswith(b"data:") and b'"usage"' in line:
+            try:
+                self.usage = json.loads(line[5:]).get("usage") or self.usage
+            except (json.JSONDecodeError, UnicodeDecodeError, AttributeError):
+                pass
+
+    def finish(self) -> Optional[Dict[str, Any]]:
+        if self.event_stream:
+            self._scan_line(bytes(self.buffer))
+            return self.usage
+        try:
+            return json.loads(bytes(self.buffer)).get("usage")
+        except (json.JSONDecodeError, UnicodeDecodeError, AttributeError):
+            return None
+
+
+class _MeteredStream(httpx.SyncByteStream, httpx.AsyncByteStream):
+    """Repassa o corpo da resposta sem retê-lo e registra o uso quando ele termina"""
+
+    def __init__(self, stream, usage: CaseUsage, model: str, content_type: str):
+        self.stream = stream
+        self.usage = usage
+        self.model = model
+        self.scanner = _UsageScanner(content_type)
+        self.recorded = False
+
+    def _record(self):
+        if not self.recorded:
+            self.recorded = True
+            self.usage.add(self.model, self.scanner.finish())
+
+    def __iter__(self):
+        for chunk in self.stream:
+            self.scanner.feed(chunk)
+            yield chunk
+        self._record()
+
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            self.scanner.feed(chunk)
+            yield chunk
+        self._record()
+
+    def close(self):
+        try:
+            self.stream.close()
+        finally:
+            # Stream abandonado antes do fim: registra a chamada com o que foi lido
+            self._record()
+
+    async def aclose(self):
+        try:
+            await self.stream.aclose()
+        finally:
+            self._record()
+
+
+def _meter(response: httpx.Response, usage: CaseUsage, model: str):
+    content_type = response.headers.get("content-type", "")
+    if response.is_stream_consumed:
+        # Corpo já em memória (ex.: replay de cassete)
+        scanner = _UsageScanner(content_type)
+        scanner.feed(response.content)
+        usage.add(model, scanner.finish())
+    else:
+        response.stream = _MeteredStream(response.stream, usage, model, content_type)
+
+
+def _request_model(request: httpx.Request) -> str:
+    try:
+        return json.loads(request.content).get("model", "")
+    except (httpx.RequestNotRead, json.JSONDecodeError, UnicodeDecodeError, AttributeError):
+        return ""
+
+
+def _is_llm_call(request: httpx.Request) -> bool:
+    return request.method == "POST" and request.url.path.endswith(LLM_PATHS)
+
+
+@contextmanager
+def install_meter():
+    """
+    Conta chamadas e tokens de todo cliente baseado em httpx (OpenAI, ChatOpenAI, LiteLlm)
+    no caso corrente. Deve ser instalado depois de uma cassete, para medir também o replay.
+    """
+    sync_send = httpx.Client.send
+    async_send = httpx.AsyncClient.send
+
+    def send(client, request, **kwargs):
+        response = sync_send(client, request, **kwargs)
+        usage = _current.get()
+        if usage is not None and _is_llm_call(request):
+            _meter(response, usage, _request_model(request))
+        return response
+
+    async def a_send(client, request, **kwargs):
+        response = await async_send(client, request, **kwargs)
+        usage = _current.get()
+        if usage is not None and _is_llm_call(request):
+            # O uso é contado conforme o cliente consome o corpo: o streaming não é interrompido
+            _meter(response, usage, _request_model(request))
+        return response
+
+    httpx.Client.send = send
+    httpx.AsyncClient.send = a_send
+    try:
+        yield
+    finally:
+        httpx.Client.send = sync_send
+        httpx.AsyncClient.send = async_send
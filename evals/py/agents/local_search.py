@@ -0,0 +1,372 @@
+import heapq
+import json
+import logging
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import unicodedata
+from array import array
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+
+logger = logging.getLogger(__name__)
+
+REPO_ROOT = Path(__file__).resolve().parents[3]
+DEFAULT_INDEX_DIR = Path(__file__).resolve().parent / ".search_index"
+DEFAULT_SUFFIXES = (".md", ".markdown")
+SKIP_DIRS = {
+    ".git", "node_modules", "__pycache__", ".venv", "venv", ".tox",
+    ".tool_outputs", ".search_index", ".artifacts", "artefatos",
+}
+
+INDEX_VERSION = 2
+# Cada posting ocupa dois uint32: (id do documento, frequência do termo)
+POSTING = struct.Struct("<II")
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+STOPWORDS = {
+    "a", "o", "as", "os", "de", "da", "do", "das", "dos", "e", "em", "no", "na", "nos", "nas",
+    "um", "uma", "para", "por", "com", "que", "se", "ao", "the", "of", "and", "to", "in", "is", "for",
+}
+
+
+def normalize(term: str) -> str:
+    """Minúsculas e sem acentos: "Instalação" e "instalacao" são o mesmo termo"""
+    decomposed = unicodedata.normalize("NFKD", term.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> List[str]:
+    terms = (normalize(match.group()) for match in TOKEN_PATTERN.finditer(text))
+    return [term for term in terms if len(term) > 1 and term not in STOPWORDS]
+
+
+def default_corpus() -> List[Path]:
+    """docs/ do repositório; SEARCH_CORPUS troca por outros caminhos separados por os.pathsep"""
+    configured = os.getenv("SEARCH_CORPUS")
+    if configured:
+        return [Path(path) for path in configured.split(os.pathsep) if path]
+    return [REPO_ROOT / "docs"]
+
+
+class LocalSearchIndex:
+    """
+    Índice invertido BM25 persistente sobre um corpus local.
+
+    postings.bin é lido por mmap e só recebe, ao final, os postings dos arquivos alterados:
+    cada termo aponta para uma lista de trechos do arquivo. A versão anterior de um arquivo
+    alterado ou removido vira um id morto, ignorado na busca; quando os mortos passam dos
+    vivos, compact() regrava o arquivo inteiro. docs.json guarda só id, mtime/tamanho,
+    título e comprimento de cada arquivo.
+    """
+
+    def __init__(
+        self,
+        roots: Optional[Iterable[Path]] = None,
+        index_dir: Path = DEFAULT_INDEX_DIR,
+        suffixes: Tuple[str, ...] = DEFAULT_SUFFIXES,
+        k1: float = 1.5,
+        b: float = 0.75,
+        refresh_interval: float = 5.0,
+    ):
+        self.roots = [Path(root) for root in (roots or default_corpus())]
+        self.index_dir = Path(index_dir)
+        self.suffixes = suffixes
+        self.k1 = k1
+        self.b = b
+        self.refresh_interval = refresh_interval
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        # termo -> [(posição do primeiro posting, quantidade), ...]
+        self.lexicon: Dict[str, List[Tuple[int, int]]] = {}
+        self.next_id = 0
+        self.postings_count = 0
+        # Indexados pelo id do documento; ids mortos ficam com caminho None
+        self.doc_paths: List[Optional[str]] = []
+        self.doc_lengths: List[int] = []
+        self.avg_length = 0.0
+        self._postings_file = None
+        self._postings_map: Optional[mmap.mmap] = None
+        self._last_refresh = 0.0
+        self._lock = threading.Lock()
+        self._load()
+
+    # ---------- persistência ----------
+
+    @property
+    def _docs_path(self) -> Path:
+        return self.index_dir / "docs.json"
+
+    @property
+    def _lexicon_path(self) -> Path:
+        return self.index_dir / "lexicon.json"
+
+    @property
+    def _postings_path(self) -> Path:
+        return self.index_dir / "postings.bin"
+
+    def _load(self):
+        try:
+            docs = json.loads(self._docs_path.read_text(encoding="utf-8"))
+            lexicon = json.loads(self._lexicon_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return
+        if docs.get("version") != INDEX_VERSION or lexicon.get("version") != INDEX_VERSION:
+            return
+        postings_size = self._postings_path.stat().st_size if self._postings_path.exists() else 0
+        if postings_size != lexicon["postings"] * POSTING.size:
+            # Postings acrescentados sem o léxico correspondente: recomeça do zero
+            return
+        self.docs = docs["docs"]
+        self.lexicon = {term: [tuple(extent) for extent in extents] for term, extents in lexicon["terms"].items()}
+        self.next_id = lexicon["next_id"]
+        self.postings_count = lexicon["postings"]
+        self._update_doc_tables()
+        self._open_postings()
+
+    def _update_doc_tables(self):
+        self.doc_paths = [None] * self.next_id
+        self.doc_lengths = [0] * self.next_id
+        for key, doc in self.docs.items():
+            self.doc_paths[doc["id"]] = key
+            self.doc_lengths[doc["id"]] = doc["length"]
+        self.avg_length = (sum(self.doc_lengths) / len(self.docs)) if self.docs else 0.0
+
+    def _open_postings(self):
+        self._close_postings()
+        if self._postings_path.exists() and self._postings_path.stat().st_size > 0:
+            self._postings_file = open(self._postings_path, "rb")
+            self._postings_map = mmap.mmap(self._postings_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _close_postings(self):
+        if self._postings_map is not None:
+            self._postings_map.close()
+            self._postings_map = None
+        if self._postings_file is not None:
+            self._postings_file.close()
+            self._postings_file = None
+
+    def close(self):
+        with self._lock:
+            self._close_postings()
+
+    def _write_atomic(self, path: Path, data: bytes):
+        tmp_path = path.with_suffix(path.suffix + ".tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+
+    # ---------- indexação ----------
+
+    def _iter_files(self) -> Iterable[Path]:
+        seen = set()
+        for root in self.roots:
+            if root.is_file():
+                candidates = [root]
+            else:
+                candidates = []
+                for dirpath, dirnames, filenames in os.walk(root):
+                    dirnames[:] = [name for name in dirnames if name not in SKIP_DIRS]
+                    candidates.extend(Path(dirpath) / filename for filename in filenames)
+            for path in candidates:
+                if path.suffix.lower() in self.suffixes and path not in seen:
+                    seen.add(path)
+                    yield path
+
+    def _relative(self, path: Path) -> str:
+        try:
+            return path.resolve().relative_to(REPO_ROOT).as_posix()
+        except ValueError:
+            return path.resolve().as_posix()
+
+    def refresh(self, force: bool = False) -> Dict[str, int]:
+        """Reindexa apenas arquivos novos, alterados ou removidos"""
+        with self._lock:
+            if not force and time.monotonic() - self._last_refresh < self.refresh_interval:
+                return {"added": 0, "updated": 0, "removed": 0}
+            self._last_refresh = time.monotonic()
+
+            changes = {"added": 0, "updated": 0, "removed": 0}
+            current: Dict[str, Dict[str, Any]] = {}
+            analyzed: Dict[str, Counter] = {}
+            for path in self._iter_files():
+                key = self._relative(path)
+                stat = path.stat()
+                previous = self.docs.get(key)
+                if previous and previous["mtime_ns"] == stat.st_mtime_ns and previous["size"] == stat.st_size:
+                    current[key] = previous
+                    continue
+                current[key], analyzed[key] = self._analyze(path, stat)
+                changes["updated" if previous else "added"] += 1
+            changes["removed"] = len(set(self.docs) - set(current))
+
+            if any(changes.values()) or not self._docs_path.exists():
+                self._apply_changes(current, analyzed)
+                logger.info(f"Índice de busca atualizado: {changes} ({len(self.docs)} documentos)")
+            return changes
+
+    def _analyze(self, path: Path, stat: os.stat_result) -> Tuple[Dict[str, Any], Counter]:
+        text = path.read_text(encoding="utf-8", errors="ignore")
+        terms = tokenize(text)
+        title = next((line.lstrip("#").strip() for line in text.splitlines() if line.startswith("#")), path.name)
+        doc = {
+            "path": str(path.resolve()),
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "title": title,
+            "length": len(terms),
+        }
+        return doc, Counter(terms)
+
+    def _apply_changes(self, current: Dict[str, Dict[str, Any]], analyzed: Dict[str, Counter]):
+        """Acrescenta ao postings.bin só os documentos reanalisados; as versões antigas viram ids mortos"""
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+        for key in sorted(analyzed):
+            current[key]["id"] = self.next_id
+            for term, frequency in analyzed[key].items():
+                postings.setdefault(term, []).append((self.next_id, frequency))
+            self.next_id += 1
+
+        data = array("I")
+        for term in sorted(postings):
+            entries = postings[term]
+            self.lexicon.setdefault(term, []).append((self.postings_count + len(data) // 2, len(entries)))
+            for doc_id, frequency in entries:
+                data.append(doc_id)
+                data.append(frequency)
+
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        self._close_postings()
+        # Sem postings válidos, o que houver no arquivo é resto de um índice descartado
+        with open(self._postings_path, "ab" if self.postings_count else "wb") as file:
+            file.write(self._encode(data))
+        self.postings_count += len(data) // 2
+        self.docs = current
+        self._update_doc_tables()
+
+        if self.next_id - len(self.docs) > len(self.docs):
+            self._compact()
+        else:
+            self._write_metadata()
+            self._open_postings()
+
+    def compact(self):
+        """Regrava postings.bin sem os ids mortos, renumerando os documentos"""
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        self._open_postings()
+        new_ids = {doc["id"]: new_id for new_id, doc in enumerate(self.docs[key] for key in sorted(self.docs))}
+        data = array("I")
+        lexicon: Dict[str, List[Tuple[int, int]]] = {}
+        for term in sorted(self.lexicon):
+            start = len(data) // 2
+            for doc_id, frequency in self._postings(term):
+                if doc_id in new_ids:
+                    data.append(new_ids[doc_id])
+                    data.append(frequency)
+            if len(data) // 2 > start:
+                lexicon[term] = [(start, len(data) // 2 - start)]
+
+        for doc in self.docs.values():
+            doc["id"] = new_ids[doc["id"]]
+        self.lexicon = lexicon
+        self.next_id = len(self.docs)
+        self.postings_count = len(data) // 2
+        self._close_postings()
+        self._write_atomic(self._postings_path, self._encode(data))
+        self._update_doc_tables()
+        self._write_metadata()
+        self._open_postings()
+
+    def _encode(self, data: array) -> bytes:
+        if data.itemsize != 4:
+            raise RuntimeError("array('I') precisa ter 4 bytes nesta plataforma")
+        if sys.byteorder == "big":
+            data.byteswap()
+        return data.tobytes()
+
+    def _write_metadata(self):
+        lexicon = {
+            "version": INDEX_VERSION,
+            "terms": self.lexicon,
+            "next_id": self.next_id,
+            "postings": self.postings_count,
+        }
+        self._write_atomic(self._lexicon_path, json.dumps(lexicon).encode("utf-8"))
+        self._write_atomic(self._docs_path, json.dumps({"version": INDEX_VERSION, "docs": self.docs}).encode("utf-8"))
+
+    # ---------- busca ----------
+
+    def _postings(self, term: str) -> Iterable[Tuple[int, int]]:
+        if self._postings_map is None:
+            return
+        for offset, count in self.lexicon.get(term, ()):
+            yield from POSTING.iter_unpack(self._postings_map[offset * POSTING.size:(offset + count) * POSTING.size])
+
+    def search(self, query: str, max_results: int = 5) -> List[Dict[str, Any]]:
+        """Retorna os documentos mais relevantes (BM25) com um trecho de cada"""
+        self.refresh()
+        query_terms = list(dict.fromkeys(tokenize(query)))
+        with self._lock:
+            total = len(self.docs)
+            if not total or not query_terms:
+                return []
+
+            scores: Dict[int, float] = {}
+            for term in query_terms:
+                live = [(doc_id, frequency) for doc_id, frequency in self._postings(term) if self.doc_paths[doc_id] is not None]
+                if not live:
+                    continue
+                df = len(live)
+                idf = math.log(1 + (total - df + 0.5) / (df + 0.5))
+                for doc_id, frequency in live:
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_id] / (self.avg_length or 1))
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+            best = heapq.nlargest(max_results, scores.items(), key=lambda item: item[1])
+            hits = [(self.doc_paths[doc_id], score) for doc_id, score in best]
+            docs = {key: self.docs[key] for key, _ in hits}
+
+        return [
+            {
+                "title": docs[key]["title"],
+                "url": key,
+                "snippet": self._snippet(docs[key]["path"], query_terms),
+                "score": round(score, 4),
+            }
+            for key, score in hits
+        ]
+
+    def _snippet(self, path: str, query_terms: List[str], window: int = 30, max_chars: int = 300) -> str:
+        """Trecho com a maior concentração de termos da consulta"""
+        try:
+            text = Path(path).read_text(encoding="utf-8", errors="ignore")
+        except OSError:
+            return ""
+        matches = list(TOKEN_PATTERN.finditer(text))
+        if not matches:
+            return ""
+        wanted = set(query_terms)
+        hits = [index for index, match in enumerate(matches) if normalize(match.group()) in wanted]
+        if not hits:
+            start = 0
+        else:
+            # Janela que cobre mais termos distintos da consulta
+            start = max(
+                hits,
+                key=lambda first: len({normalize(matches[i].group()) for i in hits if first <= i < first + window})
+            )
+            start = max(0, start - window // 4)
+        end = min(len(matches), start + window) - 1
+        snippet = " ".join(text[matches[start].start():matches[end].end()].split())
+        if len(snippet) > max_chars:
+            snippet = snippet[:max_chars].rsplit(" ", 1)[0]
+        prefix = "..." if start > 0 else ""
+        suffix = "..." if end < len(matches) - 1 else ""
+        return f"{prefix}{snippet}{suffix}"
@@ -0,0 +1,111 @@
+import asyncio
+import logging
+import time
+from typing import Dict, List, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class ExternalMCPClientPool:
+    """Várias réplicas do mesmo MCP server stdio atrás de um único nome"""
+
+    def __init__(self, client_factory: Callable[[], Any], replicas: int = 2):
+        if replicas < 1:
+            raise ValueError("O pool precisa de pelo menos uma réplica")
+        self.client_factory = client_factory
+        self.replica_count = replicas
+        self.replicas: List[Any] = []
+        self.outstanding: Dict[int, int] = {}
+        self.startup_timings: Dict[str, float] = {}
+
+    @property
+    def primary(self):
+        if not self.replicas:
+            raise RuntimeError("Pool de MCP servers não iniciado")
+        return self.replicas[0]
+
+    @property
+    def server_command(self) -> List[str]:
+        return self.primary.server_command
+
+    @property
+    def server_args(self) -> Dict[str, str]:
+        return self.primary.server_args
+
+    @property
+    def tools(self) -> List[Dict[str, Any]]:
+        return self.primary.tools
+
+    @property
+    def catalog_version(self) -> int:
+        return self.primary.catalog_version
+
+    @property
+    def resources(self) -> List[Dict[str, Any]]:
+        return self.primary.resources
+
+    @property
+    def prompts(self) -> List[Dict[str, Any]]:
+        return self.primary.prompts
+
+    async def start_server(self):
+        """Inicia as réplicas em paralelo; o catálogo é buscado apenas na primeira"""
+        started_at = time.perf_counter()
+        clients = [self.client_factory() for _ in range(self.replica_count)]
+        results = await asyncio.gather(
+            clients[0].start_server(),
+            *(client.start_server(fetch_catalog=False) for client in clients[1:]),
+            return_exceptions=True
+        )
+        failed = [client for client, result in zip(clients, results) if isinstance(result, Exception)]
+        if isinstance(results[0], Exception):
+            # Sem a primeira réplica não há catálogo: todas são paradas, inclusive as que subiram
+            failed = clients
+
+        # Réplicas que falharam podem ter deixado processo e tarefas de leitura para trás
+        await asyncio.gather(*(client.stop_server() for client in failed), return_exceptions=True)
+        if isinstance(results[0], Exception):
+            raise results[0]
+
+        self.replicas = []
+        for client, result in zip(clients, results):
+            if isinstance(result, Exception):
+                logger.error(f"Réplica do MCP server não iniciou: {result}")
+                continue
+            self.replicas.append(client)
+
+        self.outstanding = {id(client): 0 for client in self.replicas}
+        self.startup_timings = {**self.primary.startup_timings, "total": time.perf_counter() - started_at}
+        logger.info(f"Pool iniciado com {len(self.replicas)} réplica(s): {' '.join(self.server_command)}")
+
+    async def stop_server(self):
+        """Para todas as réplicas"""
+        await asyncio.gather(*(client.stop_server() for client in self.replicas), return_exceptions=True)
+        self.replicas = []
+        self.outstanding.clear()
+
+    def is_alive(self) -> bool:
+        """O pool está saudável quando todas as réplicas estão rodando"""
+        return bool(self.replicas) and all(client.is_alive() for client in self.replicas)
+
+    async def ping(self, timeout: Optional[float] = 5.0):
+        """Verifica se todas as réplicas respondem"""
+        await asyncio.gather(*(client.ping(timeout=timeout) for client in self.replicas))
+
+    def _pick_replica(self):
+        """Escolhe a réplica com menos requisições em andamento"""
+        return min(self.replicas, key=lambda client: self.outstanding[id(client)])
+
+    async def call_tool(self, tool_name: str, arguments: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Chama a ferramenta na réplica menos ocupada"""
+        client = self._pick_replica()
+        self.outstanding[id(client)] += 1
+        try:
+            return await client.call_tool(tool_name, arguments, timeout=timeout)
+        finally:
+            if id(client) in self.outstanding:
+                self.outstanding[id(client)] -= 1
+
+    def get_tools_info(self) -> List[Dict[str, Any]]:
+        """Retorna o catálogo compartilhado pelas réplicas"""
+        return self.primary.get_tools_info()
@@ -0,0 +1,274 @@
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import uuid
+from typing import Dict, List, Any, Optional, Tuple, Union
+from mcp_server import MCPServer
+
+logger = logging.getLogger(__name__)
+
+PROTOCOL_VERSIONS = ("2025-03-26", "2024-11-05")
+SESSION_HEADER = "Mcp-Session-Id"
+
+JSONRPCMessage = Dict[str, Any]
+
+
+def _error(request_id: Any, code: int, message: str) -> JSONRPCMessage:
+    return {"jsonrpc": "2.0", "id": request_id, "error": {"code": code, "message": message}}
+
+
+class MCPProtocolHandler:
+    """
+    Expõe o registro de um MCPServer (agent_busca/agent_codigo) via JSON-RPC do MCP.
+
+    Independe do transporte: recebe uma mensagem e devolve a resposta (ou None para notificações).
+    Chamadas em andamento podem ser canceladas com notifications/cancelled; os ids só são únicos
+    dentro de uma sessão, por isso as chamadas são identificadas por (sessão, id).
+    """
+
+    def __init__(self, server, name: str = "agents-mcp", version: str = "1.0.0"):
+        self.server = server
+        self.name = name
+        self.version = version
+        self.in_flight: Dict[Tuple[Optional[str], str], asyncio.Task] = {}
+
+    async def handle(self, message: JSONRPCMessage, session: Optional[str] = None) -> Optional[JSONRPCMessage]:
+        method = message.get("method")
+        request_id = message.get("id")
+
+        if method is None:
+            # Respostas do cliente: este server não faz requisições
+            return None
+
+        if request_id is None:
+            self._handle_notification(method, message.get("params") or {}, session)
+            return None
+
+        key = (session, str(request_id))
+        task = asyncio.current_task()
+        if task is not None:
+            self.in_flight[key] = task
+        try:
+            result = await self._dispatch(method, message.get("params") or {})
+            return {"jsonrpc": "2.0", "id": request_id, "result": result}
+        except asyncio.CancelledError:
+            logger.info(f"Requisição {request_id} cancelada pelo cliente")
+            return None
+        except KeyError as e:
+            return _error(request_id, -32602, f"Parâmetro ausente: {e}")
+        except NotImplementedError:
+            return _error(request_id, -32601, f"Método '{method}' não suportado")
+        except Exception as e:
+            logger.error(f"Erro em '{method}': {e}")
+            return _error(request_id, -32603, str(e))
+        finally:
+            # Um id repetido na mesma sessão não remove a chamada que o reutilizou
+            if task is not None and self.in_flight.get(key) is task:
+                del self.in_flight[key]
+
+    def _handle_notification(self, method: str, params: Dict[str, Any], session: Optional[str]):
+        if method == "notifications/cancelled":
+            task = self.in_flight.get((session, str(params.get("requestId"))))
+            if task and task is not asyncio.current_task():
+                task.cancel()
+        elif method != "notifications/initialized":
+            logger.debug(f"Notificação ignorada: {method}")
+
+    def cancel_session(self, session: str):
+        """Cancela as chamadas em andamento de uma sessão encerrada"""
+        for (task_session, _), task in list(self.in_flight.items()):
+            if task_session == session:
+                task.cancel()
+
+    async def _dispatch(self, method: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        if method == "initialize":
+            requested = params.get("protocolVersion")
+            return {
+                "protocolVersion": requested if requested in PROTOCOL_VERSIONS else PROTOCOL_VERSIONS[0],
+                "capabilities": {"tools": {"listChanged": False}},
+                "serverInfo": {"name": self.name, "version": self.version},
+            }
+        if method == "ping":
+            return {}
+        if method == "tools/list":
+            return {
+                "tools": [
+                    {"name": tool["name"], "description": tool["description"], "inputSchema": tool["parameters"]}
+                    for tool in self.server.list_tools()
+                ]
+            }
+        if method == "tools/call":
+            return await self._call_tool(params["name"], params.get("arguments") or {})
+        raise NotImplementedError(method)
+
+    async def _call_tool(self, tool_name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        result = await self.server.execute_tool(tool_name, arguments)
+        if result.success:
+            return {
+                "content": [{"type": "text", "text": json.dumps(result.data, ensure_ascii=False, default=str)}],
+                "structuredContent": result.data if isinstance(result.data, dict) else {"result": result.data},
+                "isError": False,
+            }
+        content = [{"type": "text", "text": result.error_message or "Erro na ferramenta"}]
+        if result.data is not None:
+            content.append({"type": "text", "text": json.dumps(result.data, ensure_ascii=False, default=str)})
+        return {"content": content, "isError": True}
+
+    async def handle_payload(
+        self, payload: Union[JSONRPCMessage, List[JSONRPCMessage]], session: Optional[str] = None
+    ) -> Optional[Union[JSONRPCMessage, List[JSONRPCMessage]]]:
+        """Aceita uma mensagem ou um lote; mensagens de um lote rodam em paralelo"""
+        if isinstance(payload, list):
+            responses = await asyncio.gather(*(self._handle_task(message, session) for message in payload))
+            responses = [response for response in responses if response is not None]
+            return responses or None
+        if not isinstance(payload, dict):
+            return _error(None, -32600, "Requisição inválida")
+        return await self._handle_task(payload, session)
+
+    async def _handle_task(self, message: JSONRPCMessage, session: Optional[str] = None) -> Optional[JSONRPCMessage]:
+        # Cada requisição numa task própria, para poder ser cancelada isoladamente
+        return await asyncio.create_task(self.handle(message, session))
+
+
+async def serve_stdio(handler: MCPProtocolHandler):
+    """Atende um cliente via stdin/stdout, processando requisições em paralelo"""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=16 * 1024 * 1024)
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+    transport, protocol = await loop.connect_write_pipe(asyncio.streams.FlowControlMixin, sys.stdout)
+    writer = asyncio.StreamWriter(transport, protocol, None, loop)
+    write_lock = asyncio.Lock()
+    tasks = set()
+
+    async def respond(payload):
+        response = await handler.handle_payload(payload)
+        if response is None:
+            return
+        async with write_lock:
+            writer.write((json.dumps(response, ensure_ascii=False, default=str) + "\n").encode())
+            await writer.drain()
+
+    logger.info(f"MCP server '{handler.name}' atendendo via stdio")
+    while True:
+        line = await reader.readline()
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            payload = json.loads(line)
+        except json.JSONDecodeError:
+            payload = None
+        if payload is None:
+            async with write_lock:
+                writer.write((json.dumps(_error(None, -32700, "JSON inválido")) + "\n").encode())
+            continue
+        task = asyncio.create_task(respond(payload))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def create_http_app(handler: MCPProtocolHandler, path: str = "/mcp"):
+    """Aplicação aiohttp com o transporte streamable HTTP (POST de JSON-RPC, resposta JSON)"""
+    from aiohttp import web
+
+    sessions: Dict[str, float] = {}
+
+    async def post(request: "web.Request") -> "web.StreamResponse":
+        try:
+            payload = await request.json(loads=json.loads)
+        except json.JSONDecodeError:
+            return web.json_response(_error(None, -32700, "JSON inválido"), status=400)
+
+        messages = payload if isinstance(payload, list) else [payload]
+        is_initialize = any(isinstance(message, dict) and message.get("method") == "initialize" for message in messages)
+        session_id = request.headers.get(SESSION_HEADER)
+        headers = {}
+        if is_initialize:
+            session_id = uuid.uuid4().hex
+            sessions[session_id] = asyncio.get_running_loop().time()
+            headers[SESSION_HEADER] = session_id
+        elif session_id is None:
+            # Sem sessão, ids de clientes diferentes colidiriam (inclusive nos cancelamentos)
+            return web.json_response(_error(None, -32000, f"Cabeçalho {SESSION_HEADER} obrigatório"), status=400)
+        elif session_id not in sessions:
+            return web.json_response(_error(None, -32001, "Sessão não encontrada"), status=404)
+
+        response = await handler.handle_payload(payload, session_id)
+
+        if response is None:
+            # Apenas notificações/respostas: aceito, sem corpo
+            return web.Response(status=202, headers=headers)
+        return web.json_response(response, headers=headers, dumps=lambda data: json.dumps(data, ensure_ascii=False, default=str))
+
+    async def get(request: "web.Request") -> "web.StreamResponse":
+        # Este server não envia mensagens espontâneas, então não abre stream SSE
+        return web.Response(status=405, headers={"Allow": "POST, DELETE"})
+
+    async def delete(request: "web.Request") -> "web.StreamResponse":
+        session_id = request.headers.get(SESSION_HEADER, "")
+        if sessions.pop(session_id, None) is not None:
+            handler.cancel_session(session_id)
+        return web.Response(status=204)
+
+    app = web.Application(client_max_size=16 * 1024 * 1024)
+    app.router.add_post(path, post)
+    app.router.add_get(path, get)
+    app.router.add_delete(path, delete)
+    return app
+
+
+async def serve_http(handler: MCPProtocolHandler, host: str = "127.0.0.1", port: int = 8000, path: str = "/mcp"):
+    """Atende vários clientes via streamable HTTP até ser cancelado"""
+    from aiohttp import web
+
+    runner = web.AppRunner(create_http_app(handler, path))
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    logger.info(f"MCP server '{handler.name}' atendendo em http://{host}:{port}{path}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+def build_server(kind: str):
+    """MCPServer com as ferramentas padrão do agente de busca ou de código"""
+    server = MCPServer()
+    if kind == "busca":
+        import agent_busca
+        server.register_tool(agent_busca.WebSearchTool())
+    else:
+        import agent_codigo
+        server.register_tool(agent_codigo.registerAgent())
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Expõe as ferramentas dos agentes como MCP server")
+    parser.add_argument("agent", choices=["busca", "codigo"])
+    parser.add_argument("--transport", choices=["stdio", "http"], default="stdio")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--path", default="/mcp")
+    args = parser.parse_args()
+
+    # stdout é o canal do protocolo no modo stdio: logs vão para o stderr
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr)
+    handler = MCPProtocolHandler(build_server(args.agent), name=f"agent-{args.agent}")
+    if args.transport == "stdio":
+        asyncio.run(serve_stdio(handler))
+    else:
+        asyncio.run(serve_http(handler, args.host, args.port, args.path))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import asyncio
+import logging
+import weakref
+from typing import Dict, List, Any, Optional
+from dataclasses import dataclass
+from abc import ABC, abstractmethod
+from datetime import datetime
+from schema_validation import compile_schema, format_errors
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class MCPMessage:
+    """Representa uma mensagem no protocolo MCP"""
+    id: str
+    method: str
+    params: Dict[str, Any]
+    timestamp: datetime = None
+    
+    def __post_init__(self):
+        if self.timestamp is None:
+            self.timestamp = datetime.now()
+
+@dataclass
+class ToolResult:
+    """Resultado da execução de uma ferramenta"""
+    success: bool
+    data: Any
+    error_message: str = None
+
+class MCPTool(ABC):
+    """Classe abstrata para ferramentas MCP"""
+    
+    @abstractmethod
+    async def execute(self, params: Dict[str, Any]) -> ToolResult:
+        pass
+    
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        pass
+    
+    @property
+    @abstractmethod
+    def description(self) -> str:
+        pass
+    
+    @property
+    @abstractmethod
+    def parameters(self) -> Dict[str, Any]:
+        pass
+
+
+class MCPServer:
+    """Servidor MCP que gerencia ferramentas e comunicação"""
+    
+    def __init__(self, default_timeout: Optional[float] = 30.0, default_max_concurrency: int = 4):
+        self.tools: Dict[str, MCPTool] = {}
+        self.message_history: List[MCPMessage] = []
+        self.default_timeout = default_timeout
+        self.default_max_concurrency = default_max_concurrency
+        # Limites por ferramenta: {"timeout": segundos, "max_concurrency": n}
+        self.limits: Dict[str, Dict[str, Any]] = {}
+        # Validadores compilados a partir de MCPTool.parameters
+        self.validators: Dict[str, Any] = {}
+        # Semáforos pertencem ao event loop que os criou
+        self._semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+    
+    def register_tool(self, tool: MCPTool, timeout: Optional[float] = None, max_concurrency: Optional[int] = None):
+        """Registra uma nova ferramenta, com tempo limite e concorrência próprios opcionais"""
+        self.tools[tool.name] = tool
+        self.validators[tool.name] = compile_schema(tool.parameters)
+        self.limits[tool.name] = {
+            "timeout": timeout if timeout is not None else self.default_timeout,
+            "max_concurrency": max_concurrency or self.default_max_concurrency
+        }
+        logger.info(f"Ferramenta '{tool.name}' registrada")
+    
+    def _semaphore(self, tool_name: str) -> asyncio.Semaphore:
+        semaphores = self._semaphores.setdefault(asyncio.get_running_loop(), {})
+        if tool_name not in semaphores:
+            semaphores[tool_name] = asyncio.Semaphore(self.limits[tool_name]["max_concurrency"])
+        return semaphores[tool_name]
+    
+    async def execute_tool(self, tool_name: str, params: Dict[str, Any], timeout: Optional[float] = None) -> ToolResult:
+        """Executa uma ferramenta específica, respeitando o limite de concorrência e o prazo da chamada"""
+        if tool_name not in self.tools:
+            return ToolResult(success=False, data=None, error_message=f"Ferramenta '{tool_name}' não encontrada")
+        
+        tool = self.tools[tool_name]
+        # Converte tipos e aplica defaults; erros voltam todos juntos para o modelo corrigir
+        params, errors = self.validators[tool_name](params if params is not None else {}, "")
+        if errors:
+            return ToolResult(
+                success=False,
+                data={"validation_errors": errors, "parameters": tool.parameters},
+                error_message=format_errors(tool_name, errors)
+            )
+        
+        timeout = timeout if timeout is not None else self.limits[tool_name]["timeout"]
+        
+        async def run() -> ToolResult:
+            async with self._semaphore(tool_name):
+                return await tool.execute(params)
+        
+        try:
+            # O prazo inclui a espera por uma vaga; ao expirar, a execução é cancelada
+            return await asyncio.wait_for(run(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Ferramenta '{tool_name}' cancelada após {timeout}s")
+            return ToolResult(success=False, data=None, error_message=f"Ferramenta '{tool_name}' excedeu o tempo limite de {timeout}s")
+        except Exception as e:
+            return ToolResult(success=False, data=None, error_message=str(e))
+    
+    async def execute_tools(self, calls: List[Dict[str, Any]], timeout: Optional[float] = None) -> List[ToolResult]:
+        """
+        Executa chamadas independentes em paralelo ({"tool", "params", "timeout" opcional}).
+        Retorna um resultado por chamada, na mesma ordem; falhas e prazos vencidos viram erros.
+        """
+        return list(await asyncio.gather(*(
+            self.execute_tool(call["tool"], call["params"], timeout=call.get("timeout", timeout))
+            for call in calls
+        )))
+    
+    def list_tools(self) -> List[Dict[str, Any]]:
+        """Lista todas as ferramentas disponíveis"""
+        return [
+            {
+                "name": tool.name,
+                "description": tool.description,
+                "parameters": tool.parameters
+            }
+            for tool in self.tools.values()
+        ]
+    
+    def add_message(self, message: MCPMessage):
+        """Adiciona mensagem ao histórico"""
+        self.message_history.append(message)
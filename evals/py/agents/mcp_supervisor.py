@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Any, Optional, Callable
+
+logger = logging.getLogger(__name__)
+
+
+class MCPSupervisor:
+    """Monitora MCP servers, reinicia os que caíram e mantém reservas aquecidas"""
+
+    def __init__(
+        self,
+        clients: Dict[str, Any],
+        interval: float = 10.0,
+        ping_timeout: float = 5.0,
+        warm_standby: bool = False,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+        on_replace: Optional[Callable[[str], None]] = None,
+    ):
+        # Dicionário compartilhado com o agente: trocas aparecem imediatamente para ele
+        self.clients = clients
+        self.interval = interval
+        self.ping_timeout = ping_timeout
+        self.warm_standby = warm_standby
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.on_replace = on_replace
+        self.factories: Dict[str, Callable[[], Any]] = {}
+        self.standbys: Dict[str, Any] = {}
+        self.failures: Dict[str, int] = {}
+        self.next_attempt: Dict[str, float] = {}
+        self.restarts: Dict[str, int] = {}
+        self._recovering: Dict[str, asyncio.Task] = {}
+        self._standby_tasks: Dict[str, asyncio.Task] = {}
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def watch(self, name: str, factory: Callable[[], Any]):
+        """Passa a supervisionar o server; factory cria um cliente ainda não iniciado"""
+        self.factories[name] = factory
+        self.failures[name] = 0
+        self.restarts.setdefault(name, 0)
+        if self.warm_standby and self._loop_task:
+            self._spawn_standby(name)
+
+    async def unwatch(self, name: str):
+        """Deixa de supervisionar o server e descarta sua reserva"""
+        self.factories.pop(name, None)
+        tasks = [task for task in (self._recovering.pop(name, None), self._standby_tasks.pop(name, None)) if task]
+        for task in tasks:
+            task.cancel()
+        # Espera o cancelamento terminar: clientes iniciados pela metade são parados pelas próprias tarefas
+        await asyncio.gather(*tasks, return_exceptions=True)
+        standby = self.standbys.pop(name, None)
+        if standby:
+            await standby.stop_server()
+
+    def start(self):
+        """Inicia o laço de verificação periódica"""
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._run())
+            if self.warm_standby:
+                for name in self.factories:
+                    self._spawn_standby(name)
+
+    async def stop(self):
+        """Para a supervisão e as reservas aquecidas"""
+        if self._loop_task:
+            self._loop_task.cancel()
+            try:
+                await self._loop_task
+            except asyncio.CancelledError:
+                pass
+            self._loop_task = None
+        for name in list(self.factories):
+            await self.unwatch(name)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await asyncio.gather(*(self.check(name) for name in list(self.factories)))
+
+    async def _is_healthy(self, client: Any) -> bool:
+        if client is None or not client.is_alive():
+            return False
+        try:
+            await client.ping(timeout=self.ping_timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"Ping sem resposta: {e}")
+            return False
+
+    async def check(self, name: str) -> bool:
+        """Verifica um server e dispara a recuperação se ele não responder"""
+        if name in self._recovering:
+            return False
+        if await self._is_healthy(self.clients.get(name)):
+            self.failures[name] = 0
+            return True
+
+        logger.warning(f"MCP server '{name}' não responde")
+        self._recovering[name] = asyncio.create_task(self._recover(name))
+        return False
+
+    async def _recover(self, name: str):
+        try:
+            old_client = self.clients.get(name)
+
+            standby = self.standbys.pop(name, None)
+            if standby is not None and await self._is_healthy(standby):
+                # Failover imediato para a reserva já inicializada
+                self._replace(name, standby, "reserva aquecida")
+            else:
+                if standby is not None:
+                    asyncio.create_task(standby.stop_server())
+                await self._restart_with_backoff(name)
+
+            if old_client is not None:
+                asyncio.create_task(self._stop_quietly(old_client))
+            if self.warm_standby and name in self.factories:
+                self._spawn_standby(name)
+        finally:
+            self._recovering.pop(name, None)
+
+    async def _restart_with_backoff(self, name: str):
+        while name in self.factories:
+            wait = self.next_attempt.get(name, 0) - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+
+            client = self.factories[name]()
+            replaced = False
+            try:
+                await client.start_server()
+                self._replace(name, client, "reinício")
+                replaced = True
+                return
+            except Exception as e:
+                self.failures[name] = self.failures.get(name, 0) + 1
+                delay = min(self.base_backoff * 2 ** (self.failures[name] - 1), self.max_backoff)
+                self.next_attempt[name] = time.monotonic() + delay
+                logger.error(f"Falha ao reiniciar MCP server '{name}' ({e}); nova tentativa em {delay:.1f}s")
+            finally:
+                # Falha ou cancelamento (ex.: stop() durante a inicialização): o cliente não fica para trás
+                if not replaced:
+                    await self._stop_quietly(client)
+
+    def _replace(self, name: str, client: Any, how: str):
+        self.clients[name] = client
+        self.failures[name] = 0
+        self.next_attempt.pop(name, None)
+        self.restarts[name] = self.restarts.get(name, 0) + 1
+        logger.info(f"MCP server '{name}' recuperado por {how}")
+        if self.on_replace:
+            self.on_replace(name)
+
+    def _spawn_standby(self, name: str):
+        task = self._standby_tasks.get(name)
+        if name in self.standbys or (task and not task.done()):
+            return
+        self._standby_tasks[name] = asyncio.create_task(self._start_standby(name))
+
+    async def _start_standby(self, name: str):
+        client = self.factories[name]()
+        try:
+            await client.start_server()
+        except asyncio.CancelledError:
+            await self._stop_quietly(client)
+            raise
+        except Exception as e:
+            logger.error(f"Reserva do MCP server '{name}' não iniciou: {e}")
+            await self._stop_quietly(client)
+            return
+        if name in self.factories:
+            self.standbys[name] = client
+        else:
+            await self._stop_quietly(client)
+
+    async def _stop_quietly(self, client: Any):
+        try:
+            await client.stop_server()
+        except Exception as e:
+            logger.debug(f"Erro ao parar MCP server: {e}")
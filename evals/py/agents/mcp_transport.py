@@ -0,0 +1,420 @@
+import asyncio
+import json
+import logging
+import re
+from collections import deque
+from typing import Dict, List, Any, Optional, Callable, Awaitable, Tuple, Union
+
+logger = logging.getLogger(__name__)
+stderr_logger = logging.getLogger(f"{__name__}.stderr")
+
+# Teto de uma mensagem JSON-RPC (uma linha); também é o limite do StreamReader do processo
+DEFAULT_MAX_MESSAGE_BYTES = 16 * 1024 * 1024
+DEFAULT_STDERR_LINES = 200
+
+# Caracteres que mudam o estado da varredura dentro de strings e de valores aninhados
+_STRING_SPECIAL = re.compile(rb'["\\]')
+_NESTED_SPECIAL = re.compile(rb'[{}\[\]"]')
+_MAX_TOKEN_BYTES = 256
+
+NotificationHandler = Callable[[Dict[str, Any]], Union[None, Awaitable[None]]]
+
+
+class MCPTransportError(RuntimeError):
+    """Erro de comunicação com o MCP server"""
+
+
+class _TopLevelKeys:
+    """
+    Varre um objeto JSON recebido em pedaços e guarda apenas as chaves de primeiro nível
+    e o valor de "id". Valores aninhados (ex.: itens de um result com seus próprios "id")
+    e strings longas são saltados sem serem decodificados.
+    """
+
+    def __init__(self):
+        self.keys = set()
+        self.id: Optional[str] = None
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.key: Optional[bytes] = None
+        self.after_colon = False
+        # Chave ou valor do id sendo lido: ("key" | "id", bytes)
+        self.token: Optional[Tuple[str, bytearray]] = None
+
+    def feed(self, data: bytes):
+        pos, size = 0, len(data)
+        while pos < size:
+            if self.escape:
+                self.escape = False
+                self._collect(data[pos:pos + 1])
+                pos += 1
+            elif self.in_string:
+                pos = self._string(data, pos)
+            elif self.depth > 1:
+                match = _NESTED_SPECIAL.search(data, pos)
+                if match is None:
+                    return
+                pos = match.end()
+                char = match.group()
+                if char == b'"':
+                    self.in_string = True
+                elif char in b"{[":
+                    self.depth += 1
+                else:
+                    self.depth -= 1
+            else:
+                self._top_level(data[pos:pos + 1])
+                pos += 1
+        return
+
+    def _string(self, data: bytes, pos: int) -> int:
+        match = _STRING_SPECIAL.search(data, pos)
+        end = match.start() if match else len(data)
+        self._collect(data[pos:end])
+        if match is None:
+            return end
+        if match.group() == b"\\":
+            self.escape = True
+        else:
+            self.in_string = False
+            self._finish_string()
+        return match.end()
+
+    def _collect(self, chunk: bytes):
+        if self.token is not None and len(self.token[1]) < _MAX_TOKEN_BYTES:
+            self.token[1].extend(chunk)
+
+    def _finish_string(self):
+        if self.token is None:
+            return
+        kind, value = self.token
+        self.token = None
+        if kind == "key":
+            self.key = bytes(value)
+            self.keys.add(self.key.decode(errors="ignore"))
+        else:
+            self.id = value.decode(errors="ignore")
+
+    def _finish_number(self):
+        if self.token is not None and self.token[0] == "number":
+            self.id = self.token[1].decode(errors="ignore")
+            self.token = None
+
+    def _top_level(self, char: bytes):
+        if char in b"{[":
+            self.depth += 1
+        elif char in b"}]":
+            self._finish_number()
+            self.depth -= 1
+        elif self.depth != 1:
+            return
+        elif char == b'"':
+            self.in_string = True
+            if not self.after_colon:
+                self.token = ("key", bytearray())
+            elif self.key == b"id":
+                self.token = ("id", bytearray())
+        elif char == b":":
+            self.after_colon = True
+        elif char == b",":
+            self._finish_number()
+            self.key = None
+            self.after_colon = False
+        elif self.after_colon and self.key == b"id" and not char.isspace():
+            if self.token is None:
+                self.token = ("number", bytearray())
+            self._collect(char)
+        elif char.isspace():
+            self._finish_number()
+
+
+class StdioJSONRPCTransport:
+    """Transporte JSON-RPC sobre stdio que multiplexa requisições pelo id"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, default_timeout: Optional[float] = 60.0,
+                 max_message_bytes: int = DEFAULT_MAX_MESSAGE_BYTES):
+        self.reader = reader
+        self.writer = writer
+        self.default_timeout = default_timeout
+        # Deve coincidir com o limit do StreamReader (create_subprocess_exec(limit=...))
+        self.max_message_bytes = max_message_bytes
+        self.message_id = 0
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.notification_handlers: Dict[str, NotificationHandler] = {}
+        self.request_handlers: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {
+            "ping": self._handle_ping,
+        }
+        self._write_lock = asyncio.Lock()
+        self._reader_task: Optional[asyncio.Task] = None
+        self._closed_error: Optional[Exception] = None
+
+    def get_next_id(self) -> str:
+        """Gera próximo ID de mensagem"""
+        self.message_id += 1
+        return str(self.message_id)
+
+    def start(self):
+        """Inicia a tarefa que lê e roteia as mensagens do server"""
+        if self._reader_task is None:
+            self._reader_task = asyncio.create_task(self._read_loop())
+
+    async def close(self):
+        """Encerra a leitura e falha as requisições pendentes"""
+        if self._reader_task:
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except asyncio.CancelledError:
+                pass
+            self._reader_task = None
+        self._fail_pending(MCPTransportError("Transporte encerrado"))
+
+    @property
+    def is_open(self) -> bool:
+        return self._reader_task is not None and not self._reader_task.done()
+
+    def on_notification(self, method: str, handler: NotificationHandler):
+        """Registra um handler para notificações do server"""
+        self.notification_handlers[method] = handler
+
+    async def _write(self, payload: Dict[str, Any]):
+        data = json.dumps(payload, default=str) + '\n'
+        async with self._write_lock:
+            self.writer.write(data.encode())
+            await self.writer.drain()
+
+    async def notify(self, method: str, params: Optional[Dict[str, Any]] = None):
+        """Envia uma notificação (sem resposta)"""
+        payload = {"jsonrpc": "2.0", "method": method}
+        if params is not None:
+            payload["params"] = params
+        await self._write(payload)
+
+    async def request(
+        self,
+        method: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        request_id: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Envia uma requisição e aguarda a resposta com o mesmo id"""
+        if self._closed_error:
+            raise MCPTransportError(str(self._closed_error))
+        if not self.is_open:
+            raise MCPTransportError("Transporte não iniciado")
+
+        request_id = request_id or self.get_next_id()
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+
+        payload = {"jsonrpc": "2.0", "id": request_id, "method": method}
+        if params is not None:
+            payload["params"] = params
+
+        try:
+            await self._write(payload)
+            return await asyncio.wait_for(future, timeout if timeout is not None else self.default_timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Requisição '{method}' ({request_id}) excedeu o tempo limite")
+            await self._cancel_remote(request_id, "timeout")
+            raise
+        except asyncio.CancelledError:
+            await self._cancel_remote(request_id, "cancelled")
+            raise
+        finally:
+            self.pending.pop(request_id, None)
+
+    async def _cancel_remote(self, request_id: str, reason: str):
+        """Avisa o server que a requisição foi abandonada"""
+        if not self.is_open:
+            return
+        try:
+            await self.notify("notifications/cancelled", {"requestId": request_id, "reason": reason})
+        except Exception as e:
+            logger.debug(f"Não foi possível enviar cancelamento de {request_id}: {e}")
+
+    async def _read_line(self) -> bytes:
+        """Lê uma mensagem; mensagens acima do limite são descartadas sem derrubar a conexão"""
+        while True:
+            try:
+                return await self.reader.readuntil(b"\n")
+            except asyncio.IncompleteReadError as e:
+                # EOF: devolve o que sobrou (vazio encerra a leitura)
+                return e.partial
+            except asyncio.LimitOverrunError as e:
+                await self._discard_oversized(e.consumed)
+
+    async def _discard_oversized(self, consumed: int):
+        """Consome a mensagem grande até o fim da linha e falha a requisição correspondente"""
+        # O "id" pode vir depois do result (SDK TypeScript) e o result pode ter "id" aninhados:
+        # só o id de primeiro nível identifica a requisição
+        scanner = _TopLevelKeys()
+        chunk = await self.reader.readexactly(consumed)
+        scanner.feed(chunk)
+        total = len(chunk)
+        while True:
+            try:
+                chunk = await self.reader.readuntil(b"\n")
+            except asyncio.LimitOverrunError as e:
+                chunk = await self.reader.readexactly(e.consumed)
+            except asyncio.IncompleteReadError as e:
+                scanner.feed(e.partial)
+                total += len(e.partial)
+                break
+            else:
+                scanner.feed(chunk)
+                total += len(chunk)
+                break
+            scanner.feed(chunk)
+            total += len(chunk)
+
+        error = MCPTransportError(
+            f"Mensagem de {total} bytes excede o limite de {self.max_message_bytes} bytes (max_message_bytes)"
+        )
+        logger.error(str(error))
+        if "method" in scanner.keys:
+            # Notificação ou requisição do server: nenhuma requisição nossa espera por ela
+            return
+        if scanner.id is not None:
+            future = self.pending.get(scanner.id)
+            if future and not future.done():
+                future.set_exception(error)
+            return
+        # Resposta sem id legível: qualquer requisição pendente pode ser a dona
+        self._fail_pending(error)
+
+    async def _read_loop(self):
+        try:
+            while True:
+                line = await self._read_line()
+                if not line:
+                    raise MCPTransportError("MCP server encerrou a conexão")
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    message = json.loads(line.decode())
+                except json.JSONDecodeError:
+                    # Alguns servers escrevem logs no stdout
+                    logger.debug(f"Linha ignorada do MCP server: {line[:200]!r}")
+                    continue
+                await self._dispatch(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._closed_error = e
+            logger.error(f"Leitura do MCP server interrompida: {e}")
+            self._fail_pending(e)
+
+    async def _dispatch(self, message: Dict[str, Any]):
+        if "method" not in message:
+            future = self.pending.get(str(message.get("id")))
+            if future and not future.done():
+                future.set_result(message)
+            else:
+                logger.debug(f"Resposta sem requisição pendente: {message.get('id')}")
+            return
+
+        if "id" in message:
+            asyncio.create_task(self._answer_server_request(message))
+            return
+
+        handler = self.notification_handlers.get(message["method"])
+        if handler is None:
+            logger.debug(f"Notificação do MCP server: {message['method']}")
+            return
+        try:
+            outcome = handler(message.get("params") or {})
+            if asyncio.iscoroutine(outcome):
+                await outcome
+        except Exception as e:
+            logger.error(f"Erro no handler de '{message['method']}': {e}")
+
+    async def _answer_server_request(self, message: Dict[str, Any]):
+        """Responde requisições iniciadas pelo server (ex.: ping)"""
+        handler = self.request_handlers.get(message["method"])
+        if handler is None:
+            response = {
+                "jsonrpc": "2.0",
+                "id": message["id"],
+                "error": {"code": -32601, "message": f"Método '{message['method']}' não suportado"},
+            }
+        else:
+            try:
+                response = {"jsonrpc": "2.0", "id": message["id"], "result": await handler(message.get("params") or {})}
+            except Exception as e:
+                response = {"jsonrpc": "2.0", "id": message["id"], "error": {"code": -32603, "message": str(e)}}
+        try:
+            await self._write(response)
+        except Exception as e:
+            logger.debug(f"Não foi possível responder ao MCP server: {e}")
+
+    async def _handle_ping(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return {}
+
+    def _fail_pending(self, error: Exception):
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(MCPTransportError(str(error)))
+        self.pending.clear()
+
+
+class StderrDrain:
+    """
+    Lê o stderr do server continuamente, para que o pipe nunca encha e bloqueie o processo.
+    As últimas linhas ficam num buffer circular e cada linha vai para o logger mcp_transport.stderr.
+    """
+
+    def __init__(self, stream: asyncio.StreamReader, name: str, max_lines: int = DEFAULT_STDERR_LINES,
+                 max_line_chars: int = 2000):
+        self.stream = stream
+        self.name = name
+        self.lines: deque = deque(maxlen=max_lines)
+        self.max_line_chars = max_line_chars
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._drain())
+
+    async def _drain(self):
+        partial = b""
+        try:
+            while True:
+                # read() em vez de readline(): linhas longas não estouram o limite do StreamReader
+                chunk = await self.stream.read(64 * 1024)
+                if not chunk:
+                    break
+                *lines, partial = (partial + chunk).split(b"\n")
+                for line in lines:
+                    self._record(line)
+                if len(partial) > self.max_line_chars * 4:
+                    self._record(partial)
+                    partial = b""
+            if partial:
+                self._record(partial)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"Leitura do stderr de '{self.name}' interrompida: {e}")
+
+    def _record(self, raw: bytes):
+        line = raw.decode(errors="replace").rstrip()[:self.max_line_chars]
+        if line:
+            self.lines.append(line)
+            stderr_logger.debug(f"[{self.name}] {line}")
+
+    def tail(self, count: int = 20) -> List[str]:
+        """Últimas linhas do stderr"""
+        return list(self.lines)[-count:]
+
+    async def close(self):
+        if self._task:
+            if not self._task.done():
+                self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,243 @@
+import copy
+import json
+from typing import Dict, List, Any, Callable, Tuple
+
+# Um validador recebe o valor e o caminho e devolve (valor convertido, erros)
+Validator = Callable[[Any, str], Tuple[Any, List[Dict[str, Any]]]]
+
+_MISSING = object()
+
+
+def _error(path: str, message: str, expected: Any = None, received: Any = _MISSING) -> Dict[str, Any]:
+    error = {"path": path or "$", "error": message}
+    if expected is not None:
+        error["expected"] = expected
+    if received is not _MISSING:
+        error["received"] = received
+    return error
+
+
+def _coerce_integer(value: Any):
+    if isinstance(value, bool):
+        return _MISSING
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, str):
+        try:
+            number = float(value.strip())
+        except ValueError:
+            return _MISSING
+        return int(number) if number.is_integer() else _MISSING
+    return _MISSING
+
+
+def _coerce_number(value: Any):
+    if isinstance(value, bool):
+        return _MISSING
+    if isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        try:
+            number = float(value.strip())
+        except ValueError:
+            return _MISSING
+        return int(number) if number.is_integer() and "." not in value else number
+    return _MISSING
+
+
+def _coerce_boolean(value: Any):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ("true", "false"):
+        return value.strip().lower() == "true"
+    if isinstance(value, int) and value in (0, 1):
+        return bool(value)
+    return _MISSING
+
+
+def _coerce_string(value: Any):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    return _MISSING
+
+
+def _coerce_array(value: Any):
+    if isinstance(value, list):
+        return value
+    if isinstance(value, str) and value.strip().startswith("["):
+        try:
+            parsed = json.loads(value)
+        except json.JSONDecodeError:
+            return _MISSING
+        return parsed if isinstance(parsed, list) else _MISSING
+    return _MISSING
+
+
+def _coerce_object(value: Any):
+    if isinstance(value, dict):
+        return value
+    if isinstance(value, str) and value.strip().startswith("{"):
+        try:
+            parsed = json.loads(value)
+        except json.JSONDecodeError:
+            return _MISSING
+        return parsed if isinstance(parsed, dict) else _MISSING
+    return _MISSING
+
+
+def _coerce_null(value: Any):
+    return None if value is None else _MISSING
+
+
+COERCERS = {
+    "integer": _coerce_integer,
+    "number": _coerce_number,
+    "boolean": _coerce_boolean,
+    "string": _coerce_string,
+    "array": _coerce_array,
+    "object": _coerce_object,
+    "null": _coerce_null,
+}
+
+
+def compile_schema(schema: Dict[str, Any]) -> Validator:
+    """
+    Compila um JSON Schema (subconjunto usado pelas ferramentas) num validador.
+
+    Suporta type, properties, required, default, additionalProperties, items,
+    enum, minimum/maximum, minLength/maxLength e minItems/maxItems.
+    Valores são convertidos quando possível ("5" -> 5, "true" -> True).
+    """
+    if not isinstance(schema, dict) or not schema:
+        return lambda value, path="": (value, [])
+
+    checks: List[Validator] = []
+
+    types = schema.get("type")
+    if types is not None:
+        types = [types] if isinstance(types, str) else list(types)
+        coercers = [(name, COERCERS[name]) for name in types if name in COERCERS]
+
+        def check_type(value, path):
+            # Primeiro o tipo exato, depois a conversão
+            for name, coerce in coercers:
+                if coerce(value) is value:
+                    return value, []
+            for name, coerce in coercers:
+                converted = coerce(value)
+                if converted is not _MISSING:
+                    return converted, []
+            return value, [_error(path, "tipo inválido", expected=" | ".join(types), received=value)]
+
+        checks.append(check_type)
+
+    if "enum" in schema:
+        options = schema["enum"]
+
+        def check_enum(value, path):
+            if value in options:
+                return value, []
+            return value, [_error(path, "valor não permitido", expected=options, received=value)]
+
+        checks.append(check_enum)
+
+    bounds = [
+        ("minimum", lambda value, limit: value >= limit, (int, float)),
+        ("maximum", lambda value, limit: value <= limit, (int, float)),
+        ("minLength", lambda value, limit: len(value) >= limit, str),
+        ("maxLength", lambda value, limit: len(value) <= limit, str),
+        ("minItems", lambda value, limit: len(value) >= limit, list),
+        ("maxItems", lambda value, limit: len(value) <= limit, list),
+    ]
+    for keyword, within, applies_to in bounds:
+        if keyword in schema:
+            checks.append(_bound_check(keyword, schema[keyword], within, applies_to))
+
+    if "properties" in schema or "required" in schema or schema.get("additionalProperties") is False:
+        checks.append(_compile_object(schema))
+
+    if isinstance(schema.get("items"), dict):
+        item_validator = compile_schema(schema["items"])
+
+        def check_items(value, path):
+            if not isinstance(value, list):
+                return value, []
+            items, errors = [], []
+            for index, item in enumerate(value):
+                item, item_errors = item_validator(item, f"{path}[{index}]")
+                items.append(item)
+                errors.extend(item_errors)
+            return items, errors
+
+        checks.append(check_items)
+
+    def validate(value, path=""):
+        errors: List[Dict[str, Any]] = []
+        for check in checks:
+            value, check_errors = check(value, path)
+            if check_errors:
+                errors.extend(check_errors)
+                # Sem o tipo certo, as demais verificações só gerariam ruído
+                break
+        return value, errors
+
+    return validate
+
+
+def _bound_check(keyword: str, limit: Any, within: Callable[[Any, Any], bool], applies_to) -> Validator:
+    def check(value, path):
+        if isinstance(value, applies_to) and not isinstance(value, bool) and not within(value, limit):
+            return value, [_error(path, f"viola {keyword}", expected=limit, received=value)]
+        return value, []
+    return check
+
+
+def _compile_object(schema: Dict[str, Any]) -> Validator:
+    properties = {name: compile_schema(sub_schema) for name, sub_schema in (schema.get("properties") or {}).items()}
+    defaults = {
+        name: sub_schema["default"]
+        for name, sub_schema in (schema.get("properties") or {}).items()
+        if isinstance(sub_schema, dict) and "default" in sub_schema
+    }
+    required = [name for name in schema.get("required", []) if name not in defaults]
+    closed = schema.get("additionalProperties") is False
+
+    def check_object(value, path):
+        if not isinstance(value, dict):
+            return value, []
+        result = dict(value)
+        errors: List[Dict[str, Any]] = []
+        for name in required:
+            if name not in result:
+                errors.append(_error(f"{path}.{name}" if path else name, "parâmetro obrigatório ausente"))
+        for name, default in defaults.items():
+            if name not in result:
+                result[name] = copy.deepcopy(default)
+        for name, item in value.items():
+            item_path = f"{path}.{name}" if path else name
+            validator = properties.get(name)
+            if validator is not None:
+                result[name], item_errors = validator(item, item_path)
+                errors.extend(item_errors)
+            elif closed:
+                errors.append(_error(item_path, "parâmetro desconhecido", expected=sorted(properties)))
+        return result, errors
+
+    return check_object
+
+
+def format_errors(tool_name: str, errors: List[Dict[str, Any]]) -> str:
+    """Mensagem curta para o modelo corrigir todos os parâmetros de uma vez"""
+    parts = []
+    for error in errors:
+        part = f"{error['path']}: {error['error']}"
+        if "expected" in error:
+            part += f" (esperado: {error['expected']})"
+        if "received" in error:
+            part += f" (recebido: {error['received']!r})"
+        parts.append(part)
+    return f"Parâmetros inválidos para '{tool_name}': " + "; ".join(parts)
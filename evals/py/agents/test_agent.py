@@ -3,72 +3,88 @@ from deepeval.test_case import LLMTestCase, LLMTestCaseParams, ToolCall
 from deepeval.metrics import GEval, AnswerRelevancyMetric, TaskCompletionMetric, ToolCorrectnessMetric
 import agent_codigo
 import asyncio
+from judge_cache import cached_metrics
 
 API_KEY = ""  # Substitua pela sua chave real
-agent = agent_codigo.LLMAgent(API_KEY)
-
-input_text = "crie e registre um agente responsavel por somar numeros inteiros"
-# Chamada do seu agente
-def run_agent(input_text):
-    return asyncio.run(agent.process_message(input_text))
-
-agent_output = run_agent(input_text)
-
-# Métrica GEval: clareza
-g_eval = GEval(
-    name="clarity",
-    criteria="The response must be clear and directly answer the question.",
-    model="gpt-4o",
-    evaluation_params=[
-        LLMTestCaseParams.ACTUAL_OUTPUT,
-        LLMTestCaseParams.EXPECTED_OUTPUT,
-        LLMTestCaseParams.RETRIEVAL_CONTEXT 
-    ]
-)
-
-# Métrica de relevância
-relevancy = AnswerRelevancyMetric()
-
-# Métrica de completude de tarefa
-task_completion = TaskCompletionMetric(
-    threshold=0.7,
-    model="gpt-4o",
-    include_reason=True
-)
-
-# Métrica de ferramentas (simulando uma chamada de ferramenta)
-tool_correctness = ToolCorrectnessMetric(
-    should_consider_ordering=False
-)
-
-filename = "agent_example.py"
-expected_output = ""
-with open(filename, "r", encoding="utf-8") as file:
-    expected_output = file.read()
-
-filename = "agent_generated.py"
-actual_output = ""
-with open(filename, "r", encoding="utf-8") as file:
-    actual_output = file.read()
-
-tools_called = [call['tool'] for call in agent_output['tool_calls']]
-retrieval_context = """
+
+RETRIEVAL_CONTEXT = """
 Este agente deve ser capaz de gerar código do agente solicitado pelo usuário utilizando o template especificado no seu system prompt e salvar em um arquivo chamado agent_generated.py
 É utilizada a ferramenta registerAgent para esse propósito.
 """
 
-# Criação do test case com ferramentas usadas
-test_case = LLMTestCase(
-    input=input_text,
-    actual_output=actual_output,
-    expected_output=expected_output,
-    tools_called=[ToolCall(name=t) for t in tools_called],
-    expected_tools=[ToolCall(name="registerAgent")],
-    retrieval_context=[retrieval_context]
-)
-
-# Avaliação
-evaluate(
-    test_cases=[test_case],
-    metrics=[g_eval, relevancy, task_completion, tool_correctness]
-)
+
+async def run_case(case: dict) -> dict:
+    """Executa um caso num agente novo; usado pelo eval_runner (test_agent.py:run_case)"""
+    agent = agent_codigo.LLMAgent(API_KEY)
+    agent_output = await agent.process_message(case["input"])
+
+    # O código gerado vem do próprio registerAgent: casos em paralelo não disputam agent_generated.py
+    generated = [
+        call["params"].get("code", "") for call in agent_output["tool_calls"] if call["tool"] == "registerAgent"
+    ]
+    return {
+        "actual_output": generated[-1] if generated else agent_output["response"],
+        "response": agent_output["response"],
+        "tools_called": [call["tool"] for call in agent_output["tool_calls"]],
+        "tool_calls": agent_output["tool_calls"],
+    }
+
+
+def build_metrics() -> list:
+    # Métrica GEval: clareza
+    g_eval = GEval(
+        name="clarity",
+        criteria="The response must be clear and directly answer the question.",
+        model="gpt-4o",
+        evaluation_params=[
+            LLMTestCaseParams.ACTUAL_OUTPUT,
+            LLMTestCaseParams.EXPECTED_OUTPUT,
+            LLMTestCaseParams.RETRIEVAL_CONTEXT
+        ]
+    )
+
+    # Métrica de relevância
+    relevancy = AnswerRelevancyMetric()
+
+    # Métrica de completude de tarefa
+    task_completion = TaskCompletionMetric(
+        threshold=0.7,
+        model="gpt-4o",
+        include_reason=True
+    )
+
+    # Métrica de ferramentas (simulando uma chamada de ferramenta)
+    tool_correctness = ToolCorrectnessMetric(
+        should_consider_ordering=False
+    )
+
+    return [g_eval, relevancy, task_completion, tool_correctness]
+
+
+def build_test_case(case: dict, result: dict) -> LLMTestCase:
+    """Test case do deepeval a partir de um caso e do resultado gravado pelo eval_runner"""
+    expected_output = case.get("expected_output")
+    if expected_output is None:
+        with open(case.get("expected_output_file", "agent_example.py"), "r", encoding="utf-8") as file:
+            expected_output = file.read()
+
+    return LLMTestCase(
+        input=case["input"],
+        actual_output=result.get("actual_output") or "",
+        expected_output=expected_output,
+        tools_called=[ToolCall(name=t) for t in result.get("tools_called", [])],
+        expected_tools=[ToolCall(name=t) for t in case.get("expected_tools", ["registerAgent"])],
+        retrieval_context=case.get("retrieval_context", [RETRIEVAL_CONTEXT])
+    )
+
+
+if __name__ == "__main__":
+    input_text = "crie e registre um agente responsavel por somar numeros inteiros"
+    case = {"input": input_text}
+    result = asyncio.run(run_case(case))
+
+    # Avaliação: veredictos já calculados para o mesmo caso e saída vêm do cache
+    evaluate(
+        test_cases=[build_test_case(case, result)],
+        metrics=cached_metrics(build_metrics())
+    )
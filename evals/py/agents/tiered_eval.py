@@ -0,0 +1,211 @@
+import argparse
+import asyncio
+import json
+import logging
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Callable
+
+from deepeval.metrics.utils import copy_metrics
+
+from eval_runner import load_cases, load_target, read_results, case_id
+from judge_cache import CachedMetric, JudgeCache, cached_metrics
+from valid_ast import RULE_PACKS, validate_code
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JUDGE_CONCURRENCY = 4
+# Sem min_ast_score no caso: basta o código ser válido e ter algum elemento do template
+DEFAULT_MIN_AST_SCORE = 1
+
+
+def _uses_judge(metric) -> bool:
+    return bool(getattr(metric, "evaluation_model", None))
+
+
+def check_ast(case: Dict[str, Any], result: Dict[str, Any], default_pack: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Tier 1: estrutura do código gerado (valid_ast). None quando o caso não gera código"""
+    pack = case.get("ast_pack", default_pack)
+    if not pack:
+        return None
+    score, report = validate_code(result.get("actual_output") or "", pack)
+    if "error" in report:
+        return {"passed": False, "score": 0, "error": report["error"]}
+    min_score = case.get("min_ast_score", DEFAULT_MIN_AST_SCORE)
+    missing = [name for name, ok in report.items() if not ok]
+    return {"passed": score >= min_score, "score": score, "min_score": min_score, "missing": missing}
+
+
+def _matches(expected: Any, actual: Any) -> bool:
+    """Parâmetros esperados são um subconjunto dos recebidos"""
+    if isinstance(expected, dict):
+        return isinstance(actual, dict) and all(
+            key in actual and _matches(value, actual[key]) for key, value in expected.items()
+        )
+    return expected == actual
+
+
+def check_tools(case: Dict[str, Any], result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Tier 2: sequência exata de ferramentas e, se definidos, seus parâmetros"""
+    expected_calls = case.get("expected_tool_calls")
+    expected_names = case.get("expected_tools")
+    if expected_calls is None and expected_names is None:
+        return None
+    if expected_names is None:
+        expected_names = [call["tool"] for call in expected_calls]
+
+    called = result.get("tool_calls") or [{"tool": name, "params": None} for name in result.get("tools_called", [])]
+    called_names = [call["tool"] for call in called]
+
+    if case.get("tool_order", "exact") == "any":
+        sequence_ok = Counter(called_names) == Counter(expected_names)
+    else:
+        sequence_ok = called_names == list(expected_names)
+    if not sequence_ok:
+        return {"passed": False, "reason": "sequência de ferramentas", "expected": expected_names, "called": called_names}
+
+    for index, expected in enumerate(expected_calls or []):
+        if "params" not in expected:
+            continue
+        # Com ordem livre, qualquer chamada da mesma ferramenta pode satisfazer a expectativa
+        candidates = [called[index]] if case.get("tool_order", "exact") != "any" else [
+            call for call in called if call["tool"] == expected["tool"]
+        ]
+        if not any(_matches(expected["params"], call.get("params")) for call in candidates):
+            return {
+                "passed": False, "reason": "parâmetros", "tool": expected["tool"],
+                "expected": expected["params"], "called": [call.get("params") for call in candidates],
+            }
+    return {"passed": True, "called": called_names}
+
+
+class TieredEvaluator:
+    """
+    Avalia resultados do eval_runner em camadas: AST, ferramentas e, só para os casos
+    aprovados nas duas primeiras, as métricas com juiz LLM (com cache de veredictos).
+    """
+
+    def __init__(
+        self,
+        build_metrics: Callable[[], list],
+        build_test_case: Callable[[Dict[str, Any], Dict[str, Any]], Any],
+        ast_pack: Optional[str] = None,
+        judge_concurrency: int = DEFAULT_JUDGE_CONCURRENCY,
+        use_cache: bool = True,
+        cache: Optional[JudgeCache] = None,
+    ):
+        metrics = build_metrics()
+        self.metrics = cached_metrics(metrics, cache) if use_cache else metrics
+        self.judge_metrics = sum(_uses_judge(metric) for metric in self.metrics)
+        self.build_test_case = build_test_case
+        self.ast_pack = ast_pack
+        self.semaphore = asyncio.Semaphore(judge_concurrency)
+
+    async def evaluate_case(self, case: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+        score: Dict[str, Any] = {"id": case_id(case), "tiers": {}, "judge_calls": 0, "judge_calls_saved": 0}
+
+        if result.get("status") != "ok":
+            score.update(decided_by="run", passed=False, judge_calls_saved=self.judge_metrics)
+            score["tiers"]["run"] = {"passed": False, "error": result.get("error")}
+            return score
+
+        for tier, check in (("ast", lambda: check_ast(case, result, self.ast_pack)), ("tools", lambda: check_tools(case, result))):
+            outcome = check()
+            if outcome is None:
+                continue
+            score["tiers"][tier] = outcome
+            if not outcome["passed"]:
+                # Reprovado numa camada barata: os juízes não são chamados
+                score.update(decided_by=tier, passed=False, judge_calls_saved=self.judge_metrics)
+                return score
+
+        score["tiers"]["judge"] = await self._judge(case, result, score)
+        score["decided_by"] = "judge"
+        score["passed"] = score["tiers"]["judge"]["passed"]
+        return score
+
+    async def _judge(self, case: Dict[str, Any], result: Dict[str, Any], score: Dict[str, Any]) -> Dict[str, Any]:
+        test_case = self.build_test_case(case, result)
+        # Cópias por caso: as métricas guardam score/reason na instância
+        metrics = copy_metrics(self.metrics)
+        async with self.semaphore:
+            outcomes = await asyncio.gather(*(metric.a_measure(test_case) for metric in metrics), return_exceptions=True)
+
+        verdicts = {}
+        for metric, outcome in zip(metrics, outcomes):
+            if isinstance(outcome, Exception):
+                metric.error = f"{type(outcome).__name__}: {outcome}"
+            cached = isinstance(metric, CachedMetric) and metric.cached
+            if _uses_judge(metric):
+                if cached:
+                    score["judge_calls_saved"] += 1
+                else:
+                    score["judge_calls"] += 1
+            verdicts[metric.__name__] = {
+                "score": metric.score,
+                "passed": metric.error is None and bool(metric.success),
+                "reason": metric.reason,
+                "cached": cached,
+                **({"error": str(metric.error)} if metric.error is not None else {}),
+            }
+        return {"passed": all(verdict["passed"] for verdict in verdicts.values()), "metrics": verdicts}
+
+    async def evaluate(self, cases: List[Dict[str, Any]], results: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+        pending = [case for case in cases if case_id(case) in results]
+        return await asyncio.gather(*(self.evaluate_case(case, results[case_id(case)]) for case in pending))
+
+
+def summarize(scores: List[Dict[str, Any]]) -> Dict[str, Any]:
+    decided = Counter(score["decided_by"] for score in scores)
+    return {
+        "cases": len(scores),
+        "passed": sum(score["passed"] for score in scores),
+        "decided_by": dict(decided),
+        "judge_calls": sum(score["judge_calls"] for score in scores),
+        "judge_calls_saved": sum(score["judge_calls_saved"] for score in scores),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Avaliação em camadas (AST, ferramentas, juízes LLM) dos resultados do eval_runner")
+    parser.add_argument("cases", help="JSONL de casos")
+    parser.add_argument("--results", default=None, help="JSONL do eval_runner (padrão: <cases>.results.jsonl)")
+    parser.add_argument("--scores", default=None, help="Saída (padrão: <cases>.scores.jsonl)")
+    parser.add_argument("--metrics", default="test_agent.py:build_metrics")
+    parser.add_argument("--test-case", default="test_agent.py:build_test_case")
+    parser.add_argument("--ast-pack", choices=sorted(RULE_PACKS), default=None, help="Pacote de regras para casos sem ast_pack")
+    parser.add_argument("--judge-concurrency", type=int, default=DEFAULT_JUDGE_CONCURRENCY)
+    parser.add_argument("--no-cache", action="store_true", help="Não usa o cache de veredictos dos juízes")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    cases_path = Path(args.cases)
+    results = read_results(Path(args.results or cases_path.with_suffix(".results.jsonl")))
+    scores_path = Path(args.scores or cases_path.with_suffix(".scores.jsonl"))
+
+    async def run():
+        evaluator = TieredEvaluator(
+            load_target(args.metrics),
+            load_target(args.test_case),
+            ast_pack=args.ast_pack,
+            judge_concurrency=args.judge_concurrency,
+            use_cache=not args.no_cache,
+        )
+        return await evaluator.evaluate(load_cases(args.cases), results)
+
+    scores = asyncio.run(run())
+    with open(scores_path, "w", encoding="utf-8") as f:
+        for score in scores:
+            f.write(json.dumps(score, ensure_ascii=False, default=str) + "\n")
+
+    for score in scores:
+        print(f"{'✅' if score['passed'] else '❌'} {score['id']}: decidido por {score['decided_by']}")
+    summary = summarize(scores)
+    print(
+        f"\n{summary['passed']}/{summary['cases']} aprovados; decididos por camada: {summary['decided_by']}; "
+        f"chamadas a juízes: {summary['judge_calls']} (economizadas: {summary['judge_calls_saved']})"
+    )
+
+
+if __name__ == "__main__":
+    main()
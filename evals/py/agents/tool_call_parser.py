@@ -0,0 +1,221 @@
+import asyncio
+import json
+import logging
+from typing import Dict, List, Any, Optional, AsyncIterator, Awaitable, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOOL_CALL_PREFIX = "TOOL_CALL:"
+SERVER_PREFIX = "SERVER:"
+PARAMS_PREFIX = "PARAMS:"
+# Linhas após o TOOL_CALL em que SERVER/PARAMS são procurados (como no parser original)
+HEADER_LINES = 3
+
+
+class StreamingToolCallParser:
+    """
+    Reconhece blocos TOOL_CALL/SERVER/PARAMS enquanto a resposta do LLM chega.
+
+    Cada chamada é devolvida por feed() assim que o JSON de PARAMS fecha,
+    sem esperar o fim da resposta. O texto já analisado não é relido.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.state = "search"
+        self.current: Optional[Dict[str, Any]] = None
+        self.header_lines = 0
+        self.params_pending = False
+        # Estado da varredura do JSON, preservado entre os trechos
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consome um trecho da resposta e retorna as chamadas completas"""
+        self.buffer += chunk
+        calls = []
+        while True:
+            before = (self.state, len(self.buffer), self.pos)
+            if self.state == "search":
+                call = self._search()
+            elif self.state == "header":
+                call = self._header()
+            else:
+                call = self._scan_json()
+            if call is not None:
+                calls.append(call)
+            elif (self.state, len(self.buffer), self.pos) == before:
+                # Sem progresso: aguarda o próximo trecho
+                break
+        return calls
+
+    def close(self) -> List[Dict[str, Any]]:
+        """Finaliza a resposta, retornando uma chamada que ficou sem PARAMS"""
+        calls = self.feed("\n")
+        if self.state == "json":
+            logger.error(f"PARAMS incompletos para '{self.current['tool']}': {self.buffer[:200]}")
+        elif self.state == "header" and self.current is not None:
+            calls.append(self.current)
+        self.state = "search"
+        self.params_pending = False
+        self.current = None
+        self.buffer = ""
+        return calls
+
+    def _search(self) -> None:
+        line_end = self.buffer.find("\n")
+        if line_end == -1:
+            return None
+        line = self.buffer[:line_end].strip()
+        self.buffer = self.buffer[line_end + 1:]
+        if line.startswith(TOOL_CALL_PREFIX):
+            self.current = {"tool": line[len(TOOL_CALL_PREFIX):].strip(), "server": None, "params": {}}
+            self.state = "header"
+            self.header_lines = 0
+            self.params_pending = False
+        return None
+
+    def _header(self) -> Optional[Dict[str, Any]]:
+        """
+        Lê SERVER/PARAMS nas até HEADER_LINES linhas após o TOOL_CALL. Qualquer outra linha
+        encerra a chamada sem PARAMS: JSON de exemplo no texto não vira argumento.
+        """
+        if self.params_pending:
+            # "PARAMS:" sozinho na linha: o objeto pode vir na linha seguinte
+            stripped = self.buffer.lstrip()
+            if not stripped:
+                self.buffer = ""
+                return None
+            self.params_pending = False
+            if stripped.startswith("{"):
+                self._start_json(stripped)
+                return None
+            self.buffer = stripped
+
+        if self.header_lines >= HEADER_LINES:
+            return self._end_header()
+
+        text = self.buffer.lstrip(" \t")
+        if text.startswith(PARAMS_PREFIX):
+            rest = text[len(PARAMS_PREFIX):].lstrip(" \t\r")
+            if rest.startswith("{"):
+                self._start_json(rest)
+            elif rest.startswith("\n"):
+                self.header_lines += 1
+                self.params_pending = True
+                self.buffer = rest[1:]
+            elif rest:
+                # Valor que não é objeto JSON: descarta a linha
+                self.header_lines += 1
+                self._skip_line(text)
+            return None
+
+        line_end = text.find("\n")
+        if line_end == -1:
+            return None
+        line = text[:line_end].strip()
+        if line and not line.startswith(SERVER_PREFIX):
+            # Texto, outro TOOL_CALL ou JSON sem PARAMS: a linha volta para a busca
+            self.buffer = text
+            return self._end_header()
+
+        if line:
+            self.current["server"] = line[len(SERVER_PREFIX):].strip()
+        self.header_lines += 1
+        self.buffer = text[line_end + 1:]
+        return None
+
+    def _end_header(self) -> Dict[str, Any]:
+        call, self.current = self.current, None
+        self.state = "search"
+        return call
+
+    def _skip_line(self, text: str):
+        line_end = text.find("\n")
+        self.buffer = text[line_end + 1:] if line_end != -1 else ""
+
+    def _start_json(self, text: str):
+        self.buffer = text
+        self.state = "json"
+        self.pos = 0
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+
+    def _scan_json(self) -> Optional[Dict[str, Any]]:
+        buffer = self.buffer
+        while self.pos < len(buffer):
+            char = buffer[self.pos]
+            self.pos += 1
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    return self._finish_json()
+        return None
+
+    def _finish_json(self) -> Optional[Dict[str, Any]]:
+        params_str = self.buffer[:self.pos]
+        self.buffer = self.buffer[self.pos:]
+        self.state = "search"
+        call, self.current = self.current, None
+        try:
+            # strict=False aceita quebras de linha literais dentro de strings (comum em código gerado)
+            call["params"] = json.loads(params_str, strict=False)
+        except json.JSONDecodeError as e:
+            logger.error(f"Erro ao parsear parâmetros para '{call['tool']}':\n{params_str}\n{e}")
+            return None
+        return call
+
+
+def parse_tool_calls(text: str) -> List[Dict[str, Any]]:
+    """Extrai todas as chamadas de um texto completo"""
+    parser = StreamingToolCallParser()
+    return parser.feed(text) + parser.close()
+
+
+async def dispatch_streamed_tool_calls(
+    stream: AsyncIterator[str],
+    execute: Callable[[Dict[str, Any]], Awaitable[Any]],
+    accept: Callable[[Dict[str, Any]], bool] = lambda call: True,
+) -> Tuple[str, List[Dict[str, Any]], List[Any]]:
+    """
+    Consome o stream do LLM e inicia cada ferramenta assim que sua chamada fica completa,
+    sobrepondo a execução das ferramentas com o restante da geração.
+    Retorna o texto completo, as chamadas aceitas e seus resultados (na mesma ordem).
+    """
+    parser = StreamingToolCallParser()
+    parts: List[str] = []
+    calls: List[Dict[str, Any]] = []
+    tasks: List[asyncio.Task] = []
+
+    def start(new_calls: List[Dict[str, Any]]):
+        for call in new_calls:
+            if accept(call):
+                calls.append(call)
+                tasks.append(asyncio.create_task(execute(call)))
+
+    try:
+        async for delta in stream:
+            parts.append(delta)
+            start(parser.feed(delta))
+        start(parser.close())
+        results = list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        raise
+
+    return "".join(parts), calls, results
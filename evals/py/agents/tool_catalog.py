@@ -0,0 +1,138 @@
+import json
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_FORMATS = ("pretty", "compact")
+
+# Campos que não mudam a forma de chamar a ferramenta
+REDUNDANT_SCHEMA_KEYS = {"$schema", "$id", "$comment", "title"}
+
+# Chaves cujos valores são mapas nome -> schema
+SCHEMA_MAPS = ("properties", "patternProperties", "$defs", "definitions")
+# Chaves cujos valores são listas de schemas
+SCHEMA_LISTS = ("anyOf", "oneOf", "allOf", "prefixItems")
+# Chaves cujos valores são um schema
+SCHEMA_VALUES = ("items", "additionalProperties", "not", "if", "then", "else", "contains")
+
+
+def compact_schema(schema: Any) -> Any:
+    """Remove de um JSON Schema os campos que não afetam a chamada (títulos, $schema, defaults vazios)"""
+    if not isinstance(schema, dict):
+        return schema
+
+    compact = {}
+    for key, value in schema.items():
+        if key in REDUNDANT_SCHEMA_KEYS:
+            continue
+        if key == "required" and not value:
+            continue
+        if key == "additionalProperties" and value is True:
+            continue
+        if key in SCHEMA_MAPS and isinstance(value, dict):
+            value = {name: compact_schema(sub_schema) for name, sub_schema in value.items()}
+        elif key in SCHEMA_LISTS and isinstance(value, list):
+            value = [compact_schema(sub_schema) for sub_schema in value]
+        elif key in SCHEMA_VALUES:
+            value = [compact_schema(item) for item in value] if isinstance(value, list) else compact_schema(value)
+        compact[key] = value
+    return compact
+
+
+def render_schema(schema: Dict[str, Any], schema_format: str = "pretty") -> str:
+    """Serializa o schema para o prompt: "pretty" (indentado) ou "compact" (sem espaços e campos redundantes)"""
+    if schema_format == "compact":
+        return json.dumps(compact_schema(schema), separators=(",", ":"), ensure_ascii=False)
+    return json.dumps(schema, indent=2)
+
+
+_encodings: Dict[str, Any] = {}
+
+
+def _get_encoding(model: Optional[str]):
+    key = model or ""
+    if key not in _encodings:
+        encoding = None
+        if tiktoken is not None:
+            try:
+                encoding = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+            except KeyError:
+                encoding = _get_encoding(None)
+            except Exception as e:
+                # Sem acesso aos arquivos do tokenizer: usa a estimativa
+                logger.debug(f"Tokenizer indisponível ({e}); usando estimativa")
+        _encodings[key] = encoding
+    return _encodings[key]
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    """Conta tokens com tiktoken quando disponível; caso contrário estima ~4 caracteres por token"""
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
+
+
+class ToolRegistry:
+    """
+    Índice das ferramentas de vários servers pelo nome qualificado "server.ferramenta".
+
+    Nomes únicos entre os servers são expostos sem prefixo e resolvidos sem SERVER;
+    nomes repetidos recebem o prefixo do server, que não muda com a ordem dos servers.
+    """
+
+    def __init__(self, tools: List[Dict[str, Any]]):
+        # "server.ferramenta" -> ferramenta (com _server)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        # nome da ferramenta -> servers que a oferecem
+        self.servers_by_tool: Dict[str, List[str]] = {}
+        for tool in tools:
+            server_name = tool["_server"]
+            self.entries[self.qualified_name(server_name, tool["name"])] = tool
+            self.servers_by_tool.setdefault(tool["name"], []).append(server_name)
+
+    @staticmethod
+    def qualified_name(server_name: str, tool_name: str, separator: str = ".") -> str:
+        return f"{server_name}{separator}{tool_name}"
+
+    def is_unique(self, tool_name: str) -> bool:
+        return len(self.servers_by_tool.get(tool_name, ())) == 1
+
+    def exposed_name(self, server_name: str, tool_name: str, separator: str = ".") -> str:
+        """Nome mostrado ao modelo: sem prefixo quando único, com o server em caso de colisão"""
+        if self.is_unique(tool_name):
+            return tool_name
+        return self.qualified_name(server_name, tool_name, separator)
+
+    def tools(self) -> List[Dict[str, Any]]:
+        return list(self.entries.values())
+
+    def resolve(self, tool_name: str, server_name: Optional[str] = None) -> Tuple[Optional[str], str, Optional[str]]:
+        """
+        Resolve a chamada para (server, ferramenta, erro) sem percorrer o catálogo.
+
+        Aceita "ferramenta" + SERVER, "server.ferramenta" e o nome sem SERVER quando único.
+        Um SERVER errado é corrigido quando a ferramenta só existe em um server.
+        """
+        if server_name and self.qualified_name(server_name, tool_name) in self.entries:
+            return server_name, tool_name, None
+
+        tool = self.entries.get(tool_name)
+        if tool is not None:
+            return tool["_server"], tool["name"], None
+
+        servers = self.servers_by_tool.get(tool_name)
+        if not servers:
+            return server_name, tool_name, f"Ferramenta '{tool_name}' não encontrada"
+        if len(servers) == 1:
+            if server_name:
+                logger.info(f"Ferramenta '{tool_name}' roteada para o server '{servers[0]}' (pedido: '{server_name}')")
+            return servers[0], tool_name, None
+        options = ", ".join(self.qualified_name(server, tool_name) for server in servers)
+        return server_name, tool_name, f"Ferramenta '{tool_name}' existe em vários servers; use um de: {options}"
@@ -1,74 +1,343 @@
+import argparse
 import ast
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Callable, Iterable, Tuple
 
-def validate_agent_code(code: str) -> tuple[int, dict]:
-    try:
-        tree = ast.parse(code)
-        report = {}
+# Mudar ao alterar regras: invalida o cache de resultados
+ENGINE_VERSION = "2"
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent / ".valid_ast_cache.json"
 
-        # 1. Classe LLMAgent
-        report["has_llm_agent"] = any(
-            isinstance(node, ast.ClassDef) and node.name == "Agent"
-            for node in tree.body
-        )
 
-        # 2. Função main
-        report["has_main_func"] = any(
-            isinstance(node, ast.FunctionDef) and node.name == "main"
-            for node in tree.body
+class Rule:
+    """
+    Item do relatório: satisfeito quando algum nó dos tipos `node_types` passa em `check`.
+
+    `check(node, parents)` recebe a cadeia de ancestrais (parents[0] é o módulo),
+    de modo que a árvore é percorrida uma única vez para todas as regras.
+    """
+
+    def __init__(self, name: str, node_types: Tuple[type, ...], check: Callable[[ast.AST, List[ast.AST]], bool]):
+        self.name = name
+        self.node_types = node_types
+        self.check = check
+
+
+# Funções e métodos contam igualmente como def ou async def
+FUNCTION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef)
+
+RULE_PACKS: Dict[str, List[Rule]] = {}
+_ENGINES: Dict[str, "RuleEngine"] = {}
+
+
+def register_pack(name: str, rules: List[Rule]):
+    """Adiciona (ou substitui) um pacote de regras disponível em validate_code e na CLI"""
+    RULE_PACKS[name] = rules
+    _ENGINES.pop(name, None)
+
+
+class RuleEngine:
+    """Avalia um pacote de regras numa única travessia da AST"""
+
+    def __init__(self, rules: List[Rule]):
+        self.rules = rules
+        self.dispatch: Dict[type, List[Rule]] = {}
+        for rule in rules:
+            for node_type in rule.node_types:
+                self.dispatch.setdefault(node_type, []).append(rule)
+
+    def run(self, tree: ast.AST) -> Dict[str, bool]:
+        satisfied = set()
+        pending = len(self.rules)
+        # Pilha explícita de (nó, ancestrais): sem recursão e sem ast.walk aninhado
+        stack: List[Tuple[ast.AST, List[ast.AST]]] = [(tree, [])]
+        while stack and len(satisfied) < pending:
+            node, parents = stack.pop()
+            for rule in self.dispatch.get(type(node), ()):
+                if rule.name not in satisfied and rule.check(node, parents):
+                    satisfied.add(rule.name)
+            children = list(ast.iter_child_nodes(node))
+            if children:
+                chain = parents + [node]
+                stack.extend((child, chain) for child in reversed(children))
+        return {rule.name: rule.name in satisfied for rule in self.rules}
+
+
+def _is_top_level(parents: List[ast.AST]) -> bool:
+    return len(parents) == 1 and isinstance(parents[0], ast.Module)
+
+
+def _attr(node: ast.AST) -> str:
+    """Nome chamado: `f(...)` -> "f", `obj.f(...)` -> "f" """
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Name):
+        return node.id
+    return ""
+
+
+def _top_level_class(rule_name: str, class_name: str) -> Rule:
+    return Rule(
+        rule_name, (ast.ClassDef,),
+        lambda node, parents: node.name == class_name and _is_top_level(parents)
+    )
+
+
+def _is_main_test(test: ast.AST) -> bool:
+    return isinstance(test, ast.Compare) and any(
+        isinstance(e, ast.Constant) and e.value == "__main__" for e in ast.walk(test)
+    )
+
+
+def _inside_main_block(parents: List[ast.AST]) -> bool:
+    return len(parents) > 1 and isinstance(parents[1], ast.If) and _is_top_level(parents[:1]) and _is_main_test(parents[1].test)
+
+
+def _method_of(class_check: Callable[[ast.ClassDef], bool], method: str) -> Callable[[ast.AST, List[ast.AST]], bool]:
+    def check(node, parents):
+        return (
+            node.name == method and len(parents) == 2 and _is_top_level(parents[:1])
+            and isinstance(parents[1], ast.ClassDef) and class_check(parents[1])
         )
+    return check
+
+
+def _call_to(rule_name: str, *names: str) -> Rule:
+    return Rule(rule_name, (ast.Call,), lambda node, parents: _attr(node.func) in names)
+
+
+# ---------- Template MCP (agent_codigo / agent_busca) ----------
+
+register_pack("mcp", [
+    # Como na versão original, procura a classe "Agent" (o template usa LLMAgent)
+    _top_level_class("has_llm_agent", "Agent"),
+    Rule("has_main_func", FUNCTION_NODES, lambda node, parents: node.name == "main" and _is_top_level(parents)),
+    Rule(
+        "has_main_block", (ast.Call,),
+        lambda node, parents: _attr(node.func) == "run" and isinstance(node.func, ast.Attribute) and _inside_main_block(parents)
+    ),
+    _top_level_class("has_mcp_tool_class", "MCPTool"),
+    Rule("has_execute_in_mcp_tool", FUNCTION_NODES, _method_of(lambda cls: cls.name == "MCPTool", "execute")),
+    Rule(
+        "has_tool_impl", FUNCTION_NODES,
+        _method_of(lambda cls: any(isinstance(base, ast.Name) and base.id == "MCPTool" for base in cls.bases), "execute")
+    ),
+])
+
+
+# ---------- Template LangGraph (src/gerador) ----------
+
+def _annotated_state(node, parents) -> bool:
+    return _is_top_level(parents) and any(
+        isinstance(arg.annotation, ast.Name) and arg.annotation.id == "MessagesState" for arg in node.args.args
+    )
+
+
+register_pack("langgraph", [
+    Rule(
+        "imports_langgraph", (ast.ImportFrom,),
+        lambda node, parents: (node.module or "").split(".")[0] == "langgraph"
+    ),
+    _call_to("has_state_graph", "StateGraph"),
+    Rule("has_node_function", FUNCTION_NODES, _annotated_state),
+    _call_to("has_edges", "add_edge", "add_conditional_edges"),
+    _call_to("has_tools", "ToolNode", "bind_tools"),
+    Rule(
+        "compiles_graph", (ast.Call,),
+        lambda node, parents: isinstance(node.func, ast.Attribute) and node.func.attr == "compile"
+    ),
+])
+
+
+# ---------- Template ADK (src/adk_generator) ----------
 
-        # 3. Bloco __main__ com asyncio.run(main())
-        report["has_main_block"] = any(
-            isinstance(node, ast.If) and isinstance(node.test, ast.Compare) and
-            any(
-                isinstance(e, ast.Constant) and e.value == "__main__"
-                for e in ast.walk(node.test)
-            ) and
-            any(
-                isinstance(e, ast.Call) and getattr(e.func, 'attr', '') == "run"
-                for e in ast.walk(node)
-            )
-            for node in tree.body
+def _root_agent_call(node, parents) -> Optional[ast.Call]:
+    if not _is_top_level(parents) or not isinstance(node.value, ast.Call):
+        return None
+    if not any(isinstance(target, ast.Name) and target.id == "root_agent" for target in node.targets):
+        return None
+    return node.value
+
+
+def _root_agent_keyword(keyword: str) -> Callable[[ast.AST, List[ast.AST]], bool]:
+    def check(node, parents):
+        call = _root_agent_call(node, parents)
+        return call is not None and any(item.arg == keyword for item in call.keywords)
+    return check
+
+
+register_pack("adk", [
+    Rule(
+        "imports_adk", (ast.ImportFrom,),
+        lambda node, parents: (node.module or "").startswith("google.adk")
+    ),
+    Rule(
+        "has_root_agent", (ast.Assign,),
+        lambda node, parents: _is_top_level(parents) and any(
+            isinstance(target, ast.Name) and target.id == "root_agent" for target in node.targets
         )
+    ),
+    Rule(
+        "root_agent_is_agent", (ast.Assign,),
+        lambda node, parents: _attr(getattr(_root_agent_call(node, parents), "func", None)) in ("Agent", "LlmAgent")
+    ),
+    Rule("has_instruction", (ast.Assign,), _root_agent_keyword("instruction")),
+    Rule("has_tools", (ast.Assign,), _root_agent_keyword("tools")),
+])
+
 
-        # 4. Classe MCPTool com método abstrato execute
-        report["has_mcp_tool_class"] = False
-        report["has_execute_in_mcp_tool"] = False
-        for node in tree.body:
-            if isinstance(node, ast.ClassDef) and node.name == "MCPTool":
-                report["has_mcp_tool_class"] = True
-                for item in node.body:
-                    if isinstance(item, ast.FunctionDef) and item.name == "execute":
-                        report["has_execute_in_mcp_tool"] = True
-
-        # 5. Classe concreta que herda MCPTool e implementa execute
-        report["has_tool_impl"] = False
-        for node in tree.body:
-            if isinstance(node, ast.ClassDef):
-                base_names = [base.id for base in node.bases if isinstance(base, ast.Name)]
-                if "MCPTool" in base_names:
-                    for item in node.body:
-                        if isinstance(item, ast.FunctionDef) and item.name == "execute":
-                            report["has_tool_impl"] = True
-
-        # Pontuação: 1 ponto por item encontrado
-        score = sum(report.values())
-        return score, report
+def _engine(pack: str) -> RuleEngine:
+    if pack not in _ENGINES:
+        _ENGINES[pack] = RuleEngine(RULE_PACKS[pack])
+    return _ENGINES[pack]
 
+
+def validate_code(code: str, pack: str = "mcp") -> Tuple[int, dict]:
+    """Valida o código com um pacote de regras; pontuação = 1 ponto por item encontrado"""
+    try:
+        report = _engine(pack).run(ast.parse(code))
+        return sum(report.values()), report
     except Exception as e:
-        print(f"Erro na validação do código: {e}")
         return 0, {"error": str(e)}
 
 
-if __name__ == "__main__":
-    try:
-        with open("agent_generated.py", "r", encoding="utf-8") as f:
-            code = f.read()
+def validate_agent_code(code: str) -> tuple[int, dict]:
+    score, report = validate_code(code, "mcp")
+    if "error" in report:
+        print(f"Erro na validação do código: {report['error']}")
+    return score, report
+
+
+# ---------- Validação em lote ----------
+
+def content_key(code: str, pack: str) -> str:
+    return hashlib.sha256(f"{ENGINE_VERSION}\0{pack}\0{code}".encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """Resultados por hash do conteúdo, num arquivo JSON gravado ao final do lote"""
+
+    def __init__(self, path: Optional[Path]):
+        self.path = Path(path) if path else None
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+        if self.path and self.path.exists():
+            try:
+                self.entries = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, json.JSONDecodeError):
+                self.entries = {}
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(key)
+
+    def put(self, key: str, result: Dict[str, Any]):
+        self.entries[key] = result
+        self.dirty = True
+
+    def save(self):
+        if not self.path or not self.dirty:
+            return
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.entries), encoding="utf-8")
+        tmp_path.replace(self.path)
 
-        score, report = validate_agent_code(code)
-        print(f"\n✅ Pontuação: {score}/6")
-        for key, value in report.items():
+
+def _validate_task(task: Tuple[str, str]) -> Dict[str, Any]:
+    code, pack = task
+    score, report = validate_code(code, pack)
+    return {"score": score, "max_score": len(RULE_PACKS[pack]), "report": report}
+
+
+def iter_python_files(paths: Iterable[str]) -> Iterable[Path]:
+    for path in map(Path, paths):
+        if path.is_dir():
+            yield from sorted(item for item in path.rglob("*.py") if "__pycache__" not in item.parts)
+        else:
+            yield path
+
+
+def validate_files(
+    paths: Iterable[str],
+    pack: str = "mcp",
+    workers: Optional[int] = None,
+    cache_path: Optional[Path] = DEFAULT_CACHE_PATH,
+    chunksize: int = 32,
+) -> List[Dict[str, Any]]:
+    """
+    Valida muitos arquivos: conteúdos já vistos saem do cache, conteúdos repetidos
+    são validados uma vez e o restante é distribuído num pool de processos.
+    """
+    cache = ResultCache(cache_path)
+    files: List[Tuple[Path, str]] = []
+    missing: Dict[str, str] = {}
+    results: List[Dict[str, Any]] = []
+
+    for path in iter_python_files(paths):
+        try:
+            code = path.read_text(encoding="utf-8")
+        except (OSError, UnicodeDecodeError) as e:
+            results.append({"path": str(path), "score": 0, "max_score": len(RULE_PACKS[pack]), "report": {"error": str(e)}})
+            continue
+        key = content_key(code, pack)
+        files.append((path, key))
+        if cache.get(key) is None:
+            missing[key] = code
+
+    keys = list(missing)
+    if len(keys) > 1 and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            computed = pool.map(_validate_task, ((missing[key], pack) for key in keys), chunksize=chunksize)
+            for key, result in zip(keys, computed):
+                cache.put(key, result)
+    else:
+        for key in keys:
+            cache.put(key, _validate_task((missing[key], pack)))
+    cache.save()
+
+    for path, key in files:
+        results.append({"path": str(path), **cache.get(key), "cached": key not in missing})
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Valida a estrutura de agentes gerados")
+    parser.add_argument("paths", nargs="*", default=["agent_generated.py"], help="Arquivos ou diretórios")
+    parser.add_argument("--pack", choices=sorted(RULE_PACKS), default="mcp")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--cache", default=str(DEFAULT_CACHE_PATH))
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--json", action="store_true", help="Uma linha JSON por arquivo")
+    args = parser.parse_args()
+
+    paths = [path for path in args.paths if Path(path).exists()]
+    if not paths:
+        print(f"❌ Arquivo '{args.paths[0]}' não encontrado.")
+        return
+
+    results = validate_files(paths, args.pack, args.workers, None if args.no_cache else Path(args.cache))
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result, ensure_ascii=False))
+        return
+
+    if len(results) == 1:
+        result = results[0]
+        print(f"\n✅ Pontuação: {result['score']}/{result['max_score']}")
+        for key, value in result["report"].items():
             status = "✅ OK" if value else "❌ Faltando"
             print(f"- {key}: {status}")
-    except FileNotFoundError:
-        print("❌ Arquivo 'agent_generated.py' não encontrado.")
+        return
+
+    for result in results:
+        print(f"{result['score']}/{result['max_score']}  {result['path']}")
+    perfect = sum(result["score"] == result["max_score"] for result in results)
+    cached = sum(result.get("cached", False) for result in results)
+    print(f"\n{len(results)} arquivos, {perfect} completos, {cached} do cache")
+
+
+if __name__ == "__main__":
+    main()
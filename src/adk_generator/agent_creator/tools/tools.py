@@ -1,3 +1,4 @@
+import sys
 from dotenv import load_dotenv
 from pathlib import Path
 from typing import TypedDict
@@ -7,6 +8,9 @@ load_dotenv(override=True)
 
 current_file_path = Path(__file__).resolve().parent
 
+sys.path.append(str(current_file_path.parents[2]))
+from shared.artifact_store import ArtifactStore
+
 GENERATED_PATH = current_file_path.parent / "arquivos_gerados"
 GENERATED_PATH.mkdir(parents=True, exist_ok=True)
 
@@ -21,6 +25,9 @@ TOOLS_PATH = TOOLS_DIR /"tools.py"
 INIT_TOOLS_PATH = TOOLS_DIR / "__init__.py"
 DOCUMENTATION_PATH = AGENT_DIR / "documentation.md"
 
+# Cada agente concluído fica registrado, endereçado pelo conteúdo (pastas criadas só no registro)
+ARTIFACTS = ArtifactStore(current_file_path.parent / "artefatos")
+
 
 AGENT_CACHE = {
     "name": "",
@@ -226,4 +233,13 @@ def criar_documentacao(role: str, example: str, activation_mode: str, tools_desc
     with open(DOCUMENTATION_PATH, "w", encoding="utf-8") as f:
         f.write(documentation_code)
 
-    return f"A documentação do agente {agent_name} foi criada com sucesso."
\ No newline at end of file
+    _registrar_artefato()
+    return f"A documentação do agente {agent_name} foi criada com sucesso."
+
+
+def _registrar_artefato() -> dict:
+    """
+    Registra arquivos_gerados como uma versão do agente.
+    Chamado só por criar_documentacao, a última etapa: versões parciais não viram a mais recente.
+    """
+    return ARTIFACTS.put_directory(AGENT_CACHE["name"] or "agent", GENERATED_PATH, spec=AGENT_CACHE["prompt"])
@@ -1,8 +1,12 @@
+import sys
 from langchain_core.tools import tool
 from pathlib import Path
 
 current_file_path = Path(__file__).resolve().parent
 
+sys.path.append(str(current_file_path.parents[1]))
+from shared.artifact_store import ArtifactStore
+
 GENERATED_PATH = current_file_path.parent / "arquivos_gerados"
 GENERATED_PATH.mkdir(parents=True, exist_ok=True)
 
@@ -14,6 +18,9 @@ TOOLS_PATH = AGENT_DIR / "tools.py"
 DOCUMENTATION_PATH = AGENT_DIR / "documentation.md"
 MAIN_PATH = GENERATED_PATH / "main.py"
 
+# Cada agente concluído fica registrado, endereçado pelo conteúdo (pastas criadas só no registro)
+ARTIFACTS = ArtifactStore(current_file_path.parent / "artefatos")
+
 AGENT_CACHE = {
     "name": "",
     "prompt": ""
@@ -184,6 +191,7 @@ def criar_documentacao(role: str, example: str, activation_mode: str, tools_desc
     )
     with open(DOCUMENTATION_PATH, "w", encoding="utf-8") as f:
         f.write(documentation_code)
+    _registrar_artefato()
     
     return f"A documentação do agente {agent_name} foi criada com sucesso."
     
@@ -239,3 +247,9 @@ def _criar_main(agent_name: str) -> None:
         f.write(main_code)
 
 
+def _registrar_artefato() -> dict:
+    """
+    Registra arquivos_gerados como uma versão do agente.
+    Chamado só por criar_documentacao, a última etapa: versões parciais não viram a mais recente.
+    """
+    return ARTIFACTS.put_directory(AGENT_CACHE["name"] or "agent", GENERATED_PATH, spec=AGENT_CACHE["prompt"])
@@ -1,10 +1,12 @@
 from langchain_openai import ChatOpenAI
 from langgraph.graph import MessagesState
 from .tools import client
+from .output_store import limitar_tool, read_tool_output
 
 model = ChatOpenAI(model="gpt-4o")
 async def get_tools():
-    return await client.get_tools()
+    mcp_tools = await client.get_tools()
+    return [limitar_tool(mcp_tool) for mcp_tool in mcp_tools] + [read_tool_output]
     
 
 async def mcp_agent(state: MessagesState):
@@ -0,0 +1,92 @@
+import json
+import sys
+from pathlib import Path
+from typing import Any
+
+from langchain_core.tools import BaseTool, StructuredTool, tool
+
+current_file_path = Path(__file__).resolve().parent
+
+# Projeção, limite e armazenamento são os mesmos dos agentes de evals/py/agents
+sys.path.append(str(current_file_path.parents[1]))
+from shared.tool_output import ToolOutputLimiter, ToolOutputStore, DEFAULT_MAX_BYTES, DEFAULT_PAGE_BYTES
+
+OUTPUTS_PATH = current_file_path.parent / "tool_outputs"
+
+MAX_OUTPUT_BYTES = DEFAULT_MAX_BYTES
+PAGE_BYTES = DEFAULT_PAGE_BYTES
+
+# Campos mantidos por ferramenta (caminhos com ponto; listas são percorridas)
+TOOL_PROJECTIONS = {
+    "search_repositories": [
+        "total_count",
+        "items.full_name",
+        "items.description",
+        "items.html_url",
+        "items.language",
+        "items.stargazers_count",
+        "items.updated_at",
+    ],
+    "list_commits": ["sha", "html_url", "commit.message", "commit.author.name", "commit.author.date"],
+    "list_issues": ["number", "title", "state", "html_url", "user.login", "labels.name"],
+    "list_pull_requests": ["number", "title", "state", "html_url", "user.login", "head.ref", "base.ref"],
+}
+
+LIMITER = ToolOutputLimiter(ToolOutputStore(OUTPUTS_PATH), max_bytes=MAX_OUTPUT_BYTES, projections=TOOL_PROJECTIONS)
+
+
+def limitar_saida(tool_name: str, text: str) -> str:
+    """
+    Aplica a projeção da ferramenta e limita o tamanho do resultado.
+    O conteúdo completo é salvo em disco e referenciado por um handle.
+    """
+    return LIMITER.limit_text(tool_name, text)
+
+
+def limitar_tool(mcp_tool: BaseTool) -> BaseTool:
+    """
+    Envolve uma tool do MCP para que seu resultado passe pelo limite de saída.
+
+    Args:
+      mcp_tool (BaseTool): Tool carregada pelo MultiServerMCPClient
+
+    Returns:
+      BaseTool: Tool com o mesmo nome e schema, com saída limitada
+    """
+    coroutine = mcp_tool.coroutine
+
+    async def call_tool(**arguments: Any):
+        content, artifact = await coroutine(**arguments)
+        # Texto ou lista de textos/blocos; blocos não textuais passam inalterados
+        limited = LIMITER.limit_content(mcp_tool.name, content)
+        # Conteúdos não textuais ficam fora do estado quando o resultado é truncado
+        return limited, None if limited != content else artifact
+
+    return StructuredTool(
+        name=mcp_tool.name,
+        description=mcp_tool.description,
+        args_schema=mcp_tool.args_schema,
+        coroutine=call_tool,
+        response_format="content_and_artifact",
+        metadata=mcp_tool.metadata,
+    )
+
+
+@tool
+def read_tool_output(handle: str, offset: int = 0, limit: int = PAGE_BYTES) -> str:
+    """
+    Lê uma página de um resultado de tool que foi truncado
+
+    Args:
+      handle (str): Handle informado no resultado truncado
+      offset (int): Posição em bytes a partir da qual ler
+      limit (int): Quantidade máxima de bytes a ler
+
+    Returns:
+      str: JSON com o trecho lido, o próximo offset e o tamanho total
+    """
+    try:
+        page = LIMITER.read({"handle": handle, "offset": offset, "limit": limit})
+    except KeyError:
+        return f"Handle '{handle}' não encontrado"
+    return json.dumps(page, ensure_ascii=False)
@@ -0,0 +1,174 @@
+import bisect
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Union
+from urllib.parse import quote
+
+
+class ArtifactStore:
+    """
+    Armazena artefatos gerados (conjuntos de arquivos) endereçados pelo hash do conteúdo.
+
+    objects/  um blob por conteúdo distinto (arquivos iguais são guardados uma vez)
+    bundles/  manifesto de cada versão: nome, spec e hash de cada arquivo
+    refs/     versão mais recente de cada nome (consulta O(1))
+    index.jsonl  histórico append-only (nome, spec, horário, bundle)
+
+    As pastas só são criadas na primeira escrita. O histórico é carregado uma vez em índices
+    por nome e por spec, ordenados por horário; depois só as linhas novas do arquivo são lidas.
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+        self.index_path = self.root / "index.jsonl"
+        self._index_offset = 0
+        self._entries: List[Dict[str, Any]] = []
+        self._by_name: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_spec: Dict[str, List[Dict[str, Any]]] = {}
+
+    @staticmethod
+    def _hash(data: bytes) -> str:
+        return hashlib.sha256(data).hexdigest()
+
+    @classmethod
+    def _spec_text(cls, spec: Any) -> Optional[str]:
+        return spec if isinstance(spec, str) or spec is None else json.dumps(spec, sort_keys=True, ensure_ascii=False)
+
+    @classmethod
+    def _spec_hash(cls, spec: Any) -> Optional[str]:
+        text = cls._spec_text(spec)
+        return cls._hash(text.encode("utf-8")) if text is not None else None
+
+    def _write_atomic(self, path: Path, data: bytes):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / digest[2:]
+
+    def _ref_path(self, name: str) -> Path:
+        return self.root / "refs" / quote(name, safe="")
+
+    def put_blob(self, content: Union[str, bytes]) -> str:
+        """Guarda um conteúdo (uma única vez) e retorna seu hash"""
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        digest = self._hash(data)
+        path = self._object_path(digest)
+        if not path.exists():
+            self._write_atomic(path, data)
+        return digest
+
+    def put_bundle(self, name: str, files: Dict[str, Union[str, bytes]], spec: Any = None) -> Dict[str, Any]:
+        """
+        Registra uma versão do artefato `name` com os arquivos {caminho relativo: conteúdo}.
+        Versões idênticas reaproveitam blobs e manifesto; só o histórico ganha uma entrada.
+        """
+        spec_text = self._spec_text(spec)
+        spec_hash = self._spec_hash(spec)
+        blobs = {path: self.put_blob(content) for path, content in sorted(files.items())}
+
+        # O hash do bundle não inclui o horário: a mesma saída gera o mesmo bundle
+        bundle_hash = self._hash(json.dumps({"name": name, "files": blobs}, sort_keys=True).encode("utf-8"))
+        created_at = time.time()
+        bundle_path = self.root / "bundles" / f"{bundle_hash}.json"
+        deduplicated = bundle_path.exists()
+        if not deduplicated:
+            manifest = {
+                "bundle": bundle_hash,
+                "name": name,
+                "spec": spec_text,
+                "spec_hash": spec_hash,
+                "created_at": created_at,
+                "files": blobs,
+            }
+            self._write_atomic(bundle_path, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+
+        entry = {"bundle": bundle_hash, "name": name, "spec_hash": spec_hash, "created_at": created_at}
+        with open(self.index_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        # Traz esta entrada para os índices junto com as de outros processos
+        self._load_index()
+        self._write_atomic(self._ref_path(name), bundle_hash.encode("ascii"))
+
+        return {**entry, "deduplicated": deduplicated}
+
+    def put_directory(self, name: str, directory: Union[str, Path], spec: Any = None) -> Dict[str, Any]:
+        """Registra todos os arquivos de um diretório como uma versão de `name`"""
+        directory = Path(directory)
+        files: Dict[str, bytes] = {}
+        if directory.exists():
+            for path in sorted(directory.rglob("*")):
+                if path.is_file() and "__pycache__" not in path.parts:
+                    files[path.relative_to(directory).as_posix()] = path.read_bytes()
+        return self.put_bundle(name, files, spec)
+
+    def manifest(self, bundle_hash: str) -> Dict[str, Any]:
+        return json.loads((self.root / "bundles" / f"{bundle_hash}.json").read_text(encoding="utf-8"))
+
+    def latest(self, name: str) -> Optional[Dict[str, Any]]:
+        """Manifesto da versão mais recente de `name`"""
+        ref_path = self._ref_path(name)
+        if not ref_path.exists():
+            return None
+        return self.manifest(ref_path.read_text(encoding="ascii").strip())
+
+    def read_file(self, bundle_hash: str, path: str) -> bytes:
+        return self._object_path(self.manifest(bundle_hash)["files"][path]).read_bytes()
+
+    def checkout(self, bundle_hash: str, target: Union[str, Path]) -> Path:
+        """Materializa os arquivos de uma versão num diretório"""
+        target = Path(target)
+        for path, digest in self.manifest(bundle_hash)["files"].items():
+            destination = target / path
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            destination.write_bytes(self._object_path(digest).read_bytes())
+        return target
+
+    def _load_index(self):
+        """Lê só as linhas acrescentadas ao index.jsonl desde a última leitura"""
+        try:
+            with open(self.index_path, "rb") as f:
+                f.seek(self._index_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return
+        # Uma linha ainda sem "\n" está sendo escrita por outro processo
+        complete = data[:data.rfind(b"\n") + 1]
+        self._index_offset += len(complete)
+        for line in complete.splitlines():
+            if line.strip():
+                self._add_to_index(json.loads(line))
+
+    def _add_to_index(self, entry: Dict[str, Any]):
+        lists = [self._entries, self._by_name.setdefault(entry["name"], [])]
+        if entry["spec_hash"] is not None:
+            lists.append(self._by_spec.setdefault(entry["spec_hash"], []))
+        for entries in lists:
+            # Quase sempre no fim; o relógio pode voltar entre processos
+            if entries and entries[-1]["created_at"] > entry["created_at"]:
+                bisect.insort(entries, entry, key=lambda item: item["created_at"])
+            else:
+                entries.append(entry)
+
+    def history(self, name: Optional[str] = None, spec: Any = None, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Entradas do histórico filtradas por nome, spec e horário (mais recentes primeiro)"""
+        self._load_index()
+        spec_hash = self._spec_hash(spec)
+        candidates = [self._entries]
+        if name is not None:
+            candidates.append(self._by_name.get(name, []))
+        if spec_hash is not None:
+            candidates.append(self._by_spec.get(spec_hash, []))
+        # Parte do menor índice e filtra o outro critério
+        entries = min(candidates, key=len)
+        start = bisect.bisect_left(entries, since, key=lambda item: item["created_at"]) if since is not None else 0
+        return [
+            entry for entry in reversed(entries[start:])
+            if (name is None or entry["name"] == name)
+            and (spec_hash is None or entry["spec_hash"] == spec_hash)
+        ]
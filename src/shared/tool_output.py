@@ -0,0 +1,202 @@
+import hashlib
+import json
+import logging
+import re
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 8 * 1024
+DEFAULT_PAGE_BYTES = 4 * 1024
+
+READ_TOOL_NAME = "read_tool_output"
+READ_TOOL_SERVER = "local"
+
+# O handle vem do modelo (read_tool_output): só um sha256 em hexadecimal vira caminho
+HANDLE_PATTERN = re.compile(r"[0-9a-f]{64}")
+
+
+class ToolOutputStore:
+    """
+    Armazena resultados de ferramentas em disco, endereçados pelo hash do conteúdo.
+    A pasta só é criada quando o primeiro resultado é salvo.
+    """
+
+    def __init__(self, root: Union[str, Path]):
+        self.root = Path(root)
+
+    def _path(self, handle: str) -> Path:
+        if not isinstance(handle, str) or not HANDLE_PATTERN.fullmatch(handle):
+            raise KeyError(f"Handle '{handle}' não encontrado")
+        path = self.root / handle[:2] / handle[2:]
+        if not path.resolve().is_relative_to(self.root.resolve()):
+            raise KeyError(f"Handle '{handle}' não encontrado")
+        return path
+
+    def put(self, payload: str) -> str:
+        """Salva o conteúdo e retorna seu handle (sha256)"""
+        data = payload.encode("utf-8")
+        handle = hashlib.sha256(data).hexdigest()
+        path = self._path(handle)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(data)
+            tmp_path.replace(path)
+        return handle
+
+    def size(self, handle: str) -> int:
+        """Tamanho em bytes do conteúdo armazenado"""
+        return self._path(handle).stat().st_size
+
+    def read(self, handle: str, offset: int = 0, limit: int = DEFAULT_PAGE_BYTES) -> Dict[str, Any]:
+        """Lê uma página do conteúdo armazenado"""
+        path = self._path(handle)
+        if not path.exists():
+            raise KeyError(f"Handle '{handle}' não encontrado")
+
+        total = path.stat().st_size
+        offset = max(0, min(offset, total))
+        with open(path, "rb") as f:
+            f.seek(offset)
+            chunk = f.read(max(0, limit))
+
+        # Não corta um caractere UTF-8 ao meio
+        text = chunk.decode("utf-8", errors="ignore")
+        next_offset = offset + len(text.encode("utf-8"))
+        return {
+            "handle": handle,
+            "offset": offset,
+            "next_offset": next_offset if next_offset < total else None,
+            "total_bytes": total,
+            "content": text,
+        }
+
+
+def _projection_tree(fields: List[str]) -> Dict[str, Any]:
+    tree: Dict[str, Any] = {}
+    for field in fields:
+        node = tree
+        parts = field.split(".")
+        for part in parts[:-1]:
+            if part in node and node[part] is None:
+                node = None
+                break
+            node = node.setdefault(part, {})
+        if node is not None:
+            node[parts[-1]] = None
+    return tree
+
+
+def project(data: Any, fields: List[str]) -> Any:
+    """Mantém apenas os campos indicados (caminhos com ponto, listas são percorridas)"""
+    tree = _projection_tree(fields)
+
+    def apply(value: Any, node: Optional[Dict[str, Any]]) -> Any:
+        if node is None:
+            return value
+        if isinstance(value, list):
+            return [apply(item, node) for item in value]
+        if isinstance(value, dict):
+            return {key: apply(value[key], sub) for key, sub in node.items() if key in value}
+        return value
+
+    return apply(data, tree)
+
+
+class ToolOutputLimiter:
+    """Aplica projeção por ferramenta e limite de bytes aos resultados de ferramentas"""
+
+    def __init__(
+        self,
+        store: ToolOutputStore,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        projections: Dict[str, List[str]] = None,
+    ):
+        self.store = store
+        self.max_bytes = max_bytes
+        self.projections = projections or {}
+
+    def _project_text(self, tool_name: str, text: str) -> str:
+        fields = self.projections.get(tool_name)
+        if not fields:
+            return text
+        try:
+            data = json.loads(text)
+        except (json.JSONDecodeError, TypeError):
+            return text
+        return json.dumps(project(data, fields), ensure_ascii=False, separators=(",", ":"))
+
+    def limit_text(self, tool_name: str, text: str) -> str:
+        """Projeta e limita um resultado textual"""
+        projected = self._project_text(tool_name, text)
+        encoded = projected.encode("utf-8")
+        if len(encoded) <= self.max_bytes:
+            return projected
+
+        # Guarda o mesmo texto da prévia: a leitura por offset continua de onde ela parou
+        handle = self.store.put(projected)
+        preview = encoded[: self.max_bytes].decode("utf-8", errors="ignore")
+        next_offset = len(preview.encode("utf-8"))
+        logger.info(f"Resultado de '{tool_name}' com {len(encoded)} bytes salvo em disco: {handle}")
+        return (
+            f"{preview}\n"
+            f"[resultado truncado: {len(encoded)} bytes no total. "
+            f"Use a ferramenta {READ_TOOL_NAME} com handle=\"{handle}\" e offset={next_offset} para ler o restante]"
+        )
+
+    def limit_content(self, tool_name: str, content: Any) -> Any:
+        """
+        Limita o conteúdo de um resultado: texto, ou lista de textos e blocos do MCP.
+        Blocos que não são texto (imagens, recursos) passam inalterados.
+        """
+        if isinstance(content, str):
+            return self.limit_text(tool_name, content)
+        if not isinstance(content, list):
+            return content
+        limited = []
+        for item in content:
+            if isinstance(item, str):
+                item = self.limit_text(tool_name, item)
+            elif isinstance(item, dict) and item.get("type") == "text" and isinstance(item.get("text"), str):
+                item = {**item, "text": self.limit_text(tool_name, item["text"])}
+            limited.append(item)
+        return limited
+
+    def limit_result(self, tool_name: str, result: Any) -> Any:
+        """Projeta e limita o resultado de um tools/call do MCP"""
+        if result is None:
+            return None
+
+        if isinstance(result, dict) and isinstance(result.get("content"), list):
+            return {**result, "content": self.limit_content(tool_name, result["content"])}
+
+        if isinstance(result, str):
+            return self.limit_text(tool_name, result)
+
+        return self.limit_text(tool_name, json.dumps(result, ensure_ascii=False, default=str))
+
+    def read(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Implementação da ferramenta de paginação de resultados salvos"""
+        return self.store.read(
+            params["handle"],
+            offset=int(params.get("offset", 0)),
+            limit=min(int(params.get("limit", DEFAULT_PAGE_BYTES)), self.max_bytes),
+        )
+
+    def read_tool_info(self) -> Dict[str, Any]:
+        """Descrição da ferramenta de paginação no formato do MCP"""
+        return {
+            "name": READ_TOOL_NAME,
+            "description": "Lê uma página de um resultado de ferramenta que foi truncado",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "handle": {"type": "string", "description": "Handle informado no resultado truncado"},
+                    "offset": {"type": "integer", "default": 0},
+                    "limit": {"type": "integer", "default": DEFAULT_PAGE_BYTES},
+                },
+                "required": ["handle"],
+            },
+        }
@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# Os módulos dos evals se importam pelo nome da pasta; os compartilhados ficam em src/
+sys.path[:0] = [str(ROOT / "evals" / "py" / "agents"), str(ROOT / "evals" / "langgraph"),
+                 str(ROOT / "evals" / "google_adk"), str(ROOT / "src")]
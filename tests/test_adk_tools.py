@@ -0,0 +1,92 @@
+import os
+from datetime import date
+from pathlib import Path
+
+import pytest
+
+# adk_tools cria a tool do Tavily ao ser importado
+pytest.importorskip("google.adk")
+pytest.importorskip("langchain_community")
+
+import adk_tools  # noqa: E402
+from adk_tools import get_curriculum_vitae  # noqa: E402
+
+SAMPLE_CV = Path(__file__).resolve().parents[1] / "evals" / "google_adk" / "Currículo_oficina.md"
+
+SHORT_CV = """**Nome:** {name}
+**Endereço:** Rua A, 1 – Recife, PE – Brasil
+
+### Experiência
+**Dev – Empresa X**
+*2020 – Atual*
+
+### Idiomas
+* Inglês – Básico
+"""
+
+
+def _today(monkeypatch, year):
+    class FixedDate(date):
+        @classmethod
+        def today(cls):
+            return cls(year, 6, 1)
+
+    monkeypatch.setattr(adk_tools, "date", FixedDate)
+
+
+def test_sample_curriculum_vitae(monkeypatch):
+    _today(monkeypatch, 2025)
+    profile = get_curriculum_vitae(str(SAMPLE_CV))
+
+    assert profile["name"] == "Lucas Almeida Moreira"
+    assert profile["location"] == "São Paulo, SP, Brasil"
+    assert profile["objective"].startswith("Atuar em projetos de pesquisa")
+    assert profile["languages"] == {"Português": "Nativo", "Inglês": "Avançado", "Espanhol": "Intermediário"}
+    assert profile["skills"]["Linguagens de Programação"] == ["Python", "Java", "Prolog", "Scala"]
+    assert profile["skills"]["Outros"] == ["Git", "Docker", "LaTeX", "Linux"]
+    assert profile["education"][0].startswith("Mestrado em Ciência da Computação")
+    assert profile["seniority"] == {"level": "mid-level", "years_of_experience": 4, "highest_degree": "master"}
+
+
+def test_current_periods_follow_today_on_cached_profiles(monkeypatch):
+    adk_tools._parse_profile.cache_clear()
+    _today(monkeypatch, 2025)
+    assert get_curriculum_vitae(str(SAMPLE_CV))["seniority"]["years_of_experience"] == 4
+    # Mesmo arquivo, mesmo mtime: a análise vem do cache, a senioridade não
+    _today(monkeypatch, 2030)
+    seniority = get_curriculum_vitae(str(SAMPLE_CV))["seniority"]
+    assert seniority["years_of_experience"] == 9 and seniority["level"] == "senior"
+    assert adk_tools._parse_profile.cache_info().misses == 1
+
+
+def test_mtime_change_triggers_a_reparse(tmp_path):
+    adk_tools._parse_profile.cache_clear()
+    path = tmp_path / "cv.md"
+    path.write_text(SHORT_CV.format(name="Ana"), encoding="utf-8")
+    first = get_curriculum_vitae(str(path))
+    assert first["name"] == "Ana" and first["location"] == "Recife, PE, Brasil"
+
+    stat = path.stat()
+    path.write_text(SHORT_CV.format(name="Bia"), encoding="utf-8")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert get_curriculum_vitae(str(path))["name"] == "Bia"
+    assert adk_tools._parse_profile.cache_info().misses == 2
+
+
+def test_profile_changes_do_not_leak_into_the_cache(tmp_path):
+    path = tmp_path / "cv.md"
+    path.write_text(SHORT_CV.format(name="Ana"), encoding="utf-8")
+    profile = get_curriculum_vitae(str(path))
+    profile["languages"]["Inglês"] = "Fluente"
+    profile["experience"].clear()
+    again = get_curriculum_vitae(str(path))
+    assert again["languages"] == {"Inglês": "Básico"}
+    assert again["experience"] == ["Dev – Empresa X – 2020 – Atual"]
+
+
+def test_unknown_layout_returns_the_text(tmp_path):
+    path = tmp_path / "cv.txt"
+    path.write_text("Ana, desenvolvedora", encoding="utf-8")
+    assert get_curriculum_vitae(str(path)) == {"text": "Ana, desenvolvedora"}
+    with pytest.raises(ValueError):
+        get_curriculum_vitae("")
@@ -0,0 +1,37 @@
+import asyncio
+import sys
+
+from agent_mcp import LLMAgentWithExternalMCP
+
+# Server que fecha o stdout no initialize, mas continua vivo
+FAILING_SERVER = """
+import os, sys, time
+sys.stdin.readline()
+os.close(1)
+time.sleep(60)
+"""
+
+
+async def test_failed_servers_are_stopped():
+    agent = LLMAgentWithExternalMCP("sk-test")
+    created = []
+    create_client = agent._create_client
+
+    def recording_create_client(*args, **kwargs):
+        client = create_client(*args, **kwargs)
+        created.append(client)
+        return client
+
+    agent._create_client = recording_create_client
+    timings = await agent.add_mcp_servers({
+        "failing": {"command": [sys.executable, "-c", FAILING_SERVER]},
+        "missing": {"command": ["/nonexistent/mcp-server"]},
+    })
+
+    assert set(timings) == {"failing", "missing"}
+    assert all("error" in timing for timing in timings.values())
+    assert agent.mcp_clients == {}
+    failing = created[0]
+    assert failing.process.returncode is not None
+    assert not failing.transport.is_open
+    assert [task for task in asyncio.all_tasks() if task is not asyncio.current_task()] == []
@@ -0,0 +1,78 @@
+import agent_codigo
+from shared.artifact_store import ArtifactStore
+
+
+def test_store_creates_nothing_until_the_first_write(tmp_path):
+    store = ArtifactStore(tmp_path / "artefatos")
+    assert store.history() == []
+    assert store.latest("agente") is None
+    assert not (tmp_path / "artefatos").exists()
+
+
+def test_identical_bundles_share_blobs_and_manifest(tmp_path):
+    store = ArtifactStore(tmp_path)
+    first = store.put_bundle("soma", {"agent.py": "print(1)", "tools.py": "x = 1"}, spec="soma dois números")
+    second = store.put_bundle("soma", {"tools.py": "x = 1", "agent.py": "print(1)"}, spec="soma dois números")
+
+    assert first["bundle"] == second["bundle"]
+    assert not first["deduplicated"] and second["deduplicated"]
+    assert len(list((tmp_path / "objects").rglob("*"))) == 4  # 2 pastas + 2 blobs
+    assert store.read_file(first["bundle"], "agent.py") == b"print(1)"
+    assert store.latest("soma")["spec"] == "soma dois números"
+
+
+def test_latest_follows_the_newest_version(tmp_path):
+    store = ArtifactStore(tmp_path)
+    store.put_bundle("soma", {"agent.py": "v1"})
+    newest = store.put_bundle("soma", {"agent.py": "v2"})
+    assert store.latest("soma")["bundle"] == newest["bundle"]
+    assert store.checkout(newest["bundle"], tmp_path / "out").joinpath("agent.py").read_text() == "v2"
+
+
+def test_history_by_name_spec_and_time(tmp_path, monkeypatch):
+    clock = iter(range(100, 200))
+    monkeypatch.setattr("shared.artifact_store.time.time", lambda: float(next(clock)))
+    store = ArtifactStore(tmp_path)
+    store.put_bundle("soma", {"a.py": "1"}, spec={"pedido": "soma"})
+    store.put_bundle("busca", {"a.py": "2"}, spec={"pedido": "busca"})
+    store.put_bundle("soma", {"a.py": "3"}, spec={"pedido": "soma"})
+    store.put_bundle("soma", {"a.py": "4"}, spec={"pedido": "outra"})
+
+    assert [entry["created_at"] for entry in store.history(name="soma")] == [103, 102, 100]
+    assert [entry["created_at"] for entry in store.history(spec={"pedido": "soma"})] == [102, 100]
+    assert [entry["created_at"] for entry in store.history(name="soma", spec={"pedido": "soma"}, since=101)] == [102]
+    assert [entry["name"] for entry in store.history(since=102)] == ["soma", "soma"]
+    assert store.history(name="inexistente") == []
+
+
+def test_history_sees_entries_written_by_another_instance(tmp_path):
+    reader = ArtifactStore(tmp_path)
+    assert reader.history() == []
+    ArtifactStore(tmp_path).put_bundle("soma", {"a.py": "1"}, spec="pedido")
+    assert [entry["name"] for entry in reader.history(spec="pedido")] == ["soma"]
+
+
+async def test_register_agent_names_the_bundle_after_the_agent(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = ArtifactStore(tmp_path / ".artifacts")
+    tool = agent_codigo.registerAgent(store)
+    code = "class ToolResult:\n    pass\n\nclass LLMAgent:\n    pass\n"
+
+    result = await tool.execute({"code": code, "agent_name": "agente_soma", "spec": "crie um agente de soma"})
+
+    assert result.success
+    assert store.latest("ToolResult") is None
+    manifest = store.latest("agente_soma")
+    assert manifest["spec"] == "crie um agente de soma"
+    assert store.read_file(manifest["bundle"], "agent_generated.py") == code.encode()
+
+
+def test_llm_agent_passes_the_user_request_as_spec():
+    agent = agent_codigo.LLMAgent.__new__(agent_codigo.LLMAgent)
+    agent.current_request = "crie um agente de soma"
+    call = {"tool": "registerAgent", "params": {"code": "x = 1", "agent_name": "soma"}}
+
+    assert agent._with_spec(call)["params"]["spec"] == "crie um agente de soma"
+    assert "spec" not in call["params"]
+    explicit = {"tool": "registerAgent", "params": {"code": "x = 1", "agent_name": "soma", "spec": "outra"}}
+    assert agent._with_spec(explicit) is explicit
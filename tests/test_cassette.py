@@ -0,0 +1,203 @@
+import json
+import sys
+
+import httpx
+import pytest
+
+import cassette as cassette_module
+from agent_mcp import ExternalMCPClient
+from cassette import Cassette, CassetteMiss, cassette_path, use_cassette
+
+URL = "https://api.example.com/v1/chat/completions"
+
+# Server MCP mínimo via stdio: uma mensagem JSON-RPC por linha
+MCP_SERVER = """
+import json, sys
+for line in sys.stdin:
+    message = json.loads(line)
+    if "id" not in message:
+        continue
+    method = message["method"]
+    if method == "initialize":
+        result = {"capabilities": {"tools": {}}, "serverInfo": {"name": "fake"}}
+    elif method == "tools/list":
+        result = {"tools": [{"name": "soma", "inputSchema": {"type": "object"}}]}
+    else:
+        args = message["params"]["arguments"]
+        result = {"content": [{"type": "text", "text": str(args["a"] + args["b"])}]}
+    print(json.dumps({"jsonrpc": "2.0", "id": message["id"], "result": result}), flush=True)
+"""
+
+
+class CountingHandler:
+    """Serviço falso para o MockTransport: responde com o corpo recebido e conta as chamadas"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        body = json.loads(request.content) if request.content else None
+        return httpx.Response(200, json={"call": self.calls, "echo": body}, headers={"x-request-id": "volatil"})
+
+
+def _post(handler, body, url=URL, headers=None):
+    with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+        return client.post(url, json=body, headers=headers or {})
+
+
+async def _apost(handler, body):
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+        return await client.post(URL, json=body)
+
+
+def test_http_record_then_replay(tmp_path):
+    path = tmp_path / "http.jsonl.gz"
+    handler = CountingHandler()
+    with use_cassette(path, mode="record") as recording:
+        first = _post(handler, {"model": "gpt", "messages": ["oi"]}).json()
+        second = _post(handler, {"model": "gpt", "messages": ["oi"]}).json()
+    assert recording.stats == {"replayed": 0, "recorded": 2}
+    assert path.exists()
+
+    offline = CountingHandler()
+    with use_cassette(path, mode="replay") as replaying:
+        replayed = [_post(offline, {"model": "gpt", "messages": ["oi"]}).json() for _ in range(2)]
+    # Requisições repetidas voltam na ordem gravada, sem tocar no serviço
+    assert replayed == [first, second]
+    assert offline.calls == 0
+    assert replaying.stats == {"replayed": 2, "recorded": 0}
+
+
+async def test_async_http_record_then_replay(tmp_path):
+    path = tmp_path / "http.jsonl"
+    handler = CountingHandler()
+    with use_cassette(path, mode="auto"):
+        recorded = (await _apost(handler, {"prompt": "2+2"})).json()
+    with use_cassette(path, mode="replay"):
+        replayed = await _apost(CountingHandler(), {"prompt": "2+2"})
+    assert replayed.status_code == 200
+    assert replayed.json() == recorded
+    assert "x-request-id" not in replayed.headers
+    assert handler.calls == 1
+
+
+def test_auto_mode_records_only_what_is_missing(tmp_path):
+    path = tmp_path / "http.jsonl"
+    handler = CountingHandler()
+    with use_cassette(path, mode="auto"):
+        _post(handler, {"n": 1})
+    with use_cassette(path, mode="auto") as cassette:
+        _post(handler, {"n": 1})
+        _post(handler, {"n": 2})
+    assert handler.calls == 2
+    assert cassette.stats == {"replayed": 1, "recorded": 1}
+    assert len(Cassette(path).interactions) == 2
+
+
+def test_strict_replay_miss_raises(tmp_path):
+    path = tmp_path / "http.jsonl"
+    with use_cassette(path, mode="record"):
+        _post(CountingHandler(), {"messages": ["oi"]})
+
+    handler = CountingHandler()
+    with use_cassette(path, mode="replay", match="strict"):
+        with pytest.raises(CassetteMiss, match="Sem gravação"):
+            _post(handler, {"messages": ["tchau"]})
+    assert handler.calls == 0
+
+
+def test_lenient_replay_uses_next_recording_of_the_route(tmp_path):
+    path = tmp_path / "http.jsonl"
+    handler = CountingHandler()
+    with use_cassette(path, mode="record"):
+        _post(handler, {"messages": ["a"]})
+        _post(handler, {"messages": ["b"]})
+
+    with use_cassette(path, mode="replay", match="lenient"):
+        assert _post(CountingHandler(), {"messages": ["b"]}).json()["call"] == 2
+        # Sem par idêntico: a gravação ainda não usada da mesma rota
+        assert _post(CountingHandler(), {"messages": ["z"]}).json()["call"] == 1
+        with pytest.raises(CassetteMiss):
+            _post(CountingHandler(), {"messages": ["y"]})
+        with pytest.raises(CassetteMiss):
+            _post(CountingHandler(), {"messages": ["a"]}, url="https://outro.example.com/v1")
+
+
+def test_request_normalization(tmp_path):
+    path = tmp_path / "http.jsonl"
+    with use_cassette(path, mode="record"):
+        _post(
+            CountingHandler(),
+            {"messages": ["id 123e4567-e89b-12d3-a456-426614174000"], "user": "ana", "metadata": {"run": 1}},
+            url=URL + "?api_key=segredo&versao=2",
+            headers={"Authorization": "Bearer segredo"},
+        )
+
+    # Cabeçalhos, segredos, campos voláteis e UUIDs não entram na comparação
+    with use_cassette(path, mode="replay", match="strict") as cassette:
+        _post(
+            CountingHandler(),
+            {"messages": ["id 00000000-0000-0000-0000-000000000000"], "user": "bia", "metadata": {"run": 2}},
+            url=URL + "?api_key=outro&versao=2",
+            headers={"Authorization": "Bearer outro"},
+        )
+        with pytest.raises(CassetteMiss):
+            _post(CountingHandler(), {"messages": ["id 00000000-0000-0000-0000-000000000000"]}, url=URL + "?versao=3")
+    assert cassette.stats["replayed"] == 1
+
+    request = json.loads(path.read_text(encoding="utf-8"))["request"]
+    assert request == {"query": "versao=2", "body": {"messages": ["id <uuid>"]}}
+
+
+def test_cassette_path_per_test(tmp_path):
+    test_file = tmp_path / "sum_agent" / "test_agent.py"
+    assert cassette_path(test_file, "test_case_1") == tmp_path / "sum_agent" / "cassettes" / "test_agent" / "test_case_1.jsonl.gz"
+    assert cassette_path(test_file, "test_soma[2 + 3]").name == "test_soma_2_3.jsonl.gz"
+
+
+def test_invalid_options_and_nested_cassettes(tmp_path):
+    with pytest.raises(ValueError):
+        Cassette(tmp_path / "c.jsonl", mode="playback")
+    with pytest.raises(ValueError):
+        Cassette(tmp_path / "c.jsonl", match="fuzzy")
+    with use_cassette(tmp_path / "a.jsonl", mode="auto"):
+        with pytest.raises(RuntimeError):
+            with use_cassette(tmp_path / "b.jsonl"):
+                pass
+    assert cassette_module._active is None
+
+
+def test_patches_are_removed_on_exit(tmp_path):
+    send, a_send = httpx.Client.send, httpx.AsyncClient.send
+    mcp_send = ExternalMCPClient._send_message
+    with use_cassette(tmp_path / "c.jsonl", mode="auto"):
+        assert httpx.Client.send is not send
+        assert ExternalMCPClient._send_message is not mcp_send
+    assert (httpx.Client.send, httpx.AsyncClient.send) == (send, a_send)
+    assert ExternalMCPClient._send_message is mcp_send
+
+
+async def test_mcp_client_record_then_replay(tmp_path):
+    server = tmp_path / "fake_server.py"
+    server.write_text(MCP_SERVER, encoding="utf-8")
+    path = tmp_path / "mcp.jsonl"
+
+    with use_cassette(path, mode="record"):
+        client = ExternalMCPClient([sys.executable, str(server)])
+        await client.start_server()
+        recorded = await client.call_tool("soma", {"a": 2, "b": 3})
+        await client.stop_server()
+    assert recorded["result"]["content"][0]["text"] == "5"
+
+    # Replay: nenhum processo é criado; catálogo e resultado vêm da cassete
+    with use_cassette(path, mode="replay") as cassette:
+        client = ExternalMCPClient([sys.executable, str(tmp_path / "inexistente" / "fake_server.py")])
+        await client.start_server()
+        assert [tool["name"] for tool in client.tools] == ["soma"]
+        replayed = await client.call_tool("soma", {"a": 2, "b": 3})
+        with pytest.raises(CassetteMiss):
+            await client.call_tool("soma", {"a": 1, "b": 1})
+        await client.stop_server()
+    assert replayed["result"] == recorded["result"]
+    assert cassette.stats["recorded"] == 0
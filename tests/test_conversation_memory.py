@@ -0,0 +1,110 @@
+import asyncio
+
+from conversation_memory import ConversationMemory, truncate_summary
+
+
+def _user(n):
+    return {"role": "user", "content": f"mensagem {n}"}
+
+
+def _call(call_id):
+    return {"role": "assistant", "content": None, "tool_calls": [{"id": call_id, "type": "function"}]}
+
+
+def _result(call_id):
+    return {"role": "tool", "tool_call_id": call_id, "content": "ok"}
+
+
+async def _summarizer_log(calls):
+    async def summarize(summary, messages):
+        calls.append([message["content"] for message in messages])
+        return (summary + " | " if summary else "") + ",".join(str(message["content"]) for message in messages)
+    return summarize
+
+
+def test_oldest_messages_leave_first_outside_a_loop():
+    memory = ConversationMemory(max_messages=3)
+    for n in range(5):
+        memory.append(_user(n))
+    assert [message["content"] for message in memory.recent] == ["mensagem 2", "mensagem 3", "mensagem 4"]
+    assert memory.summary == truncate_summary(truncate_summary("", [_user(0)]), [_user(1)])
+
+
+async def test_evicted_messages_are_summarized_in_order():
+    calls = []
+    memory = ConversationMemory(max_messages=2, summarizer=await _summarizer_log(calls))
+    for n in range(5):
+        memory.append(_user(n))
+    await memory.flush()
+
+    assert [content for batch in calls for content in batch] == ["mensagem 0", "mensagem 1", "mensagem 2"]
+    assert memory.summary.replace(" | ", ",") == "mensagem 0,mensagem 1,mensagem 2"
+    assert memory.messages()[0]["role"] == "system"
+    assert [message["content"] for message in memory.messages()[1:]] == ["mensagem 3", "mensagem 4"]
+
+
+def test_tool_results_leave_together_with_their_call():
+    memory = ConversationMemory(max_messages=4)
+    for message in (_user(0), _call("a"), _result("a"), _result("a2"), _user(1)):
+        memory.append(message)
+    # user(1) removeu o user(0); user(2) remove a chamada e os dois resultados
+    assert [message["role"] for message in memory.recent] == ["assistant", "tool", "tool", "user"]
+    memory.append(_user(2))
+
+    assert list(memory.recent) == [_user(1), _user(2)]
+    assert memory.summary.splitlines() == ["user: mensagem 0", "assistant: ", "tool: ok", "tool: ok"]
+
+
+def test_budget_never_splits_a_call_from_its_results():
+    memory = ConversationMemory(max_messages=10, token_budget=20)
+    memory.append({"role": "user", "content": "x" * 400})
+    memory.append(_call("a"))
+    memory.append({"role": "tool", "tool_call_id": "a", "content": "r" * 400})
+    memory.append(_user(1))
+
+    messages = memory.messages()
+    # O grupo da chamada passa do orçamento: sai inteiro, sem resultado órfão
+    assert messages == [_user(1)]
+
+    memory.append(_call("b"))
+    memory.append({"role": "tool", "tool_call_id": "b", "content": "r" * 400})
+    # O grupo mais recente sempre vai inteiro, mesmo acima do orçamento
+    assert [message["role"] for message in memory.messages()] == ["assistant", "tool"]
+
+
+async def test_summarizer_failure_falls_back_to_truncation():
+    async def failing(summary, messages):
+        raise RuntimeError("LLM fora do ar")
+
+    memory = ConversationMemory(max_messages=1, summarizer=failing)
+    memory.append(_user(0))
+    memory.append(_user(1))
+    await memory.flush()
+    assert memory.summary == "user: mensagem 0"
+    assert memory._evicted == []
+
+
+async def test_cancelled_summary_keeps_messages_pending_and_resumes(tmp_path):
+    started = asyncio.Event()
+    release = asyncio.Event()
+
+    async def slow(summary, messages):
+        started.set()
+        await release.wait()
+        return ",".join(message["content"] for message in messages)
+
+    memory = ConversationMemory(max_messages=1, summarizer=slow, persist_path=str(tmp_path / "memoria.json"))
+    memory.append(_user(0))
+    memory.append(_user(1))
+    await started.wait()
+    memory._summary_task.cancel()
+    await asyncio.sleep(0)
+
+    assert memory.summary == ""
+    assert memory._evicted == [_user(0)]
+    assert ConversationMemory(max_messages=1, persist_path=str(tmp_path / "memoria.json"))._evicted == [_user(0)]
+
+    release.set()
+    await asyncio.wait_for(memory.flush(), 1)
+    assert memory.summary == "mensagem 0"
+    assert memory._evicted == []
@@ -0,0 +1,80 @@
+import json
+import sys
+
+import pytest
+
+import eval_report
+from eval_report import compare, render, summarize
+
+
+def _report(**totals):
+    return {
+        "ok": 2, "cases": 2, "without_usage": 0,
+        "metrics": {name: {"p50": value, "p95": value, "total": value} for name, value in totals.items()},
+    }
+
+
+def test_zero_baseline_is_not_a_regression():
+    rows = compare(_report(prompt_tokens=500), _report(prompt_tokens=0), {})
+    assert {row["change"] for row in rows} == {None}
+    assert not any(row["regression"] for row in rows)
+    assert "sem base" in render(_report(prompt_tokens=500), rows)
+
+
+def test_increase_above_threshold_is_a_regression():
+    rows = compare(_report(llm_calls=12), _report(llm_calls=10), {"llm_calls": 0.1})
+    assert all(row["regression"] for row in rows)
+    assert rows[0]["change"] == 0.2
+
+
+def _record(case, status="ok", elapsed=1.0, prompt_tokens=100):
+    return {"id": case, "status": status, "elapsed_s": elapsed, "usage": {"llm_calls": 1, "prompt_tokens": prompt_tokens}}
+
+
+def test_failed_cases_are_a_regression_row():
+    baseline = summarize([_record(i) for i in range(4)])
+    current = summarize([_record(0), _record(1), _record(2, "error"), _record(3, "error")])
+    rows = compare(current, baseline, {})
+    assert rows[0] == {
+        "metric": "casos_ok", "stat": "ok", "baseline": 4, "current": 2,
+        "change": -0.5, "threshold": 0.0, "regression": True,
+    }
+    # Totais com menos casos não são comparados; p50/p95 continuam
+    assert {row["stat"] for row in rows[1:]} == {"p50", "p95"}
+
+
+def test_all_cases_ok_has_no_cases_row():
+    report = summarize([_record(i) for i in range(2)])
+    assert all(row["metric"] != "casos_ok" for row in compare(report, report, {}))
+
+
+def _run_main(monkeypatch, tmp_path, records, baseline_records=None):
+    results = tmp_path / "cases.results.jsonl"
+    results.write_text("".join(json.dumps(record) + "\n" for record in records), encoding="utf-8")
+    if baseline_records is not None:
+        (tmp_path / "cases.baseline.json").write_text(json.dumps(summarize(baseline_records)), encoding="utf-8")
+    monkeypatch.setattr(sys, "argv", ["eval_report.py", str(results)])
+    eval_report.main()
+
+
+def test_all_failed_run_against_a_baseline_exits_with_error(monkeypatch, tmp_path, capsys):
+    failed = [_record(i, "error") for i in range(4)]
+    with pytest.raises(SystemExit) as exit_info:
+        _run_main(monkeypatch, tmp_path, failed, [_record(i) for i in range(4)])
+    assert exit_info.value.code == 1
+    output = capsys.readouterr().out
+    assert "0/4 casos concluídos" in output
+    assert "casos_ok" in output and "1 regressões acima do limite" in output
+
+
+def test_failed_cases_without_baseline_exit_with_error(monkeypatch, tmp_path, capsys):
+    with pytest.raises(SystemExit) as exit_info:
+        _run_main(monkeypatch, tmp_path, [_record(0), _record(1, "error")])
+    assert exit_info.value.code == 1
+    assert "1 casos falharam" in capsys.readouterr().out
+
+
+def test_clean_run_matching_the_baseline_exits_cleanly(monkeypatch, tmp_path, capsys):
+    records = [_record(i) for i in range(3)]
+    _run_main(monkeypatch, tmp_path, records, records)
+    assert "Sem regressões" in capsys.readouterr().out
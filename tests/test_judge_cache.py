@@ -0,0 +1,192 @@
+import threading
+
+import pytest
+from deepeval.metrics import BaseMetric
+from deepeval.test_case import LLMTestCase
+
+from judge_cache import CachedMetric, JudgeCache, cached_metrics, verdict_key
+
+
+class FakeJudge(BaseMetric):
+    """Métrica com "juiz" falso: conta as chamadas e devolve a nota configurada"""
+
+    calls = 0
+
+    def __init__(self, threshold: float = 0.5, model: str = "juiz-a", criteria: str = "correto", score: float = 0.8):
+        self.threshold = threshold
+        self.model = model
+        self.evaluation_model = model
+        self.criteria = criteria
+        self.fixed_score = score
+        self.async_mode = False
+
+    def measure(self, test_case, *args, **kwargs):
+        type(self).calls += 1
+        self.score = self.fixed_score
+        self.success = self.score >= self.threshold
+        self.reason = f"nota {self.score}"
+        self.evaluation_cost = 0.01
+        return self.score
+
+    async def a_measure(self, test_case, *args, **kwargs):
+        return self.measure(test_case)
+
+    def is_successful(self):
+        return bool(self.success)
+
+    @property
+    def __name__(self):
+        return "Fake Judge"
+
+
+class Deterministic(BaseMetric):
+    def __init__(self, threshold: float = 1.0):
+        self.threshold = threshold
+
+    def measure(self, test_case, *args, **kwargs):
+        self.score = 1.0
+        return self.score
+
+    async def a_measure(self, test_case, *args, **kwargs):
+        return self.measure(test_case)
+
+    def is_successful(self):
+        return True
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    FakeJudge.calls = 0
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = JudgeCache(tmp_path / "judge.sqlite")
+    yield cache
+    cache.close()
+
+
+def _case(output: str = "4") -> LLMTestCase:
+    return LLMTestCase(input="2 + 2?", actual_output=output, expected_output="4")
+
+
+def test_miss_calls_the_judge_and_hit_reuses_the_verdict(cache):
+    first = CachedMetric(FakeJudge(), cache)
+    assert first.measure(_case()) == 0.8
+    assert not first.cached and first.evaluation_cost == 0.01
+    assert FakeJudge.calls == 1
+
+    second = CachedMetric(FakeJudge(), cache)
+    assert second.measure(_case()) == 0.8
+    assert second.cached and second.is_successful()
+    assert second.reason == "nota 0.8"
+    assert second.evaluation_cost == 0
+    assert FakeJudge.calls == 1
+    assert cache.stats() == {"hits": 1, "misses": 1}
+
+
+async def test_async_measure_shares_the_cache(cache):
+    await CachedMetric(FakeJudge(), cache).a_measure(_case())
+    metric = CachedMetric(FakeJudge(), cache)
+    assert await metric.a_measure(_case()) == 0.8
+    assert metric.cached and FakeJudge.calls == 1
+
+
+def test_verdict_persists_across_connections(tmp_path):
+    path = tmp_path / "judge.sqlite"
+    writer = JudgeCache(path)
+    CachedMetric(FakeJudge(), writer).measure(_case())
+    writer.close()
+
+    reader = JudgeCache(path)
+    metric = CachedMetric(FakeJudge(), reader)
+    metric.measure(_case())
+    reader.close()
+    assert metric.cached and FakeJudge.calls == 1
+
+
+@pytest.mark.parametrize("changed", [
+    {"model": "juiz-b"},
+    {"threshold": 0.9},
+    {"criteria": "conciso"},
+])
+def test_config_change_invalidates_the_key(cache, changed):
+    CachedMetric(FakeJudge(), cache).measure(_case())
+    assert verdict_key(FakeJudge(**changed), _case()) != verdict_key(FakeJudge(), _case())
+
+    metric = CachedMetric(FakeJudge(**changed), cache)
+    metric.measure(_case())
+    assert not metric.cached
+    assert FakeJudge.calls == 2
+
+
+def test_test_case_change_invalidates_the_key(cache):
+    CachedMetric(FakeJudge(), cache).measure(_case("4"))
+    metric = CachedMetric(FakeJudge(), cache)
+    metric.measure(_case("5"))
+    assert not metric.cached and FakeJudge.calls == 2
+
+
+def test_result_fields_do_not_change_the_key():
+    measured = FakeJudge()
+    measured.measure(_case())
+    assert verdict_key(measured, _case()) == verdict_key(FakeJudge(), _case())
+
+
+def test_failed_measurement_is_not_cached(cache):
+    class Broken(FakeJudge):
+        def measure(self, test_case, *args, **kwargs):
+            type(self).calls += 1
+            self.error = "juiz indisponível"
+            return None
+
+    metric = CachedMetric(Broken(), cache)
+    metric.measure(_case())
+    assert not metric.is_successful()
+    CachedMetric(Broken(), cache).measure(_case())
+    assert Broken.calls == 2
+
+
+def test_cached_metrics_only_wraps_judged_metrics(cache):
+    judged, plain = cached_metrics([FakeJudge(), Deterministic()], cache)
+    assert isinstance(judged, CachedMetric) and judged.__name__ == "Fake Judge"
+    assert isinstance(plain, Deterministic)
+
+
+def test_concurrent_writers(tmp_path):
+    path = tmp_path / "judge.sqlite"
+    shared = JudgeCache(path)
+    errors = []
+    barrier = threading.Barrier(8)
+
+    def worker(index):
+        try:
+            barrier.wait()
+            # Metade usa a conexão compartilhada, metade abre a sua no mesmo arquivo
+            cache = shared if index % 2 else JudgeCache(path)
+            for case in range(10):
+                CachedMetric(FakeJudge(), cache).measure(_case(str(case)))
+                CachedMetric(FakeJudge(), cache).measure(_case(str(case)))
+            if cache is not shared:
+                cache.close()
+        except Exception as error:  # noqa: BLE001 - o teste só registra a falha
+            errors.append(error)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    # Cada thread mede duas vezes por caso: a segunda é sempre um acerto
+    assert shared.hits + shared.misses == 4 * 20
+    assert shared.hits >= 4 * 10
+    count = shared._connection.execute("SELECT COUNT(*) FROM verdicts").fetchone()[0]
+    assert count == 10
+    shared.close()
+
+    reader = JudgeCache(path)
+    for case in range(10):
+        assert reader.get(verdict_key(FakeJudge(), _case(str(case))))["score"] == 0.8
+    reader.close()
@@ -0,0 +1,120 @@
+import asyncio
+import json
+
+import httpx
+
+from llm_meter import install_meter, track_case
+
+URL = "https://api.example.com/v1/chat/completions"
+USAGE = {"prompt_tokens": 12, "completion_tokens": 3, "total_tokens": 15}
+
+
+def _sse(*events) -> list:
+    return [f"data: {json.dumps(event)}\n\n".encode() for event in events] + [b"data: [DONE]\n\n"]
+
+
+CHUNKS = _sse(
+    {"choices": [{"delta": {"content": "Olá"}}]},
+    {"choices": [{"delta": {"content": " mundo"}}]},
+    {"choices": [], "usage": USAGE},
+)
+
+
+class SlowStream(httpx.AsyncByteStream):
+    """Entrega um chunk por vez e registra quantos já foram produzidos"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.produced = 0
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            self.produced += 1
+            yield chunk
+            await asyncio.sleep(0)
+
+
+async def test_stream_usage_is_counted_without_buffering_the_body():
+    stream = SlowStream(CHUNKS)
+
+    async def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=stream)
+
+    with install_meter(), track_case() as usage:
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            async with client.stream("POST", URL, json={"model": "gpt-4o", "stream": True}) as response:
+                assert stream.produced == 0
+                produced_at_first_chunk = None
+                async for _ in response.aiter_raw():
+                    if produced_at_first_chunk is None:
+                        produced_at_first_chunk = stream.produced
+                assert usage.llm_calls == 1
+
+    assert produced_at_first_chunk == 1
+    assert usage.to_dict()["models"] == {"gpt-4o": {"calls": 1, "prompt_tokens": 12, "completion_tokens": 3}}
+
+
+async def test_usage_split_across_chunks_is_parsed():
+    body = b"".join(CHUNKS)
+
+    async def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=SlowStream([body[i:i + 7] for i in range(0, len(body), 7)]))
+
+    with install_meter(), track_case() as usage:
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            async with client.stream("POST", URL, json={"model": "gpt-4o"}) as response:
+                await response.aread()
+
+    assert (usage.prompt_tokens, usage.completion_tokens, usage.calls_without_usage) == (12, 3, 0)
+
+
+async def test_abandoned_stream_is_still_counted():
+    async def handler(request):
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=SlowStream(CHUNKS))
+
+    with install_meter(), track_case() as usage:
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            async with client.stream("POST", URL, json={"model": "gpt-4o"}) as response:
+                async for _ in response.aiter_raw():
+                    break
+
+    assert (usage.llm_calls, usage.calls_without_usage) == (1, 1)
+
+
+def test_sync_json_response():
+    def handler(request):
+        return httpx.Response(200, json={"choices": [], "usage": USAGE})
+
+    with install_meter(), track_case() as usage:
+        with httpx.Client(transport=httpx.MockTransport(handler)) as client:
+            client.post(URL, json={"model": "gpt-4o-mini"})
+            client.get("https://api.example.com/v1/models")
+
+    assert usage.llm_calls == 1
+    assert usage.models["gpt-4o-mini"]["prompt_tokens"] == 12
+
+
+async def test_llm_client_requests_usage_in_the_stream():
+    import openai
+    from llm_client import AsyncLLMClient
+
+    requests = []
+
+    async def handler(request):
+        requests.append(json.loads(request.content))
+        return httpx.Response(200, headers={"content-type": "text/event-stream"}, stream=SlowStream(CHUNKS))
+
+    client = AsyncLLMClient("chave", base_url="https://api.example.com/v1")
+    resources = client._get_resources()
+    await resources.http_client.aclose()
+    resources.http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    resources.client = openai.AsyncOpenAI(api_key="chave", base_url=client.base_url, http_client=resources.http_client)
+
+    with install_meter(), track_case() as usage:
+        text = await client.complete("gpt-4o", [{"role": "user", "content": "oi"}])
+        message = await client.complete_message("gpt-4o", [{"role": "user", "content": "oi"}])
+    await client.aclose()
+
+    assert text == message["content"] == "Olá mundo"
+    assert [request["stream_options"] for request in requests] == [{"include_usage": True}] * 2
+    assert (usage.llm_calls, usage.prompt_tokens, usage.completion_tokens) == (2, 24, 6)
@@ -0,0 +1,140 @@
+import sys
+
+import eval_report
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from load_test import STUB_TOOL_RESULT, LoadTest, StubModel, find_saturation, load_graph_factory, percentile
+
+# Agente mínimo no formato dos main.py gerados: a tool real grava um arquivo
+GRAPH_MODULE = '''
+from pathlib import Path
+from langchain_core.tools import tool
+from langchain_openai import ChatOpenAI
+from langgraph.graph import END, START, MessagesState, StateGraph
+from langgraph.prebuilt import ToolNode
+
+OUTPUT = Path(__file__).parent / "efeito_colateral.txt"
+
+
+@tool
+def grava(texto: str, vezes: int) -> str:
+    """Grava o texto num arquivo"""
+    OUTPUT.write_text(texto * vezes)
+    return "gravado"
+
+
+tools = [grava]
+model_with_tools = ChatOpenAI(model="gpt-4o").bind_tools(tools)
+tool_node = ToolNode(tools)
+
+
+def agent(state: MessagesState):
+    return {"messages": [model_with_tools.invoke(state["messages"])]}
+
+
+def route(state: MessagesState) -> str:
+    return "tools" if state["messages"][-1].tool_calls else END
+
+
+def build_graph():
+    workflow = StateGraph(MessagesState)
+    workflow.add_node("agent", agent)
+    workflow.add_node("tools", ToolNode(tools))
+    workflow.add_edge(START, "agent")
+    workflow.add_conditional_edges("agent", route, ["tools", END])
+    workflow.add_edge("tools", "agent")
+    return workflow.compile()
+'''
+
+
+def test_percentile_is_the_report_one():
+    assert percentile is eval_report.percentile
+    assert percentile([], 50) == 0.0
+    assert percentile([3.0], 95) == 3.0
+    assert percentile([4, 1, 3, 2], 50) == 2.5
+    assert percentile([1, 2, 3, 4, 5], 95) == pytest.approx(4.8)
+    assert percentile([1, 2, 3], 100) == 3
+
+
+def _closed(concurrency, throughput):
+    return {"mode": "closed", "concurrency": concurrency, "throughput_rps": throughput}
+
+
+def _open(rate, offered, throughput):
+    return {"mode": "open", "rate": rate, "offered_rps": offered, "throughput_rps": throughput}
+
+
+def test_find_saturation_closed_sweep():
+    # De 4 para 16 clientes a vazão cresce menos de 5%: satura em 4
+    stages = [_closed(1, 5.0), _closed(4, 19.0), _closed(16, 19.5), _closed(64, 18.0)]
+    assert find_saturation(stages)["concurrency"] == 4
+    assert find_saturation([_closed(1, 5.0), _closed(4, 19.0)]) is None
+    assert find_saturation([]) is None
+
+
+def test_find_saturation_open_sweep():
+    stages = [_open(5, 5.1, 5.0), _open(10, 9.8, 9.5), _open(20, 20.2, 12.0), _open(40, 39.0, 12.1)]
+    assert find_saturation(stages)["rate"] == 20
+    assert find_saturation(stages[:2]) is None
+
+
+def test_stub_model_requests_tools_then_answers():
+    from langchain_core.tools import tool
+
+    @tool
+    def soma(a: int, b: float, nome: str) -> str:
+        """Soma"""
+        return ""
+
+    model = StubModel([soma], latency=0.0, tool_rounds=1, response_chars=10)
+    first = model.invoke([HumanMessage("oi")])
+    assert first.tool_calls[0]["name"] == "soma"
+    assert first.tool_calls[0]["args"] == {"a": 1, "b": 1.0, "nome": "x"}
+    second = model.invoke([HumanMessage("oi"), first])
+    assert second.content == "Resposta simulada. "[:10] and not second.tool_calls
+    assert model.calls == 2
+
+
+@pytest.fixture
+def graph_file(tmp_path, monkeypatch):
+    package = tmp_path / "agente_carga"
+    package.mkdir()
+    path = package / "graph.py"
+    path.write_text(GRAPH_MODULE, encoding="utf-8")
+    monkeypatch.setenv("OPENAI_API_KEY", "stub")
+    yield path
+    for name in [name for name in sys.modules if name.startswith("agente_carga")]:
+        del sys.modules[name]
+
+
+async def test_closed_stage_with_stub_model_and_tools(graph_file):
+    factory = load_graph_factory(f"{graph_file}:build_graph", latency=0.01, tool_rounds=1)
+    load = LoadTest(factory, ["grave algo"])
+    await load.warmup()
+    stage = await load.closed_stage(concurrency=3, duration=0.3)
+
+    assert stage["mode"] == "closed" and stage["concurrency"] == 3
+    assert stage["requests"] >= 3 and stage["errors"] == 0
+    assert stage["throughput_rps"] > 0
+    assert 0.02 <= stage["latency_s"]["p50"] <= stage["latency_s"]["max"]
+    # A tool real nunca rodou: o stub respondeu no lugar dela
+    assert not (graph_file.parent / "efeito_colateral.txt").exists()
+    result = await factory().ainvoke({"messages": [HumanMessage("oi")]})
+    assert result["messages"][2].content == STUB_TOOL_RESULT
+    assert isinstance(result["messages"][-1], AIMessage)
+
+
+async def test_real_tools_run_only_when_asked(graph_file):
+    factory = load_graph_factory(f"{graph_file}:build_graph", stub_tools=False, latency=0.0, tool_rounds=1)
+    await factory().ainvoke({"messages": [HumanMessage("oi")]})
+    assert (graph_file.parent / "efeito_colateral.txt").read_text() == "x"
+
+
+def test_stub_tools_replace_lists_and_tool_nodes(graph_file):
+    load_graph_factory(f"{graph_file}:build_graph", tool_latency=0.0)
+    module = sys.modules["agente_carga.graph"]
+    assert module.tools == [module.grava]
+    assert module.tool_node.tools_by_name["grava"] is module.grava
+    assert module.grava.invoke({"texto": "a", "vezes": 2}) == STUB_TOOL_RESULT
+    assert module.grava.args_schema.model_json_schema()["required"] == ["texto", "vezes"]
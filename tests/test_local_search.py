@@ -0,0 +1,87 @@
+import json
+import os
+
+import pytest
+
+import local_search
+from local_search import LocalSearchIndex
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "instalacao.md").write_text("# Instalação\nComo instalar o gerador de agentes com pip.\n", encoding="utf-8")
+    (docs / "mcp.md").write_text("# MCP\nServidores MCP expõem ferramentas via stdio.\n", encoding="utf-8")
+    (docs / "notas.txt").write_text("instalar", encoding="utf-8")
+    return docs
+
+
+def _index(corpus, tmp_path):
+    return LocalSearchIndex([corpus], index_dir=tmp_path / "index", refresh_interval=0)
+
+
+def _touch(path, text):
+    stat = path.stat()
+    path.write_text(text, encoding="utf-8")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_search_ranks_and_normalizes_accents(corpus, tmp_path):
+    index = _index(corpus, tmp_path)
+    results = index.search("instalacao")
+    assert [result["title"] for result in results] == ["Instalação"]
+    assert results[0]["snippet"].startswith("Instalação")
+
+
+def test_only_changed_files_are_appended(corpus, tmp_path):
+    index = _index(corpus, tmp_path)
+    index.refresh(force=True)
+    postings = (tmp_path / "index" / "postings.bin").read_bytes()
+
+    _touch(corpus / "mcp.md", "# MCP\nServidores MCP sobre HTTP.\n")
+    assert index.refresh(force=True) == {"added": 0, "updated": 1, "removed": 0}
+
+    grown = (tmp_path / "index" / "postings.bin").read_bytes()
+    assert grown.startswith(postings) and len(grown) > len(postings)
+    assert [result["title"] for result in index.search("http")] == ["MCP"]
+    assert index.search("stdio") == []
+    assert index.search("instalar")[0]["title"] == "Instalação"
+
+
+def test_docs_json_does_not_keep_term_counts(corpus, tmp_path):
+    _index(corpus, tmp_path).refresh(force=True)
+    docs = json.loads((tmp_path / "index" / "docs.json").read_text(encoding="utf-8"))["docs"]
+    assert len(docs) == 2
+    assert all("terms" not in doc for doc in docs.values())
+
+
+def test_index_is_reloaded_and_compacted(corpus, tmp_path):
+    index = _index(corpus, tmp_path)
+    index.refresh(force=True)
+    for round_ in range(3):
+        _touch(corpus / "mcp.md", f"# MCP\nRodada {round_} com ferramentas.\n")
+        index.refresh(force=True)
+    (corpus / "instalacao.md").unlink()
+    index.refresh(force=True)
+
+    # Na terceira rodada os ids mortos passaram dos vivos e os postings foram reescritos
+    assert index.next_id == 2
+    assert len(index.docs) == 1
+
+    reloaded = _index(corpus, tmp_path)
+    assert reloaded.refresh(force=True) == {"added": 0, "updated": 0, "removed": 0}
+    assert [result["title"] for result in reloaded.search("ferramentas rodada")] == ["MCP"]
+    assert reloaded.search("instalar") == []
+
+
+def test_generated_dirs_are_skipped(corpus, tmp_path):
+    for name in ("artefatos", ".artifacts"):
+        (corpus / name).mkdir()
+        (corpus / name / "agente.md").write_text("# Gerado\nagente gerado", encoding="utf-8")
+    assert _index(corpus, tmp_path).search("gerado") == []
+
+
+def test_default_corpus_is_docs_only(monkeypatch):
+    monkeypatch.delenv("SEARCH_CORPUS", raising=False)
+    assert local_search.default_corpus() == [local_search.REPO_ROOT / "docs"]
@@ -0,0 +1,114 @@
+import asyncio
+from typing import Any, Dict
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from mcp_serve import MCPProtocolHandler, SESSION_HEADER, create_http_app
+from mcp_server import MCPServer, MCPTool, ToolResult
+
+
+class WaitTool(MCPTool):
+    """Fica bloqueada até ser cancelada ou liberada"""
+
+    def __init__(self):
+        self.started = asyncio.Event()
+        self.release = asyncio.Event()
+        self.cancelled = 0
+
+    @property
+    def name(self) -> str:
+        return "wait"
+
+    @property
+    def description(self) -> str:
+        return "Espera"
+
+    @property
+    def parameters(self) -> Dict[str, Any]:
+        return {"type": "object", "properties": {}}
+
+    async def execute(self, params: Dict[str, Any]) -> ToolResult:
+        self.started.set()
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return ToolResult(success=True, data={"ok": True})
+
+
+@pytest.fixture
+async def client():
+    tool = WaitTool()
+    server = MCPServer()
+    server.register_tool(tool)
+    handler = MCPProtocolHandler(server)
+    client = TestClient(TestServer(create_http_app(handler)))
+    await client.start_server()
+    yield client, handler, tool
+    await client.close()
+
+
+async def _session(client) -> str:
+    response = await client.post("/mcp", json={"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": {}})
+    assert response.status == 200
+    return response.headers[SESSION_HEADER]
+
+
+def _call(request_id):
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tools/call", "params": {"name": "wait"}}
+
+
+def _cancel(request_id):
+    return {"jsonrpc": "2.0", "method": "notifications/cancelled", "params": {"requestId": request_id}}
+
+
+async def test_request_without_session_header_is_rejected(client):
+    client, handler, tool = client
+    response = await client.post("/mcp", json={"jsonrpc": "2.0", "id": 1, "method": "tools/list"})
+    assert response.status == 400
+
+
+async def test_unknown_session_is_rejected(client):
+    client, handler, tool = client
+    response = await client.post("/mcp", json={"jsonrpc": "2.0", "id": 1, "method": "ping"}, headers={SESSION_HEADER: "x"})
+    assert response.status == 404
+
+
+async def test_cancellation_only_reaches_the_same_session(client):
+    client, handler, tool = client
+    first, second = await _session(client), await _session(client)
+
+    # Os dois clientes usam o id 7
+    first_call = asyncio.create_task(client.post("/mcp", json=_call(7), headers={SESSION_HEADER: first}))
+    second_call = asyncio.create_task(client.post("/mcp", json=_call(7), headers={SESSION_HEADER: second}))
+    for _ in range(100):
+        if len(handler.in_flight) == 2:
+            break
+        await asyncio.sleep(0.01)
+    assert set(handler.in_flight) == {(first, "7"), (second, "7")}
+
+    response = await client.post("/mcp", json=_cancel(7), headers={SESSION_HEADER: second})
+    assert response.status == 202
+    await asyncio.sleep(0.05)
+    assert tool.cancelled == 1
+    assert set(handler.in_flight) == {(first, "7")}
+
+    tool.release.set()
+    body = await (await first_call).json()
+    assert body["result"]["isError"] is False
+    await second_call
+    assert handler.in_flight == {}
+
+
+async def test_closing_a_session_cancels_its_calls(client):
+    client, handler, tool = client
+    session = await _session(client)
+    call = asyncio.create_task(client.post("/mcp", json=_call(1), headers={SESSION_HEADER: session}))
+    await asyncio.wait_for(tool.started.wait(), 1)
+
+    assert (await client.delete("/mcp", headers={SESSION_HEADER: session})).status == 204
+    await call
+    assert tool.cancelled == 1
+    assert handler.in_flight == {}
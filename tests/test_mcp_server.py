@@ -0,0 +1,86 @@
+import asyncio
+from typing import Any, Dict
+
+from mcp_server import MCPServer, MCPTool, ToolResult
+
+
+class EchoTool(MCPTool):
+    """Devolve os parâmetros depois de esperar `delay` segundos"""
+
+    def __init__(self, name: str = "echo"):
+        self._name = name
+        self.running = 0
+        self.peak = 0
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def description(self) -> str:
+        return "Ecoa os parâmetros"
+
+    @property
+    def parameters(self) -> Dict[str, Any]:
+        return {
+            "type": "object",
+            "properties": {"n": {"type": "integer"}, "delay": {"type": "number", "default": 0}},
+            "required": ["n"],
+        }
+
+    async def execute(self, params: Dict[str, Any]) -> ToolResult:
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(params["delay"])
+            return ToolResult(success=True, data=params)
+        finally:
+            self.running -= 1
+
+
+async def test_execute_tools_keeps_the_call_order():
+    server = MCPServer()
+    server.register_tool(EchoTool())
+    results = await server.execute_tools([
+        {"tool": "echo", "params": {"n": 1, "delay": 0.02}},
+        {"tool": "echo", "params": {"n": 2}},
+        {"tool": "missing", "params": {}},
+    ])
+    assert [result.success for result in results] == [True, True, False]
+    assert [result.data["n"] for result in results[:2]] == [1, 2]
+    assert "não encontrada" in results[2].error_message
+
+
+async def test_concurrency_is_limited_per_tool():
+    server = MCPServer()
+    tool = EchoTool()
+    server.register_tool(tool, max_concurrency=2)
+    await server.execute_tools([{"tool": "echo", "params": {"n": n, "delay": 0.01}} for n in range(6)])
+    assert tool.peak == 2
+
+
+async def test_timeout_cancels_only_the_slow_call():
+    server = MCPServer()
+    tool = EchoTool()
+    server.register_tool(tool, timeout=0.05)
+    slow, fast = await server.execute_tools([
+        {"tool": "echo", "params": {"n": 1, "delay": 5}},
+        {"tool": "echo", "params": {"n": 2}},
+    ])
+    assert not slow.success and "tempo limite" in slow.error_message
+    assert fast.success
+    assert tool.running == 0
+
+
+async def test_invalid_params_are_reported_without_running_the_tool():
+    server = MCPServer()
+    tool = EchoTool()
+    server.register_tool(tool)
+    result = await server.execute_tool("echo", {"n": "dois"})
+    assert not result.success
+    assert result.data["validation_errors"][0]["path"] == "n"
+    assert result.data["parameters"] == tool.parameters
+    assert tool.peak == 0
+
+    coerced = await server.execute_tool("echo", {"n": "2"})
+    assert coerced.data == {"n": 2, "delay": 0}
@@ -0,0 +1,58 @@
+import asyncio
+
+from mcp_supervisor import MCPSupervisor
+
+
+class FakeClient:
+    """Cliente de MCP server controlado pelo teste"""
+
+    def __init__(self, alive: bool = True, hang_on_start: bool = False):
+        self.alive = alive
+        self.hang_on_start = hang_on_start
+        self.starting = asyncio.Event()
+        self.stopped = False
+
+    async def start_server(self):
+        self.starting.set()
+        if self.hang_on_start:
+            await asyncio.Event().wait()
+
+    async def stop_server(self):
+        self.stopped = True
+        self.alive = False
+
+    def is_alive(self) -> bool:
+        return self.alive
+
+    async def ping(self, timeout=None):
+        return {}
+
+
+async def test_dead_server_is_restarted():
+    clients = {"srv": FakeClient(alive=False)}
+    replacement = FakeClient()
+    supervisor = MCPSupervisor(clients, interval=60)
+    supervisor.watch("srv", lambda: replacement)
+
+    assert not await supervisor.check("srv")
+    await supervisor._recovering["srv"]
+
+    assert clients["srv"] is replacement
+    assert supervisor.restarts["srv"] == 1
+    await supervisor.stop()
+
+
+async def test_stop_closes_client_that_is_still_starting():
+    clients = {"srv": FakeClient(alive=False)}
+    restarting = FakeClient(hang_on_start=True)
+    supervisor = MCPSupervisor(clients, interval=60)
+    supervisor.watch("srv", lambda: restarting)
+    supervisor.start()
+
+    await supervisor.check("srv")
+    await asyncio.wait_for(restarting.starting.wait(), 1)
+    await supervisor.stop()
+
+    assert restarting.stopped
+    assert supervisor._recovering == {}
+    assert [task for task in asyncio.all_tasks() if task is not asyncio.current_task() and not task.done()] == []
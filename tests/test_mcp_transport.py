@@ -0,0 +1,152 @@
+import asyncio
+import json
+
+import pytest
+
+from mcp_transport import StdioJSONRPCTransport, MCPTransportError
+
+
+class FakeWriter:
+    """Lado de escrita do transporte: guarda cada mensagem JSON-RPC enviada ao server"""
+
+    def __init__(self):
+        self.messages: asyncio.Queue = asyncio.Queue()
+
+    def write(self, data: bytes):
+        for line in data.splitlines():
+            self.messages.put_nowait(json.loads(line))
+
+    async def drain(self):
+        pass
+
+
+def _send(reader: asyncio.StreamReader, message: dict):
+    reader.feed_data(json.dumps(message).encode() + b"\n")
+
+
+async def _next(writer: FakeWriter) -> dict:
+    return await asyncio.wait_for(writer.messages.get(), 1)
+
+
+@pytest.fixture
+async def transport():
+    reader = asyncio.StreamReader(limit=1024)
+    writer = FakeWriter()
+    transport = StdioJSONRPCTransport(reader, writer, default_timeout=1, max_message_bytes=1024)
+    transport.start()
+    yield transport, reader, writer
+    await transport.close()
+
+
+async def test_responses_are_routed_by_id_in_any_order(transport):
+    transport, reader, writer = transport
+    first = asyncio.create_task(transport.request("tools/call", {"name": "a"}))
+    second = asyncio.create_task(transport.request("tools/call", {"name": "b"}))
+    assert {(await _next(writer))["params"]["name"] for _ in range(2)} == {"a", "b"}
+
+    # Respostas chegam na ordem inversa
+    _send(reader, {"jsonrpc": "2.0", "id": "2", "result": {"name": "b"}})
+    _send(reader, {"jsonrpc": "2.0", "id": "1", "result": {"name": "a"}})
+
+    assert (await first)["result"] == {"name": "a"}
+    assert (await second)["result"] == {"name": "b"}
+    assert transport.pending == {}
+
+
+async def test_timeout_sends_cancellation(transport):
+    transport, reader, writer = transport
+    with pytest.raises(asyncio.TimeoutError):
+        await transport.request("tools/call", timeout=0.05)
+
+    request, cancellation = await _next(writer), await _next(writer)
+    assert cancellation["method"] == "notifications/cancelled"
+    assert cancellation["params"] == {"requestId": request["id"], "reason": "timeout"}
+    assert transport.pending == {}
+
+
+async def test_cancelled_caller_notifies_server_and_late_response_is_ignored(transport):
+    transport, reader, writer = transport
+    task = asyncio.create_task(transport.request("tools/call"))
+    request = await _next(writer)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    cancellation = await _next(writer)
+    assert cancellation["params"] == {"requestId": request["id"], "reason": "cancelled"}
+
+    # Resposta tardia não quebra a leitura; a próxima requisição segue funcionando
+    _send(reader, {"jsonrpc": "2.0", "id": request["id"], "result": {}})
+    follow_up = asyncio.create_task(transport.request("ping"))
+    _send(reader, {"jsonrpc": "2.0", "id": (await _next(writer))["id"], "result": {"ok": True}})
+    assert (await follow_up)["result"] == {"ok": True}
+
+
+async def test_server_ping_is_answered(transport):
+    transport, reader, writer = transport
+    _send(reader, {"jsonrpc": "2.0", "id": "srv-1", "method": "ping"})
+    assert await _next(writer) == {"jsonrpc": "2.0", "id": "srv-1", "result": {}}
+
+
+async def test_notifications_reach_their_handler(transport):
+    transport, reader, writer = transport
+    received = asyncio.get_running_loop().create_future()
+    transport.on_notification("notifications/tools/list_changed", received.set_result)
+    _send(reader, {"jsonrpc": "2.0", "method": "notifications/tools/list_changed", "params": {"x": 1}})
+    assert await asyncio.wait_for(received, 1) == {"x": 1}
+
+
+async def test_server_exit_fails_pending_requests(transport):
+    transport, reader, writer = transport
+    task = asyncio.create_task(transport.request("tools/call"))
+    await _next(writer)
+    reader.feed_eof()
+    with pytest.raises(MCPTransportError):
+        await task
+    with pytest.raises(MCPTransportError):
+        await transport.request("tools/call")
+
+
+def _oversized(message: dict) -> bytes:
+    return json.dumps(message).encode() + b"\n"
+
+
+async def test_oversized_response_fails_the_top_level_id_after_result(transport):
+    transport, reader, writer = transport
+    target = asyncio.create_task(transport.request("tools/call", {"name": "a"}))
+    other = asyncio.create_task(transport.request("tools/call", {"name": "b"}))
+    ids = {(await _next(writer))["params"]["name"]: message_id for message_id in ("1", "2")}
+
+    # "id" depois do result, com ids aninhados antes dele (ordem do SDK TypeScript)
+    items = [{"id": ids["b"], "text": "x" * 200} for _ in range(20)]
+    reader.feed_data(_oversized({"jsonrpc": "2.0", "result": {"id": ids["b"], "items": items}, "id": ids["a"]}))
+
+    with pytest.raises(MCPTransportError):
+        await target
+    assert not other.done()
+
+    _send(reader, {"jsonrpc": "2.0", "id": ids["b"], "result": {"ok": True}})
+    assert (await other)["result"] == {"ok": True}
+
+
+async def test_oversized_response_without_id_fails_every_pending_request(transport):
+    transport, reader, writer = transport
+    tasks = [asyncio.create_task(transport.request("tools/call")) for _ in range(2)]
+    for _ in tasks:
+        await _next(writer)
+
+    reader.feed_data(_oversized({"jsonrpc": "2.0", "result": {"id": "1", "text": "x" * 4000}}))
+
+    for task in tasks:
+        with pytest.raises(MCPTransportError):
+            await task
+
+
+async def test_oversized_notification_fails_nothing(transport):
+    transport, reader, writer = transport
+    task = asyncio.create_task(transport.request("tools/call"))
+    request = await _next(writer)
+
+    reader.feed_data(_oversized({"jsonrpc": "2.0", "method": "notifications/message", "params": {"id": request["id"], "data": "x" * 4000}}))
+    _send(reader, {"jsonrpc": "2.0", "id": request["id"], "result": {"ok": True}})
+    assert (await task)["result"] == {"ok": True}
@@ -0,0 +1,76 @@
+import pytest
+
+from schema_validation import compile_schema, format_errors
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "query": {"type": "string", "minLength": 1},
+        "max_results": {"type": "integer", "default": 5, "minimum": 1, "maximum": 20},
+        "exact": {"type": "boolean"},
+        "mode": {"enum": ["fast", "full"]},
+        "tags": {"type": "array", "items": {"type": "string"}, "maxItems": 2},
+        "filters": {"type": "object", "properties": {"lang": {"type": "string"}}, "additionalProperties": False},
+    },
+    "required": ["query"],
+    "additionalProperties": False,
+}
+
+validate = compile_schema(SCHEMA)
+
+
+def test_valid_params_get_defaults():
+    assert validate({"query": "mcp"}) == ({"query": "mcp", "max_results": 5}, [])
+
+
+@pytest.mark.parametrize("params, expected", [
+    ({"query": "mcp", "max_results": "7"}, {"query": "mcp", "max_results": 7}),
+    ({"query": "mcp", "max_results": 7.0}, {"query": "mcp", "max_results": 7}),
+    ({"query": "mcp", "exact": "true"}, {"query": "mcp", "max_results": 5, "exact": True}),
+    ({"query": 42}, {"query": "42", "max_results": 5}),
+    ({"query": "mcp", "tags": '["a", "b"]'}, {"query": "mcp", "max_results": 5, "tags": ["a", "b"]}),
+    ({"query": "mcp", "filters": '{"lang": "py"}'}, {"query": "mcp", "max_results": 5, "filters": {"lang": "py"}}),
+])
+def test_values_are_coerced(params, expected):
+    assert validate(params) == (expected, [])
+
+
+def test_every_error_is_reported_at_once():
+    _, errors = validate({"max_results": 50, "exact": "talvez", "mode": "slow", "tags": ["a", 1, "c"], "extra": 1})
+    assert {error["path"]: error["error"] for error in errors} == {
+        "query": "parâmetro obrigatório ausente",
+        "max_results": "viola maximum",
+        "exact": "tipo inválido",
+        "mode": "valor não permitido",
+        "tags": "viola maxItems",
+        "extra": "parâmetro desconhecido",
+    }
+
+
+def test_nested_paths():
+    _, errors = validate({"query": "mcp", "tags": [{"a": 1}], "filters": {"lang": "py", "os": "linux"}})
+    assert [error["path"] for error in errors] == ["tags[0]", "filters.os"]
+
+
+def test_bool_is_not_an_integer():
+    _, errors = validate({"query": "mcp", "max_results": True})
+    assert errors[0]["expected"] == "integer"
+
+
+def test_defaults_are_not_shared_between_calls():
+    validate_list = compile_schema({"type": "object", "properties": {"items": {"type": "array", "default": []}}})
+    first, _ = validate_list({})
+    first["items"].append(1)
+    assert validate_list({}) == ({"items": []}, [])
+
+
+def test_empty_schema_accepts_anything():
+    assert compile_schema({})({"x": object}) == ({"x": object}, [])
+
+
+def test_format_errors_lists_every_problem():
+    _, errors = validate({"max_results": "muitos"})
+    message = format_errors("web_search", errors)
+    assert message.startswith("Parâmetros inválidos para 'web_search': ")
+    assert "query: parâmetro obrigatório ausente" in message
+    assert "max_results: tipo inválido (esperado: integer) (recebido: 'muitos')" in message
@@ -0,0 +1,208 @@
+import pytest
+from deepeval.metrics import BaseMetric
+from deepeval.test_case import LLMTestCase
+
+from judge_cache import JudgeCache
+from tiered_eval import TieredEvaluator, check_tools, summarize
+
+VALID_CODE = '''
+from langgraph.graph import StateGraph
+
+def agent(state):
+    return state
+
+graph = StateGraph(dict)
+graph.add_node("agent", agent)
+graph.add_edge("agent", "agent")
+app = graph.compile()
+'''
+
+
+class FakeJudge(BaseMetric):
+    """Métrica com juiz falso: conta as chamadas e devolve a nota configurada"""
+
+    calls = 0
+
+    def __init__(self, threshold: float = 0.5, model: str = "juiz", name: str = "juiz", score: float = 0.9):
+        self.threshold = threshold
+        self.model = model
+        self.evaluation_model = model
+        self.name = name
+        self.fixed_score = score
+
+    async def a_measure(self, test_case, *args, **kwargs):
+        return self.measure(test_case)
+
+    def measure(self, test_case, *args, **kwargs):
+        type(self).calls += 1
+        self.score = self.fixed_score
+        self.success = self.score >= self.threshold
+        self.reason = "ok"
+        return self.score
+
+    def is_successful(self):
+        return bool(self.success)
+
+    @property
+    def __name__(self):
+        return self.name
+
+
+class BrokenJudge(FakeJudge):
+    def measure(self, test_case, *args, **kwargs):
+        type(self).calls += 1
+        raise TimeoutError("juiz fora do ar")
+
+
+class Deterministic(BaseMetric):
+    def __init__(self, threshold: float = 1.0):
+        self.threshold = threshold
+
+    async def a_measure(self, test_case, *args, **kwargs):
+        self.score, self.success = 1.0, True
+        return self.score
+
+    def measure(self, test_case, *args, **kwargs):
+        raise NotImplementedError
+
+    def is_successful(self):
+        return True
+
+    @property
+    def __name__(self):
+        return "deterministica"
+
+
+def build_metrics():
+    return [FakeJudge(name="clareza"), FakeJudge(name="completude", score=0.7), Deterministic()]
+
+
+def build_test_case(case, result):
+    return LLMTestCase(input=case["input"], actual_output=result.get("actual_output") or "")
+
+
+@pytest.fixture(autouse=True)
+def reset_calls():
+    FakeJudge.calls = BrokenJudge.calls = 0
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = JudgeCache(tmp_path / "judge.sqlite")
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def evaluator(cache, monkeypatch):
+    evaluator = TieredEvaluator(build_metrics, build_test_case, ast_pack="langgraph", cache=cache)
+    judged = []
+    judge = evaluator._judge
+
+    async def spy(case, result, score):
+        judged.append(case["id"])
+        return await judge(case, result, score)
+
+    monkeypatch.setattr(evaluator, "_judge", spy)
+    evaluator.judged = judged
+    return evaluator
+
+
+def _result(code=VALID_CODE, tools=("add",), params=None, status="ok"):
+    return {
+        "status": status, "actual_output": code,
+        "tool_calls": [{"tool": tool, "params": (params or {}).get(tool)} for tool in tools],
+    }
+
+
+CASES = {
+    "run": ({"id": "run", "input": "x"}, {"status": "error", "error": "timeout"}),
+    "ast": ({"id": "ast", "input": "x"}, _result(code="def main(:\n")),
+    "ast_score": ({"id": "ast_score", "input": "x", "min_ast_score": 6}, _result(code="x = 1\n")),
+    "tools": ({"id": "tools", "input": "x", "expected_tools": ["add", "add"]}, _result(tools=["add"])),
+    "order": ({"id": "order", "input": "x", "expected_tools": ["add", "sub"]}, _result(tools=["sub", "add"])),
+    "params": (
+        {"id": "params", "input": "x", "expected_tool_calls": [{"tool": "add", "params": {"a": 5}}]},
+        _result(params={"add": {"a": 4, "b": 1}}),
+    ),
+}
+
+
+@pytest.mark.parametrize("case_name", CASES)
+async def test_cheap_tier_failures_never_reach_the_judge(evaluator, case_name):
+    case, result = CASES[case_name]
+    score = await evaluator.evaluate_case(case, result)
+
+    assert score["passed"] is False
+    assert score["decided_by"] == ("run" if case_name == "run" else "ast" if case_name.startswith("ast") else "tools")
+    assert evaluator.judged == [] and FakeJudge.calls == 0
+    assert score["judge_calls"] == 0
+    # Só as métricas com juiz contam como economizadas
+    assert score["judge_calls_saved"] == evaluator.judge_metrics == 2
+
+
+async def test_passing_case_is_judged_and_the_cache_saves_the_rerun(cache):
+    case = {"id": "ok", "input": "soma", "expected_tool_calls": [{"tool": "add", "params": {"a": 2}}]}
+    result = _result(params={"add": {"a": 2, "b": 3}})
+
+    first = await TieredEvaluator(build_metrics, build_test_case, ast_pack="langgraph", cache=cache).evaluate_case(case, result)
+    assert first["decided_by"] == "judge" and first["passed"]
+    assert set(first["tiers"]) == {"ast", "tools", "judge"}
+    assert (first["judge_calls"], first["judge_calls_saved"]) == (2, 0)
+    assert FakeJudge.calls == 2
+
+    second = await TieredEvaluator(build_metrics, build_test_case, ast_pack="langgraph", cache=cache).evaluate_case(case, result)
+    assert (second["judge_calls"], second["judge_calls_saved"]) == (0, 2)
+    assert FakeJudge.calls == 2
+    verdicts = second["tiers"]["judge"]["metrics"]
+    assert verdicts["clareza"]["cached"] and verdicts["completude"]["cached"]
+    assert not verdicts["deterministica"]["cached"]
+
+
+async def test_judge_failure_counts_as_a_call_and_fails_the_case(cache):
+    def metrics():
+        return [FakeJudge(name="clareza"), BrokenJudge(name="quebrado")]
+
+    evaluator = TieredEvaluator(metrics, build_test_case, cache=cache)
+    score = await evaluator.evaluate_case({"id": "x", "input": "x"}, _result())
+    verdict = score["tiers"]["judge"]["metrics"]["quebrado"]
+    assert not score["passed"] and not verdict["passed"]
+    assert "TimeoutError" in verdict["error"]
+    assert (score["judge_calls"], score["judge_calls_saved"]) == (2, 0)
+
+
+async def test_judge_calls_add_up_across_a_run(evaluator):
+    cases = [case for case, _ in CASES.values()] + [{"id": "ok", "input": "soma"}, {"id": "sem_resultado", "input": "x"}]
+    results = {case["id"]: result for case, result in CASES.values()}
+    results["ok"] = _result()
+
+    scores = await evaluator.evaluate(cases, results)
+    summary = summarize(scores)
+
+    # Caso sem resultado não é avaliado; cada avaliado conta cada juiz uma única vez
+    assert summary["cases"] == len(CASES) + 1
+    assert all(score["judge_calls"] + score["judge_calls_saved"] == evaluator.judge_metrics for score in scores)
+    assert summary["judge_calls"] + summary["judge_calls_saved"] == summary["cases"] * evaluator.judge_metrics
+    assert summary["judge_calls"] == FakeJudge.calls == 2
+    assert evaluator.judged == ["ok"]
+    assert summary["decided_by"] == {"run": 1, "ast": 2, "tools": 3, "judge": 1}
+    assert summary["passed"] == 1
+
+
+async def test_without_cache_every_run_calls_the_judge():
+    evaluator = TieredEvaluator(build_metrics, build_test_case, use_cache=False)
+    for _ in range(2):
+        score = await evaluator.evaluate_case({"id": "x", "input": "x"}, _result())
+        assert (score["judge_calls"], score["judge_calls_saved"]) == (2, 0)
+    assert FakeJudge.calls == 4
+
+
+def test_tool_params_are_a_subset_and_order_can_be_free():
+    case = {
+        "tool_order": "any",
+        "expected_tool_calls": [{"tool": "add", "params": {"a": 1}}, {"tool": "sub", "params": {"opts": {"x": 1}}}],
+    }
+    called = _result(tools=["sub", "add"], params={"add": {"a": 1, "b": 2}, "sub": {"opts": {"x": 1, "y": 2}}})
+    assert check_tools(case, called)["passed"]
+    assert check_tools({"expected_tools": []}, {"tools_called": []})["passed"]
+    assert check_tools({}, called) is None
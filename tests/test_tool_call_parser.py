@@ -0,0 +1,126 @@
+import asyncio
+
+import pytest
+
+from tool_call_parser import StreamingToolCallParser, parse_tool_calls, dispatch_streamed_tool_calls
+
+RESPONSE = """Vou buscar os dados.
+TOOL_CALL: search
+SERVER: github
+PARAMS: {"query": "mcp {server}", "filters": {"lang": "py"}}
+E também:
+TOOL_CALL: registerAgent
+PARAMS: {"code": "class A:\\n    x = \\"}\\""}
+Pronto."""
+
+
+def _feed_in_chunks(text: str, size: int):
+    parser = StreamingToolCallParser()
+    calls = []
+    for start in range(0, len(text), size):
+        calls += parser.feed(text[start:start + size])
+    return calls + parser.close()
+
+
+def test_parses_calls_with_server_and_nested_params():
+    assert parse_tool_calls(RESPONSE) == [
+        {"tool": "search", "server": "github", "params": {"query": "mcp {server}", "filters": {"lang": "py"}}},
+        {"tool": "registerAgent", "server": None, "params": {"code": 'class A:\n    x = "}"'}},
+    ]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 64])
+def test_chunking_does_not_change_the_result(size):
+    assert _feed_in_chunks(RESPONSE, size) == parse_tool_calls(RESPONSE)
+
+
+def test_call_is_returned_as_soon_as_params_close():
+    parser = StreamingToolCallParser()
+    assert parser.feed('TOOL_CALL: add\nPARAMS: {"a": 1') == []
+    assert parser.feed(', "b": 2}') == [{"tool": "add", "server": None, "params": {"a": 1, "b": 2}}]
+
+
+def test_literal_newlines_inside_strings_are_accepted():
+    assert parse_tool_calls('TOOL_CALL: registerAgent\nPARAMS: {"code": "linha 1\nlinha 2"}\n') == [
+        {"tool": "registerAgent", "server": None, "params": {"code": "linha 1\nlinha 2"}},
+    ]
+
+
+def test_call_without_params_is_kept():
+    assert parse_tool_calls("TOOL_CALL: list_tools\nTOOL_CALL: ping\nPARAMS: {}") == [
+        {"tool": "list_tools", "server": None, "params": {}},
+        {"tool": "ping", "server": None, "params": {}},
+    ]
+
+
+def test_invalid_json_is_dropped():
+    assert parse_tool_calls('TOOL_CALL: add\nPARAMS: {"a": }\nTOOL_CALL: ping\nPARAMS: {}') == [
+        {"tool": "ping", "server": None, "params": {}},
+    ]
+
+
+def test_text_without_calls():
+    assert parse_tool_calls("Só uma resposta normal.\nSem ferramentas.") == []
+
+
+async def test_dispatch_starts_tools_before_the_stream_ends():
+    events = []
+
+    async def stream():
+        for chunk in ['TOOL_CALL: a\nPARAMS: {"n": 1}\n', "texto\n", 'TOOL_CALL: b\nPARAMS: {"n": 2}']:
+            events.append(f"chunk {chunk[:12]!r}")
+            yield chunk
+            await asyncio.sleep(0)
+
+    async def execute(call):
+        events.append(f"start {call['tool']}")
+        return call["params"]["n"] * 10
+
+    text, calls, results = await dispatch_streamed_tool_calls(stream(), execute, accept=lambda call: call["tool"] != "x")
+
+    assert text.endswith('{"n": 2}')
+    assert [call["tool"] for call in calls] == ["a", "b"]
+    assert results == [10, 20]
+    assert events.index("start a") < events.index("chunk 'TOOL_CALL: b'")
+
+
+async def test_dispatch_cancels_running_tools_when_the_stream_fails():
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def stream():
+        yield 'TOOL_CALL: slow\nPARAMS: {}\n'
+        await started.wait()
+        raise ConnectionError("stream interrompido")
+
+    async def execute(call):
+        started.set()
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(ConnectionError):
+        await dispatch_streamed_tool_calls(stream(), execute)
+    await asyncio.wait_for(cancelled.wait(), 1)
+
+
+def test_example_json_in_prose_is_not_taken_as_params():
+    text = 'TOOL_CALL: list_repos\nSERVER: github\nVou listar...\n\nExemplo de saída:\n{"repos": ["a"]}'
+    assert parse_tool_calls(text) == [{"tool": "list_repos", "server": "github", "params": {}}]
+
+
+def test_params_are_only_looked_for_in_the_next_three_lines():
+    text = 'TOOL_CALL: add\nSERVER: calc\n\n\nPARAMS: {"a": 1}'
+    assert parse_tool_calls(text) == [{"tool": "add", "server": "calc", "params": {}}]
+
+
+def test_bare_json_without_params_prefix_is_ignored():
+    assert parse_tool_calls('TOOL_CALL: add\n{"a": 1}\n') == [{"tool": "add", "server": None, "params": {}}]
+
+
+@pytest.mark.parametrize("size", [1, 4, 64])
+def test_params_object_on_the_line_after_the_prefix(size):
+    text = 'TOOL_CALL: add\nSERVER: calc\nPARAMS:\n{"a": 1}\nfim'
+    assert _feed_in_chunks(text, size) == [{"tool": "add", "server": "calc", "params": {"a": 1}}]
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+
+from schema_validation import compile_schema
+from tool_catalog import ToolRegistry, compact_schema, count_tokens, render_schema
+
+TOOLS = [
+    {"_server": "github", "name": "search", "description": "Busca repositórios"},
+    {"_server": "github", "name": "list_issues", "description": "Lista issues"},
+    {"_server": "docs", "name": "search", "description": "Busca na documentação"},
+    {"_server": "calc", "name": "add", "description": "Soma"},
+]
+
+
+@pytest.fixture
+def registry():
+    return ToolRegistry(TOOLS)
+
+
+def test_unique_names_are_exposed_without_prefix(registry):
+    assert registry.exposed_name("github", "list_issues") == "list_issues"
+    assert registry.exposed_name("github", "search") == "github.search"
+    assert registry.exposed_name("docs", "search", separator="__") == "docs__search"
+
+
+def test_exposed_names_do_not_depend_on_server_order():
+    forward = ToolRegistry(TOOLS)
+    backward = ToolRegistry(list(reversed(TOOLS)))
+    names = lambda registry: sorted(registry.exposed_name(tool["_server"], tool["name"]) for tool in TOOLS)
+    assert names(forward) == names(backward) == ["add", "docs.search", "github.search", "list_issues"]
+
+
+@pytest.mark.parametrize("tool_name, server_name, expected", [
+    ("search", "docs", ("docs", "search", None)),
+    ("github.search", None, ("github", "search", None)),
+    ("add", None, ("calc", "add", None)),
+    # SERVER errado é corrigido quando a ferramenta só existe em um server
+    ("list_issues", "docs", ("github", "list_issues", None)),
+])
+def test_resolve_routes_calls(registry, tool_name, server_name, expected):
+    assert registry.resolve(tool_name, server_name) == expected
+
+
+def test_colliding_name_without_server_is_an_error(registry):
+    server, tool, error = registry.resolve("search")
+    assert (server, tool) == (None, "search")
+    assert "docs.search" in error and "github.search" in error
+
+
+def test_unknown_tool(registry):
+    assert registry.resolve("delete", "github")[2] == "Ferramenta 'delete' não encontrada"
+
+
+SCHEMA = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "title": "SearchArgs",
+    "type": "object",
+    "properties": {
+        "query": {"title": "Query", "type": "string", "minLength": 1},
+        "filters": {
+            "title": "Filters",
+            "type": "object",
+            "properties": {"lang": {"title": "Lang", "enum": ["py", "ts"]}},
+            "required": [],
+            "additionalProperties": True,
+        },
+        "tags": {"type": "array", "items": {"title": "Tag", "type": "string"}},
+        "limit": {"anyOf": [{"type": "integer", "title": "N"}, {"type": "null"}], "default": None},
+    },
+    "required": ["query"],
+    "additionalProperties": False,
+}
+
+
+def test_compact_schema_drops_only_redundant_keys():
+    compact = compact_schema(SCHEMA)
+    assert "title" not in json.dumps(compact) and "$schema" not in compact
+    assert compact["properties"]["filters"] == {"type": "object", "properties": {"lang": {"enum": ["py", "ts"]}}}
+    assert compact["required"] == ["query"] and compact["additionalProperties"] is False
+    assert compact["properties"]["limit"]["anyOf"] == [{"type": "integer"}, {"type": "null"}]
+    assert SCHEMA["title"] == "SearchArgs"  # o original não é alterado
+
+
+@pytest.mark.parametrize("params", [
+    {"query": "mcp"},
+    {"query": "", "tags": [1]},
+    {"query": "mcp", "filters": {"lang": "go", "os": "linux"}},
+    {"tags": ["a"], "extra": True},
+    {"query": "mcp", "limit": None},
+])
+def test_compact_schema_validates_like_the_original(params):
+    assert compile_schema(compact_schema(SCHEMA))(params) == compile_schema(SCHEMA)(params)
+
+
+def test_compact_rendering_is_smaller_and_parseable():
+    compact = render_schema(SCHEMA, "compact")
+    assert json.loads(compact) == compact_schema(SCHEMA)
+    assert count_tokens(compact) < count_tokens(render_schema(SCHEMA))
+
+
+def test_compact_schema_is_still_a_valid_json_schema():
+    jsonschema = pytest.importorskip("jsonschema")
+    compact = compact_schema(SCHEMA)
+    jsonschema.Draft7Validator.check_schema(compact)
+    for params in ({"query": "mcp"}, {"query": 1}, {"query": "mcp", "filters": {"lang": "go"}}):
+        assert jsonschema.Draft7Validator(compact).is_valid(params) == jsonschema.Draft7Validator(SCHEMA).is_valid(params)
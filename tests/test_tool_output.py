@@ -0,0 +1,74 @@
+import json
+import re
+
+import pytest
+
+from shared.tool_output import ToolOutputLimiter, ToolOutputStore, project
+
+
+@pytest.fixture
+def limiter(tmp_path):
+    return ToolOutputLimiter(ToolOutputStore(tmp_path / "outputs"), max_bytes=100, projections={"list": ["items.name"]})
+
+
+def _read_all(limiter, handle, offset):
+    content = ""
+    while offset is not None:
+        page = limiter.read({"handle": handle, "offset": offset})
+        content += page["content"]
+        offset = page["next_offset"]
+    return content, page["total_bytes"]
+
+
+def test_project_keeps_nested_fields_through_lists():
+    data = {"total": 2, "items": [{"name": "a", "extra": 1}, {"name": "b", "owner": {"login": "x", "id": 1}}]}
+    assert project(data, ["total", "items.name", "items.owner.login"]) == {
+        "total": 2,
+        "items": [{"name": "a"}, {"name": "b", "owner": {"login": "x"}}],
+    }
+
+
+def test_small_output_is_returned_without_spilling(limiter, tmp_path):
+    assert limiter.limit_text("other", "curto") == "curto"
+    assert not (tmp_path / "outputs").exists()
+
+
+def test_preview_and_pages_rebuild_the_projected_text(limiter):
+    raw = json.dumps({"items": [{"name": "é" * 10, "noise": "z" * 50} for _ in range(20)]})
+    limited = limiter.limit_text("list", raw)
+
+    match = re.search(r'handle="(\w+)" e offset=(\d+)', limited)
+    preview = limited.split("\n[resultado truncado")[0]
+    rest, total = _read_all(limiter, match.group(1), int(match.group(2)))
+
+    projected = json.dumps({"items": [{"name": "é" * 10}] * 20}, ensure_ascii=False, separators=(",", ":"))
+    assert preview + rest == projected
+    assert total == len(projected.encode("utf-8"))
+    assert f"{total} bytes no total" in limited
+
+
+def test_non_text_blocks_pass_through(limiter):
+    content = ["x" * 200, {"type": "image", "data": "..."}, {"type": "text", "text": "ok"}]
+    limited = limiter.limit_content("other", content)
+    assert "resultado truncado" in limited[0]
+    assert limited[1:] == content[1:]
+
+
+def test_unknown_handle(limiter):
+    with pytest.raises(KeyError):
+        limiter.read({"handle": "0" * 64})
+
+
+@pytest.mark.parametrize("handle", [
+    "aa" + "/" * 50 + "etc/hostname",
+    "../" * 21 + "e",
+    "A" * 64,
+    "0" * 63,
+    None,
+])
+def test_handle_outside_the_store_is_rejected(limiter, tmp_path, handle):
+    (tmp_path / "segredo").write_text("não deve vazar")
+    with pytest.raises(KeyError):
+        limiter.read({"handle": handle})
+    with pytest.raises(KeyError):
+        limiter.store.size(handle)
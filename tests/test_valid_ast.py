@@ -0,0 +1,102 @@
+import json
+from pathlib import Path
+
+import pytest
+
+import valid_ast
+from valid_ast import ResultCache, content_key, validate_code, validate_files
+
+ROOT = Path(__file__).resolve().parents[1]
+AGENTS = ROOT / "evals" / "py" / "agents"
+
+
+# Pontuações de referência dos agentes do repositório
+@pytest.mark.parametrize("path, pack, score, missing", [
+    (AGENTS / "agent_example.py", "mcp", 5, ["has_llm_agent"]),
+    (AGENTS / "agent_generated.py", "mcp", 5, ["has_llm_agent"]),
+    (ROOT / "src" / "gerador" / "main.py", "langgraph", 6, []),
+    (ROOT / "evals" / "langgraph" / "sum_agent" / "agent.py", "langgraph", 3, ["has_state_graph", "has_edges", "compiles_graph"]),
+    (ROOT / "src" / "adk_generator" / "agent_creator" / "agent.py", "adk", 5, []),
+])
+def test_sample_agents(path, pack, score, missing):
+    result, report = validate_code(path.read_text(encoding="utf-8"), pack)
+    assert result == score
+    assert [name for name, ok in report.items() if not ok] == missing
+
+
+MCP_AGENT = '''
+import asyncio
+from abc import ABC, abstractmethod
+
+class MCPTool(ABC):
+    @abstractmethod
+    async def execute(self, params): ...
+
+class Soma(MCPTool):
+    async def execute(self, params):
+        return params["a"] + params["b"]
+
+class Agent:
+    pass
+
+async def main():
+    pass
+
+if __name__ == "__main__":
+    asyncio.run(main())
+'''
+
+
+def test_async_and_sync_definitions_score_the_same():
+    assert validate_code(MCP_AGENT)[0] == 6
+    assert validate_code(MCP_AGENT.replace("async def", "def"))[0] == 6
+
+
+def test_nested_definitions_do_not_count():
+    code = "def outer():\n    class MCPTool:\n        def execute(self): pass\n    def main(): pass\n"
+    assert validate_code(code)[0] == 0
+
+
+def test_syntax_error_is_reported():
+    assert validate_code("def (:")[0] == 0
+    assert "error" in validate_code("def (:")[1]
+
+
+def test_result_cache_round_trip(tmp_path):
+    cache = ResultCache(tmp_path / "cache.json")
+    cache.save()
+    assert not (tmp_path / "cache.json").exists()  # nada novo, nada gravado
+    cache.put("k", {"score": 1})
+    cache.save()
+    assert ResultCache(tmp_path / "cache.json").get("k") == {"score": 1}
+
+    (tmp_path / "cache.json").write_text("{corrompido")
+    assert ResultCache(tmp_path / "cache.json").entries == {}
+
+
+def test_content_key_depends_on_pack_and_engine_version(monkeypatch):
+    key = content_key("x = 1", "mcp")
+    assert key != content_key("x = 1", "adk")
+    monkeypatch.setattr(valid_ast, "ENGINE_VERSION", "outra")
+    assert key != content_key("x = 1", "mcp")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_validate_files_uses_the_cache_and_the_pool(tmp_path, workers):
+    agents = tmp_path / "agentes"
+    agents.mkdir()
+    (agents / "a.py").write_text(MCP_AGENT)
+    (agents / "copia.py").write_text(MCP_AGENT)
+    (agents / "vazio.py").write_text("x = 1\n")
+    cache_path = tmp_path / "cache.json"
+
+    first = validate_files([str(agents)], workers=workers, cache_path=cache_path)
+    assert [(Path(r["path"]).name, r["score"], r["cached"]) for r in first] == [
+        ("a.py", 6, False), ("copia.py", 6, False), ("vazio.py", 0, False),
+    ]
+    # Conteúdos iguais são validados uma vez
+    assert len(json.loads(cache_path.read_text())) == 2
+
+    second = validate_files([str(agents)], workers=workers, cache_path=cache_path)
+    assert [r["cached"] for r in second] == [True, True, True]
+    assert [r["score"] for r in second] == [6, 6, 0]